@@ -0,0 +1,91 @@
+"""
+Throughput benchmark of the async API under concurrent uploads.
+
+Generates synthetic Kahoot reports as in-memory Excel uploads and converts them with
+kahoot_to_anki.api.convert one after another, concurrently in the default thread pool of
+the event loop, and concurrently in a process pool, and reports the conversions per second.
+
+Run with:
+    python -m benchmarks.bench_api --uploads 32 --workers 4
+"""
+# Standard library imports
+import argparse
+import asyncio
+import io
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import List, Optional
+
+from benchmarks.synthetic import KAHOOT_SHEET_NAME, make_raw_data
+from kahoot_to_anki.api import convert
+
+DEFAULT_UPLOADS = 32
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+
+def make_uploads(uploads: int, questions: int, players: int) -> List[bytes]:
+    """
+    Creates the contents of synthetic Excel reports.
+
+    :param uploads: The number of reports
+    :param questions: The number of questions per report
+    :param players: The number of players per report
+    :return: The contents of the .xlsx files
+    """
+    contents = []
+    for quiz in range(uploads):
+        buffer = io.BytesIO()
+        make_raw_data(questions=questions, players=players, quiz=quiz).to_excel(
+            buffer, sheet_name=KAHOOT_SHEET_NAME, index=False
+        )
+        contents.append(buffer.getvalue())
+    return contents
+
+
+async def convert_all(uploads: List[bytes], concurrent: bool, executor: Optional[Executor] = None) -> float:
+    """
+    Converts every upload to its own package.
+
+    :param uploads: The contents of the reports
+    :param concurrent: Whether the conversions are awaited together or one after another
+    :param executor: The executor of the conversions, None for the default executor of the event loop
+    :return: The elapsed wall time in seconds
+    """
+    start = time.perf_counter()
+    if concurrent:
+        await asyncio.gather(*[convert([upload], executor=executor) for upload in uploads])
+    else:
+        for upload in uploads:
+            await convert([upload], executor=executor)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the async API with concurrent uploads")
+    parser.add_argument(
+        "--uploads", type=int, default=DEFAULT_UPLOADS, help=f"Number of uploads. Default: {DEFAULT_UPLOADS}"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=DEFAULT_WORKERS, help=f"Processes of the process pool. Default: {DEFAULT_WORKERS}"
+    )
+    parser.add_argument("--questions", type=int, default=30, help="Questions per report. Default: 30")
+    parser.add_argument("--players", type=int, default=40, help="Players per report. Default: 40")
+    args = parser.parse_args()
+
+    uploads = make_uploads(args.uploads, args.questions, args.players)
+    print(f"{'mode':<24} {'seconds':>8} {'uploads/s':>10}")
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        # the first conversion in each worker imports pandas, openpyxl and genanki
+        asyncio.run(convert_all(uploads[:args.workers], concurrent=True, executor=executor))
+        for name, concurrent, pool in [
+            ("sequential", False, None),
+            ("concurrent, threads", True, None),
+            (f"concurrent, {args.workers} processes", True, executor),
+        ]:
+            seconds = asyncio.run(convert_all(uploads, concurrent, pool))
+            print(f"{name:<24} {seconds:>8.2f} {len(uploads) / seconds:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
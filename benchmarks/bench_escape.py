@@ -0,0 +1,73 @@
+"""
+Micro-benchmark of the HTML escaping of df_processing.
+
+Builds a raw data sheet whose questions and answers need escaping and times df_processing,
+which escapes the output fields with vectorized string replacements, against escaping every
+cell of the sheet with html.escape. Both results are compared before the timings are printed.
+
+Run with:
+    python -m benchmarks.bench_escape --rows 100000
+"""
+# Standard library imports
+import argparse
+import html
+import time
+
+# Third-party library imports
+import pandas as pd
+
+from kahoot_to_anki.processing import df_processing
+
+DEFAULT_ROWS = 100_000
+
+
+def make_sheet(rows: int) -> pd.DataFrame:
+    """
+    Creates a raw data sheet with one row per question and characters which have to be escaped.
+
+    :param rows: The number of rows
+    :return: The raw data
+    """
+    return pd.DataFrame({
+        "Question Number": range(rows),
+        "Question": [f"Is <b>{i}</b> & \"{i + 1}\" the 'answer'?" for i in range(rows)],
+        "Answer 1": ["True"] * rows,
+        "Answer 2": ["False"] * rows,
+        "Answer 3": [f"<{i}>" for i in range(rows)],
+        "Answer 4": [None] * rows,
+        "Answer 5": [""] * rows,
+        "Answer 6": [""] * rows,
+        "Correct Answers": ["True"] * rows,
+        "Player": ["Player <A>"] * rows,
+        "Answer Time (seconds)": [1.5] * rows,
+    })
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the HTML escaping of df_processing")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help=f"Rows of the sheet. Default: {DEFAULT_ROWS}")
+    args = parser.parse_args()
+
+    df = make_sheet(args.rows)
+
+    start = time.perf_counter()
+    result = df_processing(df)
+    elapsed = time.perf_counter() - start
+
+    # reference: escape every cell with html.escape
+    start = time.perf_counter()
+    expected = df.fillna("").map(lambda x: html.escape(x) if isinstance(x, str) else x)
+    expected_answers = expected[[f"Answer {i}" for i in range(1, 7)]].astype(str).agg("<br>".join, axis=1)
+    reference_elapsed = time.perf_counter() - start
+
+    assert list(result["Question"]) == list(expected["Question"])
+    assert list(result["Possible Answers"]) == list(expected_answers)
+    assert list(result["Correct Answers"]) == list(expected["Correct Answers"])
+
+    print(f"{'method':<24} {'seconds':>8}")
+    print(f"{'df_processing':<24} {elapsed:>8.3f}")
+    print(f"{'per-cell html.escape':<24} {reference_elapsed:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
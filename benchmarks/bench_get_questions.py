@@ -0,0 +1,82 @@
+"""
+Benchmark for the accumulation in get_questions.
+
+The workbooks are generated in memory and handed to get_questions in place of the
+Excel reader, so the numbers show how the merge of the per-file results scales with
+the number of input files and are not dominated by openpyxl.
+
+Run with:
+    python -m benchmarks.bench_get_questions
+"""
+# Standard library imports
+import argparse
+import time
+from typing import Callable, List
+from unittest import mock
+
+# Third-party library imports
+import pandas as pd
+
+from benchmarks.synthetic import make_raw_data
+from kahoot_to_anki import processing
+
+DEFAULT_SIZES = [10, 100, 1000, 5000]
+QUESTIONS_PER_WORKBOOK = 20
+PLAYERS_PER_QUESTION = 5
+
+
+def legacy_get_questions(input_directory: str, sheet_name: str) -> pd.DataFrame:
+    """
+    The previous implementation which concatenated the output once per workbook.
+    """
+    out = pd.DataFrame(columns=processing.QUESTION_COLUMNS)
+    for file in processing.get_excels(input_directory):
+        df = processing.get_excel_data(excel_file=file, sheet_name=sheet_name)
+        if df is None:
+            continue
+        df = processing.df_processing(df)
+        out = pd.concat([out, df], axis=0, ignore_index=True)
+    return out.drop_duplicates(subset=["Question"])
+
+
+def run(func: Callable[[str, str], pd.DataFrame], workbooks: List[pd.DataFrame]) -> float:
+    """
+    Times one call of the given get_questions implementation over the workbooks.
+
+    :param func: The get_questions implementation
+    :param workbooks: The raw data of the synthetic workbooks
+    :return: The elapsed wall time in seconds
+    """
+    files = [f"quiz{i}.xlsx" for i in range(len(workbooks))]
+    data = dict(zip(files, workbooks))
+
+    with mock.patch.object(processing, "get_excels", return_value=iter(files)), \
+            mock.patch.object(processing, "get_excel_data",
+                              side_effect=lambda excel_file, sheet_name, **kwargs: data[excel_file].copy()):
+        start = time.perf_counter()
+        func("./data", "RawReportData Data")
+        return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the accumulation in get_questions")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help=f"Numbers of workbooks to benchmark. Default: {DEFAULT_SIZES}")
+    parser.add_argument("--legacy", action="store_true",
+                        help="Also time the previous implementation with a pd.concat per workbook.")
+    args = parser.parse_args()
+
+    print(f"{'workbooks':>10} {'seconds':>10} {'ms/workbook':>12}" + (f" {'legacy s':>10}" if args.legacy else ""))
+    for size in args.sizes:
+        workbooks = [
+            make_raw_data(questions=QUESTIONS_PER_WORKBOOK, players=PLAYERS_PER_QUESTION, quiz=i) for i in range(size)
+        ]
+        elapsed = run(processing.get_questions, workbooks)
+        line = f"{size:>10} {elapsed:>10.3f} {elapsed / size * 1000:>12.3f}"
+        if args.legacy:
+            line += f" {run(legacy_get_questions, workbooks):>10.3f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Memory benchmark of the question set kept between get_questions and make_anki.
+
+Builds a synthetic set of processed questions and reports the bytes per question of the
+representations: object columns (pandas before 3.0), the str dtype with Python or pyarrow storage
+(the default of pandas 3.0 if pyarrow is installed), and compact_questions, which stores the repetitive
+answer columns as categoricals.
+A share of the questions are true/false questions and the correct answers are drawn from a
+limited vocabulary, like in real quizzes.
+
+Run with:
+    python -m benchmarks.bench_memory --questions 1000000
+"""
+# Standard library imports
+import argparse
+import importlib.util
+import random
+import time
+from functools import partial
+from typing import Callable, Dict
+
+# Third-party library imports
+import pandas as pd
+
+from kahoot_to_anki.processing import compact_questions
+
+DEFAULT_QUESTIONS = 1_000_000
+TRUE_FALSE_SHARE = 0.3
+VOCABULARY_SIZE = 2000
+OPTIONS_PER_QUESTION = 4
+
+
+def make_questions(questions: int, seed: int = 0) -> Dict[str, list]:
+    """
+    Creates the columns of a synthetic processed question set.
+
+    :param questions: The number of questions
+    :param seed: The seed of the random answers
+    :return: The values of the Question, Possible Answers and Correct Answers columns
+    """
+    rng = random.Random(seed)
+    vocabulary = [f"answer {i}" for i in range(VOCABULARY_SIZE)]
+    columns: Dict[str, list] = {"Question": [], "Possible Answers": [], "Correct Answers": []}
+    for number in range(questions):
+        columns["Question"].append(f"Question {number}: which {rng.choice(vocabulary)} is right?")
+        if rng.random() < TRUE_FALSE_SHARE:
+            # the joined strings are separate objects like the output of df_processing
+            columns["Possible Answers"].append("".join(["True<br>False", "<br><br><br><br>"]))
+            columns["Correct Answers"].append("".join(["Tr", "ue"]) if rng.random() < 0.5 else "".join(["Fal", "se"]))
+        else:
+            options = rng.sample(vocabulary, OPTIONS_PER_QUESTION)
+            columns["Possible Answers"].append("<br>".join(options + ["", ""]))
+            columns["Correct Answers"].append(options[0])
+    return columns
+
+
+def representations() -> Dict[str, Callable[[Dict[str, list]], pd.DataFrame]]:
+    """
+    Returns the builders of the compared representations by name.
+
+    :return: The functions creating a frame of each representation from the columns
+    """
+    storages = ["python"]
+    if importlib.util.find_spec("pyarrow") is not None:
+        storages.append("pyarrow")
+
+    builders = {"object": lambda columns: pd.DataFrame(columns, dtype=object)}
+    for storage in storages:
+        dtype = pd.StringDtype(storage, na_value=float("nan"))
+        builders[f"str[{storage}]"] = partial(pd.DataFrame, dtype=dtype)
+        builders[f"compact[{storage}]"] = lambda columns, dtype=dtype: compact_questions(
+            pd.DataFrame(columns, dtype=dtype)
+        )
+    return builders
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the memory of the processed questions")
+    parser.add_argument(
+        "--questions", type=int, default=DEFAULT_QUESTIONS, help=f"Number of questions. Default: {DEFAULT_QUESTIONS}"
+    )
+    args = parser.parse_args()
+
+    columns = make_questions(args.questions)
+    print(f"{'representation':<16} {'bytes/question':>15} {'total MB':>10} {'build s':>9}")
+    for name, build in representations().items():
+        start = time.perf_counter()
+        df = build(columns)
+        seconds = time.perf_counter() - start
+        # deep counts the Python string objects of object and str[python] columns
+        size = df.memory_usage(deep=True, index=False).sum()
+        print(f"{name:<16} {size / args.questions:>15.1f} {size / 1024 ** 2:>10.1f} {seconds:>9.2f}")
+        del df
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark suite of the conversion stages on synthetic Kahoot reports.
+
+Times get_excel_data (and read_input of the raw data in the other input formats), df_processing,
+get_questions and make_anki separately and the
+conversion end to end, on reports written by benchmarks.synthetic.
+
+Run with:
+    python -m benchmarks.bench_suite --files 20 --questions 30 --players 200 --rich-text
+"""
+# Standard library imports
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from benchmarks.synthetic import KAHOOT_SHEET_NAME, write_report
+from kahoot_to_anki.export import ARROW_FORMATS, EXPORT_FILES, EXPORT_FORMATS, write_exports
+from kahoot_to_anki.pipeline import run_pipeline
+from kahoot_to_anki.readers import read_input
+from kahoot_to_anki.processing import (
+    ANKI_WRITERS, EXCEL_READERS, df_processing, get_excel_data, get_questions, make_anki
+)
+
+
+def measure(func: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """
+    Calls the function repeat times.
+
+    :param func: The function to time
+    :param repeat: The number of calls
+    :return: The best and mean wall time in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {"best": min(times), "mean": statistics.mean(times)}
+
+
+def run_suite(
+    directory: str, files: int, questions: int, players: int, answers: int, rich_text: bool, repeat: int, jobs: int
+) -> Dict[str, Dict[str, float]]:
+    """
+    Writes the synthetic reports into the directory and times every stage.
+
+    :return: The timings by stage name
+    """
+    inp = os.path.join(directory, "input")
+    out = os.path.join(directory, "output")
+    os.makedirs(inp)
+    os.makedirs(out)
+    reports: List[str] = [
+        write_report(os.path.join(inp, f"quiz{i}.xlsx"), questions=questions, players=players, answers=answers,
+                     rich_text=rich_text, quiz=i)
+        for i in range(files)
+    ]
+
+    results = {}
+    for reader in EXCEL_READERS:
+        results[f"get_excel_data[{reader}]"] = measure(
+            lambda: get_excel_data(reports[0], sheet_name=KAHOOT_SHEET_NAME, reader=reader), repeat
+        )
+
+    raw = get_excel_data(reports[0], sheet_name=KAHOOT_SHEET_NAME)
+    raw_files = {"csv": lambda path: raw.to_csv(path, index=False),
+                 "jsonl": lambda path: raw.to_json(path, orient="records", lines=True)}
+    if importlib.util.find_spec("pyarrow") is not None:
+        raw_files.update(parquet=raw.to_parquet, feather=raw.to_feather)
+    for fmt, write in raw_files.items():
+        path = os.path.join(directory, f"raw.{fmt}")
+        write(path)
+        results[f"read_input[{fmt}]"] = measure(lambda: read_input(path), repeat)
+
+    results["df_processing"] = measure(lambda: df_processing(raw), repeat)
+
+    results["get_questions"] = measure(lambda: get_questions(inp, sheet_name=KAHOOT_SHEET_NAME, jobs=jobs), repeat)
+
+    df = get_questions(inp, sheet_name=KAHOOT_SHEET_NAME)
+    for writer in ANKI_WRITERS:
+        results[f"make_anki[{writer}]"] = measure(lambda: make_anki(df, out, "Benchmark", writer=writer), repeat)
+
+    for fmt in EXPORT_FORMATS:
+        if fmt in ARROW_FORMATS and importlib.util.find_spec("pyarrow") is None:
+            continue
+        results[f"export[{fmt}]"] = measure(lambda: write_exports(df, out, [fmt]), repeat)
+        results[f"read_input[{fmt}]"] = measure(lambda: read_input(os.path.join(out, EXPORT_FILES[fmt])), repeat)
+
+    def end_to_end() -> None:
+        questions_df = get_questions(inp, sheet_name=KAHOOT_SHEET_NAME, jobs=jobs)
+        questions_df.to_csv(os.path.join(out, EXPORT_FILES["csv"]), sep=";", index=False, encoding="utf-8-sig")
+        make_anki(questions_df, out, "Benchmark")
+
+    results["end_to_end"] = measure(end_to_end, repeat)
+    results["end_to_end[stream]"] = measure(
+        lambda: run_pipeline(inp, out, "Benchmark", KAHOOT_SHEET_NAME, export_csv=True, jobs=jobs), repeat
+    )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the conversion stages on synthetic Kahoot reports")
+    parser.add_argument("--files", type=int, default=10, help="Number of reports. Default: 10")
+    parser.add_argument("--questions", type=int, default=20, help="Questions per report. Default: 20")
+    parser.add_argument("--players", type=int, default=50, help="Players per report. Default: 50")
+    parser.add_argument("--answers", type=int, default=4, help="Possible answers per question (1-6). Default: 4")
+    parser.add_argument("--rich-text", action="store_true", help="Use Unicode and HTML-heavy text.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage. Default: 3")
+    parser.add_argument("--jobs", type=int, default=1, help="Worker processes of get_questions. Default: 1")
+    parser.add_argument("--json", help="Write the timings to this JSON file, e.g. to compare releases.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = run_suite(
+            directory, args.files, args.questions, args.players, args.answers, args.rich_text, args.repeat, args.jobs
+        )
+
+    print(f"{'stage':<28} {'best s':>10} {'mean s':>10}")
+    for stage, timing in results.items():
+        print(f"{stage:<28} {timing['best']:>10.4f} {timing['mean']:>10.4f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"parameters": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Generator of synthetic Kahoot reports for the benchmarks.
+
+The raw data has the columns of the "RawReportData Data" sheet of a Kahoot export:
+one row per question and player with the question, the answers and the player's result.
+"""
+# Standard library imports
+import random
+from typing import List, Optional
+
+# Third-party library imports
+import pandas as pd
+
+KAHOOT_SHEET_NAME = "RawReportData Data"
+MAX_ANSWERS = 6
+
+PLAIN_WORDS = ["list", "tuple", "loop", "function", "class", "module", "string", "integer", "value", "index"]
+# Unicode and text which needs HTML escaping
+RICH_WORDS = ["<b>bold</b>", "a & b", "\"quoted\"", "it's", "Größe", "naïve", "日本語", "emoji 🐍", "x < y > z", "€"]
+
+
+def make_raw_data(
+    questions: int = 20,
+    players: int = 30,
+    answers: int = 4,
+    rich_text: bool = False,
+    quiz: int = 0,
+    seed: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Creates the raw data of one synthetic Kahoot report.
+
+    :param questions: The number of questions
+    :param players: The number of players, i.e. the answer rows per question
+    :param answers: The number of possible answers per question (1 to 6)
+    :param rich_text: Use Unicode and HTML-heavy text for the questions and answers
+    :param quiz: The number of the quiz, used to make the questions unique across reports
+    :param seed: The seed of the random player answers, defaults to the quiz number
+    :return: A DataFrame shaped like the "RawReportData Data" sheet
+    """
+    if not 1 <= answers <= MAX_ANSWERS:
+        raise ValueError(f"answers must be between 1 and {MAX_ANSWERS}")
+
+    rng = random.Random(quiz if seed is None else seed)
+    words = RICH_WORDS if rich_text else PLAIN_WORDS
+
+    rows = []
+    totals = [0] * players
+    for number in range(1, questions + 1):
+        question = f"Question {number} of quiz {quiz}: what is the {rng.choice(words)} of {rng.choice(words)}?"
+        options: List[Optional[str]] = [f"{rng.choice(words)} {i}" for i in range(answers)]
+        options += [None] * (MAX_ANSWERS - answers)
+        correct = options[rng.randrange(answers)]
+
+        for player in range(players):
+            answer = options[rng.randrange(answers)]
+            is_correct = answer == correct
+            score = rng.randint(500, 1000) if is_correct else 0
+            totals[player] += score
+            answer_time = round(rng.uniform(0.5, 20), 3)
+            rows.append([
+                f"{number} Quiz", question, *options, correct, 20, f"Player {player}", answer,
+                "Correct" if is_correct else "Incorrect", int(is_correct), int(not is_correct),
+                score, score, totals[player], f"{answer_time / 20:.2%}", answer_time,
+            ])
+
+    return pd.DataFrame(rows, columns=[
+        "Question Number", "Question", "Answer 1", "Answer 2", "Answer 3", "Answer 4", "Answer 5", "Answer 6",
+        "Correct Answers", "Time Allotted to Answer (seconds)", "Player", "Answer", "Correct / Incorrect",
+        "Correct", "Incorrect", "Score (points)", "Score without Answer Streak Bonus (points)",
+        "Current Total Score (points)", "Answer Time (%)", "Answer Time (seconds)",
+    ])
+
+
+def write_report(path: str, **kwargs) -> str:
+    """
+    Writes a synthetic Kahoot report as Excel file, see make_raw_data for the arguments.
+
+    :param path: The path of the Excel file
+    :return: The path of the Excel file
+    """
+    make_raw_data(**kwargs).to_excel(path, sheet_name=KAHOOT_SHEET_NAME, index=False)
+    return path
@@ -0,0 +1,167 @@
+# Standard library imports
+import asyncio
+import io
+import logging
+import os
+from concurrent.futures import Executor
+from functools import partial
+from typing import IO, Iterable, Optional, Tuple, Union
+
+from kahoot_to_anki.constants import DEFAULT_WRITER
+from kahoot_to_anki.processing import get_questions, make_anki
+from kahoot_to_anki.readers import InputSource, MemoryFile
+
+
+# Constants
+DEFAULT_SHEET_NAME = "RawReportData Data"
+DEFAULT_TITLE = "Kahoot"
+# Extensions of the inputs without a file name by the first bytes of their content, other inputs are text
+SIGNATURE_EXTENSIONS = [(b"PK\x03\x04", ".xlsx"), (b"PAR1", ".parquet"), (b"ARROW1", ".feather")]
+# Bytes of the content read to guess the extension, enough for the signatures and leading whitespace of JSON Lines
+SIGNATURE_SIZE = 64
+
+# The content of an input file and an input of convert: a path, the content, or a (file name, content) pair
+# whose extension selects the reader, see kahoot_to_anki.readers
+InputData = Union[bytes, bytearray, memoryview, IO[bytes]]
+Input = Union[str, "os.PathLike[str]", InputData, Tuple[str, InputData]]
+
+
+def guess_extension(data: bytes) -> str:
+    """
+    Returns the extension of an input without a file name, detected from its content.
+
+    :param data: The content of the input
+    :return: The extension of the reader, ".xlsx", ".parquet", ".feather", ".jsonl" or ".csv"
+    """
+    for signature, extension in SIGNATURE_EXTENSIONS:
+        if data.startswith(signature):
+            return extension
+    return ".jsonl" if data.lstrip(b"\xef\xbb\xbf \t\r\n").startswith(b"{") else ".csv"
+
+
+def memory_input(item: Input, index: int) -> InputSource:
+    """
+    Returns the input file of an input, in-memory inputs are read from memory without being copied to disk.
+
+    :param item: The input, see Input
+    :param index: The position of the input, names the inputs without a file name in the log
+    :return: The path of the input file or a MemoryFile
+    """
+    if isinstance(item, (str, os.PathLike)):
+        return os.fspath(item)
+
+    name = None
+    if isinstance(item, tuple):
+        name, item = item
+    elif hasattr(item, "read"):
+        # files opened from a path have its name, in-memory streams have none
+        name = getattr(item, "name", None)
+
+    if hasattr(item, "read") and not item.seekable():
+        item = item.read()
+    if hasattr(item, "read"):
+        # seekable file objects, e.g. spooled uploads, are read in place
+        item.seek(0)
+        head = item.read(SIGNATURE_SIZE)
+        item.seek(0)
+    else:
+        # bytes are shared with the readers, other bytes-like objects are copied once
+        item = item if isinstance(item, bytes) else bytes(item)
+        head = item[:SIGNATURE_SIZE]
+
+    if not isinstance(name, str) or not os.path.splitext(name)[1]:
+        name = f"input-{index}{guess_extension(head)}"
+    return MemoryFile(name, item)
+
+
+def convert_sync(
+    inputs: Iterable[Input],
+    title: str = DEFAULT_TITLE,
+    sheet_name: str = DEFAULT_SHEET_NAME,
+    reader: str = "pandas",
+    writer: str = DEFAULT_WRITER,
+    reproducible: bool = False,
+    only_below: Optional[float] = None,
+    order: str = "input",
+    out: Optional[IO[bytes]] = None,
+    analytics: bool = False,
+) -> Optional[bytes]:
+    """
+    Converts Kahoot reports to an Anki package and returns its content or writes it into a file object.
+    In-memory inputs are read from memory and the package is built in memory (see make_anki), so a conversion
+    of uploads into a buffer does not touch the disk and concurrent calls do not share any files.
+
+    :param inputs: The Kahoot reports (or the other input files), as paths, contents or (file name, content) pairs,
+        duplicated questions are dropped in the order of the inputs
+    :param title: The title of the Anki deck
+    :param sheet_name: The Excel sheet name with the Kahoot answers
+    :param reader: The Excel reader, one of EXCEL_READERS
+    :param writer: The package writer, one of ANKI_WRITERS
+    :param reproducible: Write a package with fixed timestamps and zip metadata, see make_anki
+    :param only_below: Only write the questions which less than this percent of the players answered correctly
+    :param order: The order of the notes, one of DECK_ORDERS
+    :param out: A writable binary file object the package is written into, by default its content is returned
+    :param analytics: Tag the notes with the analytics of the questions, implied by only_below and
+        order "difficulty", see get_questions
+    :return: The content of the .apkg file, or None if it was written into out
+    :raises ValueError: if the inputs contain no questions or no package was written
+    """
+    files = [memory_input(item, index) for index, item in enumerate(inputs)]
+    analytics = analytics or only_below is not None or order == "difficulty"
+    df = get_questions("", sheet_name, reader=reader, files=files, analytics=analytics)
+    if df.empty:
+        logging.error("No Kahoot questions found in the %d inputs", len(files))
+        raise ValueError("No Kahoot questions found in the inputs")
+
+    target = io.BytesIO() if out is None else out
+    if not make_anki(
+        df, target, title, writer=writer, reproducible=reproducible, only_below=only_below, order=order
+    ):
+        raise ValueError("No Anki package was written, see the log for the reason")
+    return target.getvalue() if out is None else None
+
+
+async def convert(
+    inputs: Iterable[Input],
+    title: str = DEFAULT_TITLE,
+    sheet_name: str = DEFAULT_SHEET_NAME,
+    reader: str = "pandas",
+    writer: str = DEFAULT_WRITER,
+    reproducible: bool = False,
+    only_below: Optional[float] = None,
+    order: str = "input",
+    out: Optional[IO[bytes]] = None,
+    executor: Optional[Executor] = None,
+    analytics: bool = False,
+) -> Optional[bytes]:
+    """
+    Converts Kahoot reports to an Anki package without blocking the event loop, see convert_sync.
+
+    The conversion runs in the executor, by default in the default executor of the event loop (a thread pool).
+    A ProcessPoolExecutor converts on several cores, its inputs have to be paths or bytes, which can be pickled.
+    The package is built into bytes in the executor and written into out by the calling process, so out does not
+    have to be shared with the executor.
+
+    :param inputs: The Kahoot reports, see convert_sync
+    :param title: The title of the Anki deck
+    :param sheet_name: The Excel sheet name with the Kahoot answers
+    :param reader: The Excel reader, one of EXCEL_READERS
+    :param writer: The package writer, one of ANKI_WRITERS
+    :param reproducible: Write a package with fixed timestamps and zip metadata, see make_anki
+    :param only_below: Only write the questions which less than this percent of the players answered correctly
+    :param order: The order of the notes, one of DECK_ORDERS
+    :param out: A writable binary file object the package is written into, see convert_sync
+    :param executor: The executor of the conversion, None for the default executor of the event loop
+    :param analytics: Tag the notes with the analytics of the questions, see convert_sync
+    :return: The content of the .apkg file, or None if it was written into out
+    :raises ValueError: if the inputs contain no questions or no package was written
+    """
+    task = partial(
+        convert_sync, list(inputs), title=title, sheet_name=sheet_name, reader=reader, writer=writer,
+        reproducible=reproducible, only_below=only_below, order=order, analytics=analytics,
+    )
+    package = await asyncio.get_running_loop().run_in_executor(executor, task)
+    if out is None:
+        return package
+    out.write(package)
+    return None
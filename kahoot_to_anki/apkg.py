@@ -0,0 +1,380 @@
+# Standard library imports
+import hashlib
+import itertools
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import zipfile
+from typing import IO, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+# Third-party library imports
+import genanki
+# internals of genanki, the supported versions are pinned in pyproject.toml
+from genanki.apkg_col import APKG_COL
+from genanki.apkg_schema import APKG_SCHEMA
+
+
+# Note as written by write_apkg: (GUID, fields) or (GUID, fields, tags)
+NoteRow = Union[Tuple[str, Sequence[str]], Tuple[str, Sequence[str], Sequence[str]]]
+# Where a package is written: the path of the .apkg file or a writable binary file object, e.g. io.BytesIO
+PackageTarget = Union[str, IO[bytes]]
+
+# Constants
+# Timestamp of the notes of reproducible packages if SOURCE_DATE_EPOCH is not set: 2000-01-01T00:00:00Z
+REPRODUCIBLE_TIMESTAMP = 946684800
+# The note and card IDs of reproducible packages are derived from the GUIDs below this limit, see reproducible_id
+REPRODUCIBLE_ID_LIMIT = 2 ** 53
+# Modification time of the zip entries of reproducible packages, the earliest time the zip format can store
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+ZIP_UNIX_SYSTEM = 3
+ZIP_FILE_MODE = 0o644
+# Whether the sqlite3 module can serialize a database to bytes (Python 3.11+), see temporary_collection
+SQLITE_SERIALIZE = hasattr(sqlite3.Connection, "serialize")
+
+
+def reproducible_timestamp() -> int:
+    """
+    Returns the timestamp of reproducible packages, taken from the SOURCE_DATE_EPOCH environment variable
+    (see https://reproducible-builds.org/specs/source-date-epoch/) or REPRODUCIBLE_TIMESTAMP.
+    The modification times of the input files are not used, they change on checkouts, copies and touches
+    of otherwise identical inputs.
+
+    :return: Seconds since the epoch
+    :raises ValueError: if SOURCE_DATE_EPOCH is not an integer
+    """
+    value = os.environ.get("SOURCE_DATE_EPOCH")
+    if value is None:
+        return REPRODUCIBLE_TIMESTAMP
+    try:
+        return int(value)
+    except ValueError:
+        logging.error("SOURCE_DATE_EPOCH must be an integer, got '%s'", value)
+        raise ValueError(f"Invalid SOURCE_DATE_EPOCH: {value}")
+
+
+def reproducible_id(guid: str, card_ord: Optional[int] = None) -> int:
+    """
+    Returns the ID of a note or card of a reproducible package, derived from the GUID of the note,
+    so the same note gets the same ID in every package and the notes of different packages do not collide.
+
+    :param guid: The GUID of the note
+    :param card_ord: The template of the card, None for the note
+    :return: The ID, a positive integer below REPRODUCIBLE_ID_LIMIT
+    """
+    key = guid if card_ord is None else f"{guid}\0{card_ord}"
+    digest = hashlib.sha256(key.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % (REPRODUCIBLE_ID_LIMIT - 1) + 1
+
+
+def reproducible_ids(package: genanki.Package) -> Iterator[int]:
+    """
+    Returns the IDs of the notes and cards of a reproducible genanki package,
+    in the order genanki.Package.write_to_db takes them: each note followed by its cards.
+
+    :param package: The decks of the package
+    :return: A generator of the IDs, see reproducible_id
+    """
+    for deck in package.decks:
+        for note in deck.notes:
+            yield reproducible_id(note.guid)
+            for card in note.cards:
+                yield reproducible_id(note.guid, card.ord)
+
+
+def zip_entry(name: str, size: int = 0) -> zipfile.ZipInfo:
+    """
+    Returns the metadata of a file in a reproducible package, independent of the time, the platform
+    and the permissions of the file.
+
+    :param name: The name of the file in the package
+    :param size: The size of the file, lets zipfile decide whether the entry needs the ZIP64 extension
+    :return: The zip entry
+    """
+    info = zipfile.ZipInfo(name, date_time=ZIP_DATE_TIME)
+    info.create_system = ZIP_UNIX_SYSTEM
+    info.external_attr = ZIP_FILE_MODE << 16
+    info.file_size = size
+    return info
+
+
+def add_file(outzip: zipfile.ZipFile, path: str, name: str, reproducible: bool) -> None:
+    """
+    Adds a file to a package, with the metadata of zip_entry if the package is reproducible.
+
+    :param outzip: The package
+    :param path: The path of the file
+    :param name: The name of the file in the package
+    :param reproducible: Whether the package is reproducible
+    :return: None
+    """
+    if not reproducible:
+        outzip.write(path, name)
+        return
+    with open(path, "rb") as src, outzip.open(zip_entry(name, os.path.getsize(path)), "w") as dst:
+        shutil.copyfileobj(src, dst)
+
+
+def temporary_collection(path: PackageTarget) -> Optional[str]:
+    """
+    Returns the path of a new temporary file for the SQLite collection of a package. The collection of a package
+    written into a file object is built in an in-memory database instead, so neither end touches the disk.
+    Without SQLITE_SERIALIZE, the collection is always built in a temporary file.
+
+    :param path: Where the package is written
+    :return: The path of the empty file or None if the collection is built in memory
+    """
+    if SQLITE_SERIALIZE and not isinstance(path, str):
+        return None
+    fd, db_path = tempfile.mkstemp(suffix=".anki2")
+    os.close(fd)
+    return db_path
+
+
+def write_package(
+    path: PackageTarget,
+    collection: Union[str, bytes],
+    media_files: Sequence[str] = (),
+    reproducible: bool = False,
+) -> None:
+    """
+    Zips a collection and its media files into an Anki package, with the same entries as genanki.Package.
+
+    :param path: The path of the .apkg file or a writable binary file object
+    :param collection: The path of the SQLite collection or the serialized collection
+    :param media_files: The paths of the media files, the file names are the names referenced by the notes
+    :param reproducible: Write the entries with fixed metadata instead of the modification times of the files,
+        so the same collection and media files always give the same bytes
+    :return: None
+    """
+    media = {str(index): os.path.basename(media_path) for index, media_path in enumerate(media_files)}
+    with zipfile.ZipFile(path, "w") as outzip:
+        if isinstance(collection, bytes):
+            name = zip_entry("collection.anki2", len(collection)) if reproducible else "collection.anki2"
+            outzip.writestr(name, collection)
+        else:
+            add_file(outzip, collection, "collection.anki2", reproducible)
+        outzip.writestr(zip_entry("media") if reproducible else "media", json.dumps(media))
+        for index, media_path in enumerate(media_files):
+            add_file(outzip, media_path, str(index), reproducible)
+
+
+def write_genanki_package(
+    package: genanki.Package, path: PackageTarget, timestamp: Optional[float] = None, reproducible: bool = False
+) -> None:
+    """
+    Writes a genanki package like genanki.Package.write_to_file, zipped with write_package.
+
+    :param package: The decks and media files
+    :param path: The path of the .apkg file or a writable binary file object, see temporary_collection
+    :param timestamp: Seconds since the epoch used for the modification times (and the IDs of packages which
+        are not reproducible), defaults to reproducible_timestamp() for reproducible packages and to now otherwise
+    :param reproducible: Write the same bytes for the same decks and media files, with the IDs of reproducible_ids
+    :return: None
+    """
+    if timestamp is None:
+        timestamp = reproducible_timestamp() if reproducible else time.time()
+    ids = reproducible_ids(package) if reproducible else itertools.count(int(timestamp * 1000))
+    db_path = temporary_collection(path)
+    try:
+        conn = sqlite3.connect(":memory:" if db_path is None else db_path)
+        try:
+            package.write_to_db(conn.cursor(), timestamp, ids)
+            conn.commit()
+            collection = conn.serialize() if db_path is None else db_path
+        finally:
+            conn.close()
+        write_package(path, collection, package.media_files, reproducible=reproducible)
+    finally:
+        if db_path is not None:
+            os.remove(db_path)
+
+
+class ApkgWriter:
+    """
+    Writes an Anki package without genanki's per-note code path.
+
+    The collection is created with the same schema, collection row, note type and deck as
+    genanki.Package.write_to_file in a temporary SQLite file with journaling and syncing disabled,
+    or in memory for a package written into a file object, see temporary_collection.
+    Notes can be added in batches with add_notes, each batch is inserted with executemany, and close
+    commits the single transaction and zips the collection into the package.
+    """
+
+    def __init__(
+        self,
+        path: PackageTarget,
+        model: genanki.Model,
+        deck_id: int,
+        title: str,
+        timestamp: Optional[float] = None,
+        reproducible: bool = False,
+    ):
+        """
+        :param path: The path of the .apkg file or a writable binary file object
+        :param model: The note type of all notes
+        :param deck_id: The ID of the Anki deck
+        :param title: The name of the Anki deck
+        :param timestamp: Seconds since the epoch used for the modification times (and the IDs of packages which
+            are not reproducible), defaults to reproducible_timestamp() for reproducible packages and to now otherwise
+        :param reproducible: Write the same bytes for the same notes and media files, see write_package,
+            with the note and card IDs derived from the GUIDs, see reproducible_id
+        """
+        self.path = path
+        self.model = model
+        self.deck_id = deck_id
+        self.reproducible = reproducible
+        self.notes_cnt = 0
+        self.media_files: List[str] = []
+        if timestamp is None:
+            timestamp = reproducible_timestamp() if reproducible else time.time()
+        self.timestamp = timestamp
+        self._next_id = int(self.timestamp * 1000)
+        # the cards of a note are generated when any/all of the required fields are not empty
+        self._requirements = [
+            (card_ord, {"any": any, "all": all}[op], fields) for card_ord, op, fields in model._req
+        ]
+
+        self._db_path = temporary_collection(path)
+        self._conn = sqlite3.connect(":memory:" if self._db_path is None else self._db_path, isolation_level=None)
+        try:
+            self._conn.execute("PRAGMA journal_mode = OFF")
+            self._conn.execute("PRAGMA synchronous = OFF")
+            self._conn.executescript(APKG_SCHEMA)
+            self._conn.executescript(APKG_COL)
+            self._conn.execute("BEGIN")
+            self._write_deck(title)
+        except Exception:
+            self.discard()
+            raise
+
+    def __enter__(self) -> "ApkgWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def add_notes(self, notes: Iterable[NoteRow]) -> None:
+        """
+        Inserts the notes and their cards.
+        IDs are assigned in the same order as genanki: each note followed by its cards,
+        or derived from the GUIDs in reproducible packages.
+
+        :param notes: The GUID, fields and optional tags of each note
+        :return: None
+        """
+        model = self.model
+        mod = int(self.timestamp)
+        note_rows = []
+        card_rows = []
+        for guid, fields, *tags in notes:
+            note_id = self._new_id(guid)
+            # tags are separated and enclosed by spaces like in genanki
+            note_rows.append((
+                note_id, guid, model.model_id, mod, -1, f" {' '.join(tags[0] if tags else ())} ", "\x1f".join(fields),
+                fields[model.sort_field_index], 0, 0, "",
+            ))
+            for card_ord, op, required in self._requirements:
+                if op(fields[i] for i in required):
+                    card_rows.append((
+                        self._new_id(guid, card_ord), note_id, self.deck_id, card_ord, mod, -1,
+                        0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, "",
+                    ))
+
+        self._conn.executemany("INSERT INTO notes VALUES(?,?,?,?,?,?,?,?,?,?,?)", note_rows)
+        self._conn.executemany("INSERT INTO cards VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)", card_rows)
+        self.notes_cnt += len(note_rows)
+
+    def add_media(self, media_files: Iterable[str]) -> None:
+        """
+        Adds media files to the package, files which were added before are skipped.
+
+        :param media_files: The paths of the files, the file names are the names referenced by the notes
+        :return: None
+        """
+        known = set(self.media_files)
+        for path in media_files:
+            if path not in known:
+                known.add(path)
+                self.media_files.append(path)
+
+    def close(self) -> None:
+        """
+        Commits the collection and writes the package with the media files, like genanki.Package.
+
+        :return: None
+        """
+        try:
+            self._conn.execute("COMMIT")
+            collection = self._conn.serialize() if self._db_path is None else self._db_path
+            self._conn.close()
+            write_package(self.path, collection, self.media_files, reproducible=self.reproducible)
+        finally:
+            self.discard()
+
+    def discard(self) -> None:
+        """
+        Removes the temporary collection without writing the package.
+
+        :return: None
+        """
+        self._conn.close()
+        if self._db_path is not None and os.path.exists(self._db_path):
+            os.remove(self._db_path)
+
+    def _new_id(self, guid: str, card_ord: Optional[int] = None) -> int:
+        """
+        Returns the ID of a new note or card, see reproducible_id.
+        """
+        if self.reproducible:
+            return reproducible_id(guid, card_ord)
+        new_id = self._next_id
+        self._next_id += 1
+        return new_id
+
+    def _write_deck(self, title: str) -> None:
+        """
+        Adds the deck and the note type to the collection row, like genanki.Deck.write_to_db.
+        """
+        deck = genanki.Deck(self.deck_id, title)
+
+        decks_json, models_json = self._conn.execute("SELECT decks, models FROM col").fetchone()
+        decks = json.loads(decks_json)
+        decks[str(self.deck_id)] = deck.to_json()
+        models = json.loads(models_json)
+        models[str(self.model.model_id)] = self.model.to_json(self.timestamp, self.deck_id)
+        self._conn.execute("UPDATE col SET decks = ?, models = ?", (json.dumps(decks), json.dumps(models)))
+
+
+def write_apkg(
+    path: PackageTarget,
+    model: genanki.Model,
+    deck_id: int,
+    title: str,
+    notes: Iterable[NoteRow],
+    timestamp: Optional[float] = None,
+    media_files: Sequence[str] = (),
+    reproducible: bool = False,
+) -> None:
+    """
+    Writes an Anki package with all notes inserted in one batch, see ApkgWriter.
+
+    :param path: The path of the .apkg file or a writable binary file object
+    :param model: The note type of all notes
+    :param deck_id: The ID of the Anki deck
+    :param title: The name of the Anki deck
+    :param notes: The GUID, fields and optional tags of each note
+    :param timestamp: Seconds since the epoch used for the modification times, see ApkgWriter
+    :param media_files: The paths of the media files of the package
+    :param reproducible: Write the same bytes for the same notes and media files, see ApkgWriter
+    :return: None
+    """
+    with ApkgWriter(path, model, deck_id, title, timestamp=timestamp, reproducible=reproducible) as writer:
+        writer.add_notes(notes)
+        writer.add_media(media_files)
@@ -0,0 +1,217 @@
+# Standard library imports
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from kahoot_to_anki.cache import ParseCache
+from kahoot_to_anki.cli import DEFAULT_DECK_TITLE, KAHOOT_EXCEL_SHEET_NAME_RAW_DATA, validation
+from kahoot_to_anki.export import EXPORT_FORMATS, export_formats, write_exports
+from kahoot_to_anki.processing import get_questions, make_anki
+from kahoot_to_anki.stats import Stats
+
+
+# Keys of a line in the jobs file
+BATCH_JOB_KEYS = {"input", "output", "title", "sheet", "csv", "export"}
+
+
+@dataclass
+class BatchJob:
+    input_path: str
+    output_path: str
+    deck_title: str = DEFAULT_DECK_TITLE
+    sheet: str = KAHOOT_EXCEL_SHEET_NAME_RAW_DATA
+    export_csv: bool = False
+    exports: Tuple[str, ...] = ()
+
+
+@dataclass
+class JobResult:
+    job: BatchJob
+    questions: int
+    # time the job took in the worker
+    seconds: float
+    # time from the start of the batch until the job finished, including the time it waited for a worker
+    latency: float = 0.0
+    error: Optional[str] = None
+
+
+def read_jobs(path: str) -> List[BatchJob]:
+    """
+    Reads the jobs file. Every non-empty line is a JSON object with the keys "input" and "output" and
+    optionally "title", "sheet", "csv" and "export" (a list of EXPORT_FORMATS), e.g.
+    {"input": "class-a/", "output": "decks/class-a/", "title": "Class A"}.
+    Relative paths are relative to the current working directory.
+
+    :param path: The path of the jobs file (JSON Lines)
+    :return: The jobs in file order
+    """
+    jobs = []
+    outputs = set()
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as e:
+                logging.error("Invalid JSON in line %d of jobs file '%s': %s", line_number, path, str(e))
+                raise ValueError(f"Invalid JSON in line {line_number} of jobs file {path}") from e
+
+            if not isinstance(entry, dict) or "input" not in entry or "output" not in entry:
+                logging.error("Line %d of jobs file '%s' needs an input and an output", line_number, path)
+                raise ValueError(f"Line {line_number} of jobs file {path} needs an input and an output")
+            unknown = set(entry) - BATCH_JOB_KEYS
+            if unknown:
+                logging.error("Unknown keys %s in line %d of jobs file '%s'", sorted(unknown), line_number, path)
+                raise ValueError(f"Unknown keys {sorted(unknown)} in line {line_number} of jobs file {path}")
+
+            job = BatchJob(
+                input_path=os.path.abspath(entry["input"]),
+                output_path=os.path.abspath(entry["output"]),
+                deck_title=entry.get("title", DEFAULT_DECK_TITLE),
+                sheet=entry.get("sheet", KAHOOT_EXCEL_SHEET_NAME_RAW_DATA),
+                export_csv=bool(entry.get("csv", False)),
+                exports=tuple(parse_exports(entry.get("export", ()))),
+            )
+            unknown = set(job.exports) - set(EXPORT_FORMATS)
+            if unknown:
+                logging.error(
+                    "Unknown export formats %s in line %d of jobs file '%s'", sorted(unknown), line_number, path
+                )
+                raise ValueError(f"Unknown export formats {sorted(unknown)} in line {line_number} of jobs file {path}")
+            # every job writes anki.apkg, so two jobs with the same output would overwrite each other
+            if job.output_path in outputs:
+                logging.error("Output '%s' is used by more than one job", job.output_path)
+                raise ValueError(f"Output {job.output_path} is used by more than one job")
+            outputs.add(job.output_path)
+            jobs.append(job)
+    return jobs
+
+
+def parse_exports(exports) -> List[str]:
+    """
+    Returns the export formats of a job, given as list or comma-separated like the --export argument.
+
+    :param exports: The "export" value of the job
+    :return: The export formats
+    """
+    if isinstance(exports, str):
+        exports = exports.split(",")
+    return [str(fmt).strip() for fmt in exports if str(fmt).strip()]
+
+
+def run_job(job: BatchJob, reader: str = "pandas", writer: str = "genanki",
+            cache: Optional[ParseCache] = None, reproducible: bool = False, analytics: bool = False) -> JobResult:
+    """
+    Converts the Kahoot exports of one job to the Anki package (and export files).
+    Errors are logged and returned in the result, so one broken job does not stop the batch.
+
+    :param job: The job
+    :param reader: The Excel reader, see get_excel_data
+    :param writer: The Anki package writer, see make_anki
+    :param cache: The parse cache or None to parse every file
+    :param reproducible: Write a package with fixed timestamps and zip metadata, see make_anki
+    :param analytics: Tag the notes with the analytics of the questions, see get_questions
+    :return: The result of the job
+    """
+    start = time.perf_counter()
+    questions = 0
+    error = None
+    try:
+        validation(job.input_path, job.output_path)
+        df = get_questions(job.input_path, job.sheet, reader=reader, cache=cache, analytics=analytics)
+        questions = len(df)
+        if df.empty:
+            logging.warning("No Kahoot questions found in '%s'.", job.input_path)
+        else:
+            formats = export_formats(job.export_csv, job.exports)
+            if formats:
+                write_exports(df, job.output_path, formats)
+            if not make_anki(df, job.output_path, job.deck_title, writer=writer, reproducible=reproducible):
+                raise ValueError("Anki package not written, see the log for the reason")
+    except Exception as e:
+        logging.error("Job '%s' failed: %s", job.input_path, str(e))
+        error = str(e) or type(e).__name__
+    return JobResult(job=job, questions=questions, seconds=time.perf_counter() - start, error=error)
+
+
+def run_batch(jobs: List[BatchJob], workers: int = 1, reader: str = "pandas", writer: str = "genanki",
+              cache: Optional[ParseCache] = None, stats: Optional[Stats] = None,
+              reproducible: bool = False, analytics: bool = False) -> List[JobResult]:
+    """
+    Runs the jobs in this process or in a pool of worker processes, so pandas, openpyxl and genanki are
+    imported once per worker and not once per job.
+
+    :param jobs: The jobs
+    :param workers: The number of worker processes, 1 runs the jobs one after another in this process
+    :param reader: The Excel reader, see get_excel_data
+    :param writer: The Anki package writer, see make_anki
+    :param cache: The parse cache or None to parse every file
+    :param stats: Records the throughput and latency of each job
+    :param reproducible: Write the packages with fixed timestamps and zip metadata, see make_anki
+    :param analytics: Tag the notes with the analytics of the questions, see get_questions
+    :return: The results in the order of the jobs
+    """
+    start = time.perf_counter()
+    results: List[Optional[JobResult]] = [None] * len(jobs)
+
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+            futures = {
+                executor.submit(run_job, job, reader, writer, cache, reproducible, analytics): i
+                for i, job in enumerate(jobs)
+            }
+            for future in as_completed(futures):
+                result = future.result()
+                result.latency = time.perf_counter() - start
+                results[futures[future]] = result
+                log_result(result)
+    else:
+        for i, job in enumerate(jobs):
+            result = run_job(job, reader, writer, cache, reproducible, analytics)
+            result.latency = time.perf_counter() - start
+            results[i] = result
+            log_result(result)
+
+    if stats is not None:
+        for result in results:
+            stats.add_job(
+                input_path=result.job.input_path,
+                output_path=result.job.output_path,
+                questions=result.questions,
+                seconds=result.seconds,
+                latency_s=result.latency,
+                error=result.error,
+            )
+
+    elapsed = time.perf_counter() - start
+    failed = sum(1 for result in results if result.error)
+    questions = sum(result.questions for result in results)
+    logging.info(
+        "Batch: %d jobs (%d failed), %d questions in %.2fs (%.2f jobs/s, %.1f questions/s)",
+        len(jobs), failed, questions, elapsed,
+        len(jobs) / elapsed if elapsed else 0.0, questions / elapsed if elapsed else 0.0,
+    )
+    return results
+
+
+def log_result(result: JobResult) -> None:
+    """
+    Logs the throughput and latency of a finished job.
+
+    :param result: The result of the job
+    :return: None
+    """
+    if result.error:
+        logging.info("Job '%s' failed after %.2fs: %s", result.job.input_path, result.seconds, result.error)
+        return
+    logging.info(
+        "Job '%s' -> '%s': %d questions in %.2fs (%.1f questions/s, latency %.2fs)",
+        result.job.input_path, result.job.output_path, result.questions, result.seconds,
+        result.questions / result.seconds if result.seconds else 0.0, result.latency,
+    )
+
@@ -0,0 +1,149 @@
+# Standard library imports
+import hashlib
+import logging
+import os
+import pickle
+from typing import TYPE_CHECKING, Optional
+
+from kahoot_to_anki import __version__
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+# Constants
+CACHE_FILE_EXTENSION = ".pkl"
+DEFAULT_CACHE_MAX_SIZE = 512 * 1024 * 1024
+HASH_CHUNK_SIZE = 1024 * 1024
+# Version of the cached frames, increased when the columns of the processed questions change
+CACHE_FORMAT = 4
+
+
+def default_cache_directory() -> str:
+    """
+    Returns the default directory of the parse cache, following the XDG base directory specification.
+
+    :return: The path of the cache directory
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "kahoot-to-anki")
+
+
+class ParseCache:
+    """
+    On-disk cache of the processed questions of each Excel file.
+
+    Entries are pickled DataFrames named after a key which combines the size, modification time and
+    content hash of the file with the sheet name, the reader, the tool version and the CACHE_FORMAT.
+    The modification time of an entry is its last use, the least recently used entries are evicted
+    once the cache grows beyond max_size bytes.
+    """
+
+    def __init__(self, directory: str, max_size: int = DEFAULT_CACHE_MAX_SIZE):
+        """
+        :param directory: The cache directory, created if it does not exist
+        :param max_size: The maximum size of all cache entries in bytes
+        """
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, excel_file: str, sheet_name: str, reader: str, analytics: bool = False) -> str:
+        """
+        Returns the cache key of an Excel file.
+
+        :param excel_file: The path of the Excel file
+        :param sheet_name: The Excel sheet name with the Kahoot answers
+        :param reader: The Excel reader used to parse the file
+        :param analytics: Whether the questions have the analytics of the player rows
+        :return: The hex digest identifying the processed questions of the file
+        :raises OSError: if the file cannot be read
+        """
+        stat = os.stat(excel_file)
+        content = hashlib.sha256()
+        with open(excel_file, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                content.update(chunk)
+
+        key = hashlib.sha256()
+        parts = (
+            stat.st_size, stat.st_mtime_ns, content.hexdigest(), sheet_name, reader, analytics, __version__, CACHE_FORMAT
+        )
+        for part in parts:
+            key.update(str(part).encode("utf-8"))
+            key.update(b"\0")
+        return key.hexdigest()
+
+    def load(self, key: str) -> Optional["pd.DataFrame"]:
+        """
+        Returns the cached questions for the key and marks the entry as recently used.
+
+        :param key: The cache key
+        :return: The processed questions or None on a cache miss
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                df = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            logging.warning("Ignoring unreadable cache entry '%s': %s", path, str(e))
+            self.misses += 1
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        self.hits += 1
+        return df
+
+    def store(self, key: str, df: "pd.DataFrame") -> None:
+        """
+        Stores the processed questions under the key.
+
+        :param key: The cache key
+        :param df: The processed questions
+        :return: None
+        """
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning("Failed to write cache entry '%s': %s", path, str(e))
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def evict(self) -> None:
+        """
+        Removes the least recently used entries until the cache fits into max_size.
+
+        :return: None
+        """
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(CACHE_FILE_EXTENSION):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + CACHE_FILE_EXTENSION)
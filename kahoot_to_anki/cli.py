@@ -1,17 +1,32 @@
 # Standard library imports
 import argparse
 from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
 import logging
 import os
-import glob
+import importlib.util
+import re
 
 from kahoot_to_anki import __version__
+from kahoot_to_anki.cache import DEFAULT_CACHE_MAX_SIZE, default_cache_directory
+from kahoot_to_anki.constants import (
+    ANKI_WRITERS, ARROW_FORMATS, DECK_ORDERS, DEDUP_DIGEST_BITS, DEDUP_NORMALIZATIONS, DEFAULT_DEDUP_DIGEST_BITS,
+    DEFAULT_READER, DEFAULT_WRITER, EXCEL_READERS, EXPORT_FORMATS, SPLIT_MODES,
+)
+from kahoot_to_anki.discovery import DEFAULT_DISCOVER_THREADS, discover_files
+from kahoot_to_anki.readers import input_extensions
 
 
 # Constants
 DEFAULT_INPUT_DIRECTORY = "./data"
 DEFAULT_OUTPUT_DIRECTORY = "./"
 DEFAULT_DECK_TITLE = "Kahoot"
+DEFAULT_JOBS = os.cpu_count() or 1
+DEFAULT_CACHE_SIZE_MB = DEFAULT_CACHE_MAX_SIZE // (1024 * 1024)
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_DEBOUNCE = 2.0
+DEFAULT_POLL_INTERVAL = 1.0
+DEFAULT_MEDIA_WORKERS = 8
 KAHOOT_EXCEL_SHEET_NAME_RAW_DATA = "RawReportData Data"
 
 # Dataclass to hold CLI arguments
@@ -22,7 +37,42 @@ class CLIArgs:
     sheet: str
     export_csv: bool
     deck_title: str
-    
+    jobs: int
+    reader: str
+    cache: bool
+    cache_dir: str
+    cache_size: int
+    incremental: bool
+    writer: str
+    stream: bool
+    chunk_size: int
+    stats_json: Optional[str]
+    profile: Optional[str]
+    trace_memory: bool
+    batch: Optional[str] = None
+    split_by: Optional[str] = None
+    split_pattern: Optional[str] = None
+    dedup_normalize: Tuple[str, ...] = ()
+    dedup_answers: bool = False
+    dedup_bits: int = DEFAULT_DEDUP_DIGEST_BITS
+    dedup_index: Optional[str] = None
+    watch: bool = False
+    debounce: float = DEFAULT_DEBOUNCE
+    poll_interval: float = DEFAULT_POLL_INTERVAL
+    exports: Tuple[str, ...] = ()
+    recursive: bool = False
+    include: Tuple[str, ...] = ()
+    exclude: Tuple[str, ...] = ()
+    discover_threads: int = DEFAULT_DISCOVER_THREADS
+    media: bool = False
+    media_dir: Optional[str] = None
+    media_workers: int = DEFAULT_MEDIA_WORKERS
+    media_remote: bool = False
+    reproducible: bool = False
+    only_below: Optional[float] = None
+    order: str = "input"
+    analytics: bool = False
+
 
 def get_commandline_arguments() -> CLIArgs:
     """
@@ -48,6 +98,39 @@ def get_commandline_arguments() -> CLIArgs:
         "If not specified, the package will be created in the current working directory.",
         type=str,
     )
+    parser.add_argument(
+        "-r",
+        "--recursive",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Also read the input files in the subdirectories of the input directory (default: disabled).",
+    )
+    parser.add_argument(
+        "--include",
+        action="append",
+        default=[],
+        metavar="PATTERN",
+        help="Only read the input files whose path relative to the input directory matches this glob pattern, "
+        "e.g. '2024/*'. '*' also matches '/'. Can be given several times (default: all files).",
+        type=str,
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        default=[],
+        metavar="PATTERN",
+        help="Skip the input files and subdirectories whose path relative to the input directory matches this "
+        "glob pattern, e.g. '*/drafts/*'. Can be given several times. Excel lock files (~$*.xlsx) are always "
+        "skipped.",
+        type=str,
+    )
+    parser.add_argument(
+        "--discover-threads",
+        default=DEFAULT_DISCOVER_THREADS,
+        help="Number of threads listing the subdirectories with --recursive, more threads hide the latency "
+        f"of network file systems. Default: {DEFAULT_DISCOVER_THREADS}",
+        type=int,
+    )
     parser.add_argument(
         "--sheet",
         default=KAHOOT_EXCEL_SHEET_NAME_RAW_DATA,
@@ -60,6 +143,14 @@ def get_commandline_arguments() -> CLIArgs:
         default=False,
         help="Enable or disable CSV export of question data (default: disabled).",
     )
+    parser.add_argument(
+        "--export",
+        default="",
+        help="Comma-separated export formats of the question data, some of "
+        f"{', '.join(EXPORT_FORMATS)}. parquet and feather are compressed with zstd and need pyarrow. "
+        "The parquet, feather and jsonl exports can be read back as input (default: no export).",
+        type=str,
+    )
     parser.add_argument(
         "-t",
         "--title",
@@ -68,6 +159,218 @@ def get_commandline_arguments() -> CLIArgs:
         f"If not specified, the default deck name '{DEFAULT_DECK_TITLE}' will be used.",
         type=str,
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        default=DEFAULT_JOBS,
+        help="Number of worker processes used to read the Excel files. "
+        f"Default: number of CPUs ({DEFAULT_JOBS})",
+        type=int,
+    )
+    parser.add_argument(
+        "--reader",
+        default=DEFAULT_READER,
+        choices=EXCEL_READERS,
+        help="Excel reader. 'pandas' loads the whole sheet, 'streaming' reads the sheet row by row and keeps "
+        f"only the question columns and the first row of each question. Default: {DEFAULT_READER}",
+        type=str,
+    )
+    parser.add_argument(
+        "--cache",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Enable or disable the cache of the parsed Excel files (default: enabled).",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=default_cache_directory(),
+        help=f"Directory of the parse cache. Default: {default_cache_directory()}",
+        type=str,
+    )
+    parser.add_argument(
+        "--cache-size",
+        default=DEFAULT_CACHE_SIZE_MB,
+        help="Maximum size of the parse cache in megabytes, the least recently used entries are evicted. "
+        f"Default: {DEFAULT_CACHE_SIZE_MB}",
+        type=int,
+    )
+    parser.add_argument(
+        "--incremental",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Only write the questions which are new or changed since the last incremental run to the Anki "
+        "package, tracked in a manifest next to the package (default: disabled).",
+    )
+    parser.add_argument(
+        "--writer",
+        default=DEFAULT_WRITER,
+        choices=ANKI_WRITERS,
+        help="Anki package writer. 'genanki' writes the package with genanki, 'fast' bulk-inserts the notes "
+        f"into the SQLite collection. Default: {DEFAULT_WRITER}",
+        type=str,
+    )
+    parser.add_argument(
+        "--reproducible",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Write the Anki packages with a fixed timestamp (SOURCE_DATE_EPOCH if set), note IDs derived from "
+        "the GUIDs and fixed zip metadata, so the same questions always give byte-identical packages "
+        "(default: disabled).",
+    )
+    parser.add_argument(
+        "--only-below",
+        default=None,
+        help="Only write the questions which less than this percentage of the players answered correctly, "
+        "e.g. 60%% (default: all questions).",
+        type=str,
+    )
+    parser.add_argument(
+        "--order",
+        default="input",
+        choices=DECK_ORDERS,
+        help="Order of the notes. 'input' keeps the order of the input files, 'difficulty' starts with the "
+        "questions which the fewest players answered correctly. Default: input",
+        type=str,
+    )
+    parser.add_argument(
+        "--analytics",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Read the player rows of the raw data and tag the notes with the percent correct and average answer "
+        "time of each question, implied by --only-below and --order difficulty (default: disabled).",
+    )
+    parser.add_argument(
+        "--stream",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Stream the questions from the input files to the outputs in chunks, so the memory stays flat for "
+        "any number of input files. The package is always written with the fast writer (default: disabled).",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        default=DEFAULT_CHUNK_SIZE,
+        help=f"Number of questions written at once with --stream. Default: {DEFAULT_CHUNK_SIZE}",
+        type=int,
+    )
+    parser.add_argument(
+        "--split-by",
+        default=None,
+        choices=SPLIT_MODES,
+        help="Write one deck per input file, per input directory or per --split-pattern match instead of one "
+        "deck for all files. The files are read once, the decks are written by --jobs worker processes into "
+        "<key>.apkg as sub-decks '<title>::<key>' (default: one deck).",
+        type=str,
+    )
+    parser.add_argument(
+        "--split-pattern",
+        default=None,
+        help="Regular expression matched against the file names with --split-by pattern. The first group "
+        "(or the whole match) is the deck key, files which do not match are skipped.",
+        type=str,
+    )
+    parser.add_argument(
+        "--dedup-normalize",
+        default="",
+        help="Comma-separated normalization rules applied to the questions before they are compared to drop "
+        f"duplicates, some of {', '.join(DEDUP_NORMALIZATIONS)} (default: exact comparison).",
+        type=str,
+    )
+    parser.add_argument(
+        "--dedup-answers",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Only drop questions as duplicates if their answers are the same too (default: disabled).",
+    )
+    parser.add_argument(
+        "--dedup-bits",
+        default=DEFAULT_DEDUP_DIGEST_BITS,
+        choices=DEDUP_DIGEST_BITS,
+        help=f"Size of the question hashes of the deduplication. Default: {DEFAULT_DEDUP_DIGEST_BITS}",
+        type=int,
+    )
+    parser.add_argument(
+        "--dedup-index",
+        default=None,
+        help="Keep the question hashes in this file across runs, questions written by an earlier run are "
+        "dropped as duplicates.",
+        type=str,
+    )
+    parser.add_argument(
+        "--watch",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Keep running and update the Anki package (and CSV file) whenever Excel files are added to, "
+        "changed in or removed from the input directory. Only the new and modified files are read "
+        "(default: disabled).",
+    )
+    parser.add_argument(
+        "--debounce",
+        default=DEFAULT_DEBOUNCE,
+        help="With --watch, only read a file once it was not modified for this many seconds, so files which "
+        f"are still being copied are skipped. Default: {DEFAULT_DEBOUNCE}",
+        type=float,
+    )
+    parser.add_argument(
+        "--poll-interval",
+        default=DEFAULT_POLL_INTERVAL,
+        help="With --watch, seconds between two scans of the input directory if inotify is not available. "
+        f"Default: {DEFAULT_POLL_INTERVAL}",
+        type=float,
+    )
+    parser.add_argument(
+        "--media",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Add the images and videos of the 'Media' column of the raw data (paths relative to --media-dir "
+        "or URLs with --media-remote) to the Anki package. The files are downloaded or copied once into "
+        "<cache-dir>/media and stored by content hash (default: disabled).",
+    )
+    parser.add_argument(
+        "--media-dir",
+        default=None,
+        help="Directory of the media files with relative paths, implies --media. Default: working directory",
+        type=str,
+    )
+    parser.add_argument(
+        "--media-workers",
+        default=DEFAULT_MEDIA_WORKERS,
+        help=f"Number of concurrent media downloads and copies. Default: {DEFAULT_MEDIA_WORKERS}",
+        type=int,
+    )
+    parser.add_argument(
+        "--media-remote",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Download the media with http(s) URLs, implies --media (default: disabled).",
+    )
+    parser.add_argument(
+        "--stats-json",
+        default=None,
+        help="Write the wall time, CPU time, peak memory and row counts of each stage and input file "
+        "to this JSON file.",
+        type=str,
+    )
+    parser.add_argument(
+        "--profile",
+        default=None,
+        help="Profile the conversion with cProfile and write the profile to this file (readable with pstats).",
+        type=str,
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Trace the Python memory allocations with tracemalloc and add the peak of each stage and the top "
+        "allocation sites to --stats-json (default: disabled).",
+    )
+    parser.add_argument(
+        "--batch",
+        default=None,
+        help="Run the conversions listed in this JSON Lines file in one process instead of converting --inp. "
+        'Each line is a job like {"input": "...", "output": "...", "title": "...", "sheet": "...", "csv": true}. '
+        "--jobs sets the number of worker processes for the jobs.",
+        type=str,
+    )
     parser.add_argument(
         "--version",
         action="version",
@@ -76,24 +379,133 @@ def get_commandline_arguments() -> CLIArgs:
     )
     args = parser.parse_args()
 
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.cache_size < 0:
+        parser.error("--cache-size must not be negative")
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    if args.discover_threads < 1:
+        parser.error("--discover-threads must be at least 1")
+    if args.media_workers < 1:
+        parser.error("--media-workers must be at least 1")
+    media = args.media or args.media_dir is not None or args.media_remote
+    if media and args.batch:
+        parser.error("--batch cannot be combined with --media")
+    if args.media_dir is not None and not os.path.isdir(args.media_dir):
+        parser.error(f"--media-dir {args.media_dir} is not a directory")
+    if args.stream and args.incremental:
+        parser.error("--stream cannot be combined with --incremental")
+    only_below = None
+    if args.only_below is not None:
+        try:
+            only_below = float(args.only_below.strip().rstrip("%"))
+        except ValueError:
+            parser.error(f"--only-below {args.only_below} is not a percentage")
+        if not 0 <= only_below <= 100:
+            parser.error("--only-below must be between 0% and 100%")
+    if args.order != "input" and args.stream:
+        parser.error("--order difficulty cannot be combined with --stream")
+    if args.batch and (only_below is not None or args.order != "input"):
+        parser.error("--batch cannot be combined with --only-below or --order")
+    dedup_normalize = tuple(rule.strip() for rule in args.dedup_normalize.split(",") if rule.strip())
+    unknown_rules = set(dedup_normalize) - set(DEDUP_NORMALIZATIONS)
+    if unknown_rules:
+        parser.error(f"--dedup-normalize: unknown rules {', '.join(sorted(unknown_rules))}, "
+                     f"expected some of {', '.join(DEDUP_NORMALIZATIONS)}")
+    exports = tuple(fmt.strip() for fmt in args.export.split(",") if fmt.strip())
+    unknown_formats = set(exports) - set(EXPORT_FORMATS)
+    if unknown_formats:
+        parser.error(f"--export: unknown formats {', '.join(sorted(unknown_formats))}, "
+                     f"expected some of {', '.join(EXPORT_FORMATS)}")
+    if set(exports) & set(ARROW_FORMATS) and importlib.util.find_spec("pyarrow") is None:
+        parser.error("--export parquet and feather need pyarrow: pip install 'kahoot-to-anki[parquet]'")
+
+    dedup_options = dedup_normalize or args.dedup_answers or args.dedup_bits != DEFAULT_DEDUP_DIGEST_BITS or args.dedup_index
+    discover_options = args.recursive or args.include or args.exclude
+    if args.batch and (args.stream or args.incremental or args.split_by or dedup_options or discover_options):
+        parser.error("--batch cannot be combined with --stream, --incremental, --split-by, --dedup-* options, "
+                     "--recursive, --include or --exclude")
+    if args.split_by and args.dedup_index:
+        parser.error("--dedup-index cannot be combined with --split-by")
+    if args.watch and (args.batch or args.stream or args.split_by or args.dedup_index):
+        parser.error("--watch cannot be combined with --batch, --stream, --split-by or --dedup-index")
+    if args.watch and args.recursive:
+        parser.error("--watch only watches the top level of the input directory, it cannot be combined with "
+                     "--recursive")
+    if args.debounce < 0 or args.poll_interval <= 0:
+        parser.error("--debounce must not be negative and --poll-interval must be positive")
+    if args.split_by and args.stream:
+        parser.error("--split-by cannot be combined with --stream")
+    if (args.split_by == "pattern") != (args.split_pattern is not None):
+        parser.error("--split-pattern is required with and only allowed with --split-by pattern")
+    if args.split_pattern is not None:
+        try:
+            re.compile(args.split_pattern)
+        except re.error as e:
+            parser.error(f"--split-pattern is not a valid regular expression: {e}")
+
     return CLIArgs(
         input_path=os.path.abspath(args.inp),
         output_path=os.path.abspath(args.out),
         sheet=args.sheet,
         export_csv=args.csv,
-        deck_title=args.title
+        deck_title=args.title,
+        jobs=args.jobs,
+        reader=args.reader,
+        cache=args.cache,
+        cache_dir=os.path.abspath(args.cache_dir),
+        cache_size=args.cache_size * 1024 * 1024,
+        incremental=args.incremental,
+        writer=args.writer,
+        stream=args.stream,
+        chunk_size=args.chunk_size,
+        stats_json=os.path.abspath(args.stats_json) if args.stats_json else None,
+        profile=os.path.abspath(args.profile) if args.profile else None,
+        trace_memory=args.trace_memory,
+        batch=os.path.abspath(args.batch) if args.batch else None,
+        split_by=args.split_by,
+        split_pattern=args.split_pattern,
+        dedup_normalize=dedup_normalize,
+        dedup_answers=args.dedup_answers,
+        dedup_bits=args.dedup_bits,
+        dedup_index=os.path.abspath(args.dedup_index) if args.dedup_index else None,
+        watch=args.watch,
+        debounce=args.debounce,
+        poll_interval=args.poll_interval,
+        exports=exports,
+        recursive=args.recursive,
+        include=tuple(args.include),
+        exclude=tuple(args.exclude),
+        discover_threads=args.discover_threads,
+        media=media,
+        media_dir=os.path.abspath(args.media_dir) if args.media_dir else None,
+        media_workers=args.media_workers,
+        media_remote=args.media_remote,
+        reproducible=args.reproducible,
+        only_below=only_below,
+        order=args.order,
+        # the player columns are only read if the analytics are used
+        analytics=args.analytics or only_below is not None or args.order == "difficulty",
     )
 
 
-def validation(input_directory: str, output_directory: str) -> None:
+def validation(
+    input_directory: str, output_directory: str, require_excels: bool = True, files: Optional[Sequence[str]] = None
+) -> None:
     """
     This function validates the command line arguments, checking if the input path is a valid Excel file or directory
     and if the output path is a valid directory.
     The input path needs to be an Excel file or a directory that contains Excel files.
+    CSV, Parquet, Feather and JSON Lines files with the raw data or the exports of earlier runs are accepted
+    like Excel files.
     The output path needs to be a directory and not a file.
 
     :param input_directory: The path of the input Excel or directory
     :param output_directory: The path of the output directory
+    :param require_excels: Whether an input directory must already contain Excel files
+    :param files: The input files if they were already listed with discover_files, by default the top level
+        of the input directory is listed
     :return: None
     :rtype: None
     """
@@ -103,13 +515,14 @@ def validation(input_directory: str, output_directory: str) -> None:
         raise FileNotFoundError(f"Input directory {input_directory} does not exist!")
     elif (
         os.path.isfile(input_directory)
-        and os.path.splitext(input_directory)[-1] != ".xlsx"
+        and os.path.splitext(input_directory)[-1] not in input_extensions()
     ):
         logging.error("Input file is not an excel file!")
         raise ValueError("Input file is not an excel file!")
-    elif os.path.isdir(input_directory):
-        input_excels = os.path.join(input_directory, "*.xlsx")
-        if not glob.glob(input_excels):
+    elif os.path.isdir(input_directory) and require_excels:
+        if files is None:
+            files = discover_files(input_directory, input_extensions())
+        if not files:
             logging.error("Input directory does not contain any excel files!")
             raise FileNotFoundError("Input directory does not contain any excel files!")
 
@@ -0,0 +1,28 @@
+# Choices and defaults shared by the CLI and the conversion modules. This module has no dependencies,
+# so the CLI validates its arguments without importing pandas or genanki, see kahoot_to_anki.cli
+
+# Excel readers, see processing.get_excel_data
+EXCEL_READERS = ["pandas", "streaming"]
+DEFAULT_READER = "pandas"
+
+# Anki package writers, see processing.make_anki
+ANKI_WRITERS = ["genanki", "fast"]
+DEFAULT_WRITER = "genanki"
+
+# Orders of the notes of a deck, see processing.select_questions
+DECK_ORDERS = ["input", "difficulty"]
+
+# Groupings of the input files into decks, see split.group_key
+SPLIT_MODES = ["file", "directory", "pattern"]
+
+# Normalization rules and hash sizes of the duplicate detection, see dedup.DedupIndex
+DEDUP_NORMALIZATIONS = ["html", "unicode", "whitespace", "case"]
+DEDUP_DIGEST_BITS = [64, 128]
+DEFAULT_DEDUP_DIGEST_BITS = 128
+
+# Columns of the processed question data, see export.write_exports
+QUESTION_COLUMNS = ["Question", "Possible Answers", "Correct Answers"]
+
+# Export formats of the questions, the Arrow formats need pyarrow, see export.write_exports
+EXPORT_FORMATS = ["csv", "parquet", "feather", "jsonl"]
+ARROW_FORMATS = ["parquet", "feather"]
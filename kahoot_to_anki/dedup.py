@@ -0,0 +1,214 @@
+# Standard library imports
+import hashlib
+import html
+import json
+import logging
+import os
+import re
+import tempfile
+import unicodedata
+from typing import TYPE_CHECKING, Iterable, List, Optional, Sequence, Set
+
+from kahoot_to_anki.constants import DEDUP_DIGEST_BITS, DEDUP_NORMALIZATIONS, DEFAULT_DEDUP_DIGEST_BITS
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+# Normalization rules of the question text, applied in this order, see DedupIndex.normalize
+#   html:       unescape the HTML entities and drop the tags, e.g. "&lt;b&gt;A &amp; B&lt;/b&gt;" -> " A & B "
+#   unicode:    NFKC normalization, e.g. full-width and composed characters
+#   whitespace: collapse runs of whitespace and strip the ends
+#   case:       case-insensitive comparison (str.casefold)
+# The rules (DEDUP_NORMALIZATIONS) and the hash sizes (DEDUP_DIGEST_BITS) are in kahoot_to_anki.constants
+
+# Header of the persisted index, followed by a JSON line with the settings and the packed digests
+DEDUP_INDEX_MAGIC = b"KTADEDUP1\n"
+
+HTML_TAG = re.compile(r"</?[a-zA-Z][^<>]*>")
+WHITESPACE = re.compile(r"\s+")
+
+
+class DedupIndex:
+    """
+    Set of the hashes of the questions seen so far, used to drop duplicated questions.
+
+    Only a 64- or 128-bit BLAKE2 hash of each normalized question (and optionally its answers) is kept,
+    so the memory does not grow with the length of the questions and the index can be filled frame by frame
+    and saved for the next run.
+    """
+
+    def __init__(
+        self,
+        normalize: Sequence[str] = (),
+        include_answers: bool = False,
+        digest_bits: int = DEFAULT_DEDUP_DIGEST_BITS,
+    ):
+        unknown = set(normalize) - set(DEDUP_NORMALIZATIONS)
+        if unknown:
+            raise ValueError(f"Unknown normalization {sorted(unknown)}, expected some of {DEDUP_NORMALIZATIONS}")
+        if digest_bits not in DEDUP_DIGEST_BITS:
+            raise ValueError(f"Digest size must be one of {DEDUP_DIGEST_BITS} bits")
+
+        self.normalize_rules = [rule for rule in DEDUP_NORMALIZATIONS if rule in normalize]
+        self.include_answers = include_answers
+        self.digest_bits = digest_bits
+        # the digests are kept as ints, which are smaller than bytes objects of the same length
+        self.digests: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self.digests)
+
+    @property
+    def settings(self) -> dict:
+        """The settings which have to match to reuse a persisted index."""
+        return {
+            "normalize": self.normalize_rules,
+            "include_answers": self.include_answers,
+            "digest_bits": self.digest_bits,
+        }
+
+    def normalize(self, text: str) -> str:
+        """
+        Applies the normalization rules to a text.
+
+        :param text: The (HTML-escaped) question or answer text
+        :return: The normalized text
+        """
+        text = str(text)
+        if "html" in self.normalize_rules:
+            # the questions are HTML-escaped by df_processing, so the markup is only visible after unescaping
+            text = HTML_TAG.sub(" ", html.unescape(text))
+        if "unicode" in self.normalize_rules:
+            text = unicodedata.normalize("NFKC", text)
+        if "whitespace" in self.normalize_rules:
+            text = WHITESPACE.sub(" ", text).strip()
+        if "case" in self.normalize_rules:
+            text = text.casefold()
+        return text
+
+    def digest(self, question: str, possible_answers: str = "", correct_answers: str = "") -> int:
+        """
+        Returns the hash of a question. With include_answers, the set of the possible answers
+        (in any order) and the correct answers are part of the hash.
+
+        :param question: The question
+        :param possible_answers: The possible answers, separated by "<br>"
+        :param correct_answers: The correct answers
+        :return: The hash as int
+        """
+        key = self.normalize(question)
+        if self.include_answers:
+            answers = sorted(self.normalize(answer) for answer in str(possible_answers).split("<br>"))
+            key = "\x1f".join([key, "\x1e".join(answers), self.normalize(correct_answers)])
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=self.digest_bits // 8).digest()
+        return int.from_bytes(digest, "big")
+
+    def add(self, question: str, possible_answers: str = "", correct_answers: str = "") -> bool:
+        """
+        Adds a question to the index.
+
+        :return: True if the question was not in the index yet
+        """
+        digest = self.digest(question, possible_answers, correct_answers)
+        if digest in self.digests:
+            return False
+        self.digests.add(digest)
+        return True
+
+    def mask(self, df: "pd.DataFrame") -> List[bool]:
+        """
+        Adds the questions of a frame to the index.
+
+        :param df: The processed questions
+        :return: True for the questions which were not seen before, i.e. the rows to keep
+        """
+        questions = df["Question"].tolist()
+        if self.include_answers:
+            rows: Iterable = zip(questions, df["Possible Answers"].tolist(), df["Correct Answers"].tolist())
+        else:
+            rows = zip(questions)
+        return [self.add(*row) for row in rows]
+
+    def filter(self, df: "pd.DataFrame") -> "pd.DataFrame":
+        """
+        Drops the questions of the frame which were seen before, like drop_duplicates(subset=["Question"])
+        across all frames added to the index.
+
+        :param df: The processed questions
+        :return: The frame without the duplicated questions
+        """
+        return df[self.mask(df)]
+
+    def save(self, path: str) -> None:
+        """
+        Writes the index to a file, replacing it atomically.
+
+        :param path: The path of the index file
+        :return: None
+        """
+        size = self.digest_bits // 8
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(DEDUP_INDEX_MAGIC)
+                f.write(json.dumps(self.settings).encode("utf-8") + b"\n")
+                f.write(b"".join(digest.to_bytes(size, "big") for digest in self.digests))
+            os.replace(tmp, path)
+        except OSError as e:
+            logging.error("Failed to write dedup index '%s': %s", path, str(e))
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    @classmethod
+    def load(cls, path: str) -> "DedupIndex":
+        """
+        Reads an index written by save.
+
+        :param path: The path of the index file
+        :return: The index with the settings it was written with
+        """
+        with open(path, "rb") as f:
+            if f.readline() != DEDUP_INDEX_MAGIC:
+                raise ValueError(f"{path} is not a dedup index")
+            try:
+                settings = json.loads(f.readline())
+                index = cls(settings["normalize"], settings["include_answers"], settings["digest_bits"])
+            except (ValueError, KeyError, TypeError) as e:
+                raise ValueError(f"Invalid settings in dedup index {path}") from e
+            data = f.read()
+
+        size = index.digest_bits // 8
+        if len(data) % size:
+            raise ValueError(f"Truncated dedup index {path}")
+        index.digests = {int.from_bytes(data[i:i + size], "big") for i in range(0, len(data), size)}
+        return index
+
+
+def load_dedup_index(
+    path: Optional[str], normalize: Sequence[str] = (), include_answers: bool = False,
+    digest_bits: int = DEFAULT_DEDUP_DIGEST_BITS,
+) -> DedupIndex:
+    """
+    Returns the persisted index if it exists and has the same settings, otherwise an empty index.
+
+    :param path: The path of the index file or None to not persist the index
+    :param normalize: The normalization rules, some of DEDUP_NORMALIZATIONS
+    :param include_answers: Also compare the answers of the questions
+    :param digest_bits: The size of the hashes, one of DEDUP_DIGEST_BITS
+    :return: The index
+    """
+    index = DedupIndex(normalize, include_answers, digest_bits)
+    if path is None or not os.path.exists(path):
+        return index
+    try:
+        loaded = DedupIndex.load(path)
+    except (OSError, ValueError) as e:
+        logging.warning("Ignoring invalid dedup index '%s': %s", path, str(e))
+        return index
+    if loaded.settings != index.settings:
+        logging.warning("Ignoring dedup index '%s' written with other settings: %s", path, loaded.settings)
+        return index
+    logging.info("Loaded dedup index with %d questions", len(loaded))
+    return loaded
@@ -0,0 +1,130 @@
+# Standard library imports
+import fnmatch
+import logging
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
+from typing import List, Sequence, Tuple
+
+# Only the standard library is imported here, the CLI lists the input files before pandas is imported.
+
+# Constants
+DEFAULT_DISCOVER_THREADS = 1
+# Excel creates the lock file "~$quiz.xlsx" next to an open workbook "quiz.xlsx"
+LOCK_FILE_PREFIX = "~$"
+
+# A directory to list and its path relative to the input directory, "" or ending with "/"
+Directory = Tuple[str, str]
+
+
+def matches(relative_path: str, patterns: Sequence[str]) -> bool:
+    """
+    Returns whether a path matches any of the glob patterns. "*" also matches "/", so "*.xlsx" matches the
+    files in all subdirectories and "2024/*" everything below the directory 2024.
+
+    :param relative_path: The path relative to the input directory, separated by "/"
+    :param patterns: The glob patterns
+    :return: True if a pattern matches
+    """
+    return any(fnmatch.fnmatchcase(relative_path, pattern) for pattern in patterns)
+
+
+def is_input_file(
+    name: str, relative_path: str, extensions: Sequence[str], include: Sequence[str] = (), exclude: Sequence[str] = ()
+) -> bool:
+    """
+    Returns whether a file of the input directory is read. Hidden files and Excel lock files are skipped.
+
+    :param name: The file name
+    :param relative_path: The path relative to the input directory, separated by "/"
+    :param extensions: The extensions of the input files
+    :param include: Glob patterns of which the file has to match one, all files if empty
+    :param exclude: Glob patterns of which the file must not match any
+    :return: True if the file is an input file
+    """
+    if name.startswith((".", LOCK_FILE_PREFIX)) or os.path.splitext(name)[1] not in extensions:
+        return False
+    if include and not matches(relative_path, include):
+        return False
+    return not matches(relative_path, exclude)
+
+
+def list_directory(
+    directory: Directory, extensions: Sequence[str], include: Sequence[str], exclude: Sequence[str], recursive: bool
+) -> Tuple[List[str], List[Directory]]:
+    """
+    Lists a directory with a single scandir, the file types are taken from the directory entries.
+
+    :param directory: The directory and its relative path
+    :param extensions: The extensions of the input files
+    :param include: Glob patterns of which the files have to match one
+    :param exclude: Glob patterns of the skipped files and directories
+    :param recursive: Whether the subdirectories are returned
+    :return: The input files and the subdirectories to list
+    """
+    path, prefix = directory
+    files = []
+    subdirectories = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                relative_path = prefix + entry.name
+                try:
+                    # symbolic links to directories are not followed, so there are no cycles
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive and not entry.name.startswith(".") and not matches(relative_path + "/", exclude):
+                            subdirectories.append((entry.path, relative_path + "/"))
+                    elif is_input_file(entry.name, relative_path, extensions, include, exclude) and entry.is_file():
+                        files.append(entry.path)
+                except OSError:
+                    continue
+    except OSError as e:
+        logging.warning("Failed to list directory '%s': %s", path, str(e))
+    return files, subdirectories
+
+
+def discover_files(
+    path: str,
+    extensions: Sequence[str],
+    include: Sequence[str] = (),
+    exclude: Sequence[str] = (),
+    recursive: bool = False,
+    threads: int = DEFAULT_DISCOVER_THREADS,
+) -> List[str]:
+    """
+    Lists the input files of a directory, optionally with its subdirectories. With more than one thread,
+    the directories are listed concurrently, so a high-latency file system (e.g. a network share)
+    is not listed one directory after another.
+
+    :param path: The path to an input file or a directory with input files
+    :param extensions: The extensions of the input files
+    :param include: Glob patterns of the relative file paths of which the files have to match one
+    :param exclude: Glob patterns of the relative paths of the skipped files and directories
+    :param recursive: Whether the subdirectories are listed as well
+    :param threads: The number of threads listing the directories
+    :return: The sorted paths of the input files, the path itself if it is a file
+    """
+    if os.path.isfile(path):
+        return [path]
+    if not os.path.isdir(path):
+        return []
+
+    list_entries = partial(list_directory, extensions=extensions, include=include, exclude=exclude, recursive=recursive)
+    files = []
+    if threads <= 1 or not recursive:
+        pending = [(path, "")]
+        while pending:
+            found, subdirectories = list_entries(pending.pop())
+            files.extend(found)
+            pending.extend(subdirectories)
+        return sorted(files)
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        futures = {executor.submit(list_entries, (path, ""))}
+        while futures:
+            done, futures = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                found, subdirectories = future.result()
+                files.extend(found)
+                futures.update(executor.submit(list_entries, directory) for directory in subdirectories)
+    return sorted(files)
@@ -0,0 +1,197 @@
+# Standard library imports
+import logging
+import os
+from contextlib import ExitStack
+from typing import List, Optional, Sequence
+
+# Third-party library imports
+import pandas as pd
+
+from kahoot_to_anki.constants import ARROW_FORMATS, EXPORT_FORMATS, QUESTION_COLUMNS
+from kahoot_to_anki.readers import ANALYTICS_COLUMNS, OPTIONAL_QUESTION_COLUMNS
+
+# Files of the export formats (EXPORT_FORMATS), parquet and feather need pyarrow
+EXPORT_FILES = {
+    "csv": "kahoot.csv",
+    "parquet": "kahoot.parquet",
+    "feather": "kahoot.feather",
+    "jsonl": "kahoot.jsonl",
+}
+EXPORT_COMPRESSION = "zstd"
+# Rows per Parquet row group and Feather record batch if the questions are written at once
+DEFAULT_ROW_GROUP_SIZE = 65536
+
+
+def export_formats(export_csv: bool = False, exports: Sequence[str] = ()) -> List[str]:
+    """
+    Combines the CSV flag of the earlier versions with the export formats.
+
+    :param export_csv: Export the questions to kahoot.csv
+    :param exports: The export formats, some of EXPORT_FORMATS
+    :return: The export formats in the order of EXPORT_FORMATS
+    """
+    formats = set(exports) | ({"csv"} if export_csv else set())
+    return [fmt for fmt in EXPORT_FORMATS if fmt in formats]
+
+
+def import_pyarrow():
+    """
+    Imports pyarrow, which is only needed for the parquet and feather formats.
+
+    :return: The pyarrow module
+    """
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as e:
+        logging.error("The parquet and feather formats need pyarrow: pip install 'kahoot-to-anki[parquet]'")
+        raise ImportError("The parquet and feather formats need pyarrow") from e
+    return pyarrow
+
+
+class QuestionExporter:
+    """
+    Writes the processed questions to the export files chunk by chunk, so it can be fed by the
+    streaming pipeline. Each chunk becomes a Parquet row group or a Feather record batch, both compressed
+    with zstd. The files are created on the first chunk, which also selects the exported columns:
+    the QUESTION_COLUMNS and the OPTIONAL_QUESTION_COLUMNS it has, the media sources and the analytics, so the
+    exports can be converted again like the raw data. The optional columns are empty for later chunks without them.
+    """
+
+    def __init__(self, out: str, formats: Sequence[str], basename: Optional[str] = None):
+        """
+        :param out: The path to the output directory
+        :param formats: The export formats, some of EXPORT_FORMATS
+        :param basename: The file name without extension, by default the names of EXPORT_FILES
+        """
+        unknown = set(formats) - set(EXPORT_FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown export formats {sorted(unknown)}, expected some of {EXPORT_FORMATS}")
+        self.out = out
+        self.formats = [fmt for fmt in EXPORT_FORMATS if fmt in formats]
+        self.basename = basename
+        self.rows = 0
+        self.columns = None
+        self._dropped = set()
+        self._stack = ExitStack()
+        self._writers = None
+        self._pa = None
+        self._schema = None
+        if any(fmt in ARROW_FORMATS for fmt in self.formats):
+            self._pa = import_pyarrow()
+
+    def __enter__(self) -> "QuestionExporter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def path(self, fmt: str) -> str:
+        """
+        Returns the path of the export file of a format.
+
+        :param fmt: The export format
+        :return: The path of the file
+        """
+        if self.basename is None:
+            return os.path.join(self.out, EXPORT_FILES[fmt])
+        return os.path.join(self.out, f"{self.basename}.{fmt}")
+
+    def _open(self, df: pd.DataFrame) -> dict:
+        self.columns = QUESTION_COLUMNS + [column for column in OPTIONAL_QUESTION_COLUMNS if column in df.columns]
+        if self._pa is not None:
+            self._schema = self._pa.schema([
+                (column, self._pa.float64() if column in ANALYTICS_COLUMNS else self._pa.string())
+                for column in self.columns
+            ])
+        writers = {}
+        for fmt in self.formats:
+            if fmt == "csv":
+                writers[fmt] = self._stack.enter_context(
+                    open(self.path(fmt), "w", encoding="utf-8-sig", newline="")
+                )
+            elif fmt == "jsonl":
+                writers[fmt] = self._stack.enter_context(open(self.path(fmt), "w", encoding="utf-8"))
+            elif fmt == "parquet":
+                writers[fmt] = self._stack.enter_context(
+                    self._pa.parquet.ParquetWriter(self.path(fmt), self._schema, compression=EXPORT_COMPRESSION)
+                )
+            elif fmt == "feather":
+                # Feather V2 is the Arrow IPC file format
+                options = self._pa.ipc.IpcWriteOptions(compression=EXPORT_COMPRESSION)
+                writers[fmt] = self._stack.enter_context(
+                    self._pa.ipc.new_file(self.path(fmt), self._schema, options=options)
+                )
+        return writers
+
+    def write(self, df: pd.DataFrame, row_group_size: Optional[int] = None) -> None:
+        """
+        Appends questions to the export files.
+
+        :param df: The processed questions
+        :param row_group_size: The maximum rows per row group, by default the whole chunk is one row group
+        :return: None
+        """
+        if self._writers is None:
+            self._writers = self._open(df)
+
+        dropped = [
+            column for column in OPTIONAL_QUESTION_COLUMNS
+            if column in df.columns and column not in self.columns and column not in self._dropped
+        ]
+        if dropped:
+            self._dropped.update(dropped)
+            logging.warning("The first exported questions have no %s column, it is not exported", ", ".join(dropped))
+        # the optional columns are missing or NaN for the questions of inputs without them
+        optional = {
+            column: df[column].fillna("") if column in df.columns else ""
+            for column in self.columns if column in OPTIONAL_QUESTION_COLUMNS and column not in ANALYTICS_COLUMNS
+        }
+        optional.update({
+            column: df[column].astype(float) if column in df.columns else float("nan")
+            for column in self.columns if column in ANALYTICS_COLUMNS
+        })
+        df = df.assign(**optional)[self.columns]
+        table = None
+        if self._pa is not None:
+            strings = {column: str for column in self.columns if column not in ANALYTICS_COLUMNS}
+            table = self._pa.Table.from_pandas(df.astype(strings), schema=self._schema, preserve_index=False)
+
+        for fmt, writer in self._writers.items():
+            if fmt == "csv":
+                df.to_csv(writer, sep=";", index=False, header=self.rows == 0)
+            elif fmt == "jsonl":
+                writer.write(df.to_json(orient="records", lines=True, force_ascii=False, double_precision=15))
+            elif fmt == "parquet":
+                writer.write_table(table, row_group_size=row_group_size or max(1, len(df)))
+            elif fmt == "feather":
+                writer.write_table(table, max_chunksize=row_group_size or max(1, len(df)))
+        self.rows += len(df)
+
+    def close(self) -> None:
+        """
+        Closes the export files.
+
+        :return: None
+        """
+        self._stack.close()
+
+
+def write_exports(
+    df: pd.DataFrame, out: str, formats: Sequence[str], basename: Optional[str] = None,
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+) -> None:
+    """
+    Writes the processed questions to the export files at once.
+
+    :param df: The processed questions
+    :param out: The path to the output directory
+    :param formats: The export formats, some of EXPORT_FORMATS
+    :param basename: The file name without extension, by default the names of EXPORT_FILES
+    :param row_group_size: The maximum rows per Parquet row group and Feather record batch
+    :return: None
+    """
+    with QuestionExporter(out, formats, basename=basename) as exporter:
+        exporter.write(df, row_group_size=row_group_size)
+
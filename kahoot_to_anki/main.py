@@ -1,9 +1,21 @@
-import os
+import cProfile
 import logging
+import os
 import sys
+import tracemalloc
+from typing import TYPE_CHECKING, List, Optional
+
+# Only light modules are imported here, so --help, --version and invalid arguments do not wait for
+# pandas, openpyxl and genanki. The conversion modules are imported in convert.
+from kahoot_to_anki.cache import ParseCache
+from kahoot_to_anki.cli import CLIArgs, get_commandline_arguments, validation
+from kahoot_to_anki.constants import DEFAULT_DEDUP_DIGEST_BITS
+from kahoot_to_anki.discovery import discover_files
+from kahoot_to_anki.readers import input_extensions
+from kahoot_to_anki.stats import Stats
 
-from kahoot_to_anki.cli import get_commandline_arguments, validation
-from kahoot_to_anki.processing import get_questions, make_anki
+if TYPE_CHECKING:
+    from kahoot_to_anki.media import MediaStore
 
 # Configure logging settings
 logging.basicConfig(level=logging.INFO)
@@ -13,28 +25,261 @@ def main() -> None:
     # Check command line arguments
     args = get_commandline_arguments()
 
-    validation(args.input_path, args.output_path)
+    stats = Stats()
+
+    # the input directory is listed once, for the validation and the conversion
+    files = None
+    if args.batch is None and not args.watch:
+        with stats.stage("discover") as stage:
+            files = discover_files(
+                args.input_path, input_extensions(), include=args.include, exclude=args.exclude,
+                recursive=args.recursive, threads=args.discover_threads,
+            )
+            stage["rows"] = len(files)
+
+    if args.batch is None:
+        # a watched directory may still be empty
+        validation(args.input_path, args.output_path, require_excels=not args.watch, files=files)
+
+    profiler = cProfile.Profile() if args.profile else None
+    if args.trace_memory:
+        tracemalloc.start()
+    if profiler is not None:
+        profiler.enable()
+
+    try:
+        if args.batch is not None:
+            convert_batch(args, stats)
+        elif args.watch:
+            convert_watch(args, stats)
+        else:
+            convert(args, stats, files)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+        if args.stats_json:
+            stats.write(args.stats_json)
+        if args.trace_memory:
+            tracemalloc.stop()
+
+
+def make_cache(args: CLIArgs) -> Optional[ParseCache]:
+    """
+    Creates the parse cache configured by the command line arguments.
+
+    :param args: The command line arguments
+    :return: The parse cache or None if it is disabled or cannot be created
+    """
+    if not args.cache:
+        return None
+    try:
+        return ParseCache(args.cache_dir, max_size=args.cache_size)
+    except OSError as e:
+        logging.warning("Parse cache disabled, failed to create '%s': %s", args.cache_dir, str(e))
+        return None
+
+
+def make_media_store(args: CLIArgs) -> Optional["MediaStore"]:
+    """
+    Creates the store of the media files if --media is enabled, in the media directory of the cache directory.
+
+    :param args: The command line arguments
+    :return: The media store or None if media are disabled
+    """
+    if not args.media:
+        return None
+    from kahoot_to_anki.media import MediaStore
+
+    return MediaStore(
+        os.path.join(args.cache_dir, "media"), media_dir=args.media_dir, workers=args.media_workers,
+        allow_remote=args.media_remote,
+    )
+
+
+def convert(args: CLIArgs, stats: Stats, files: Optional[List[str]] = None) -> None:
+    """
+    Converts the Kahoot exports to the Anki package (and export files) as configured by the command line arguments.
+    Exits with status 1 if a package of --split-by failed to write.
+
+    :param args: The command line arguments
+    :param stats: Records the timings of the stages and files
+    :param files: The input files listed by main, by default the input path is listed again
+    :return: None
+    """
+    from kahoot_to_anki.dedup import load_dedup_index
+    from kahoot_to_anki.pipeline import run_pipeline
+    from kahoot_to_anki.export import export_formats, write_exports
+    from kahoot_to_anki.processing import get_questions, make_anki
+    from kahoot_to_anki.split import get_question_groups, make_decks
+
+    cache = make_cache(args)
+    media = make_media_store(args)
+
+    # without dedup options, get_questions drops exact duplicates with drop_duplicates
+    dedup = None
+    if args.dedup_normalize or args.dedup_answers or args.dedup_bits != DEFAULT_DEDUP_DIGEST_BITS or args.dedup_index:
+        dedup = load_dedup_index(args.dedup_index, args.dedup_normalize, args.dedup_answers, args.dedup_bits)
+
+    if args.stream:
+        questions_cnt = run_pipeline(
+            input_directory=args.input_path,
+            out=args.output_path,
+            title=args.deck_title,
+            sheet_name=args.sheet,
+            export_csv=args.export_csv,
+            jobs=args.jobs,
+            reader=args.reader,
+            cache=cache,
+            chunk_size=args.chunk_size,
+            stats=stats,
+            dedup=dedup,
+            exports=args.exports,
+            files=files,
+            media=media,
+            reproducible=args.reproducible,
+            only_below=args.only_below,
+            analytics=args.analytics,
+        )
+        # run_pipeline raises if the package could not be written, so the index is only saved after a written package
+        if args.dedup_index:
+            dedup.save(args.dedup_index)
+        if questions_cnt == 0:
+            logging.warning("No Kahoot questions found to process. Exiting.")
+        return
+
+    if args.split_by:
+        groups = get_question_groups(
+            input_directory=args.input_path,
+            sheet_name=args.sheet,
+            split_by=args.split_by,
+            pattern=args.split_pattern,
+            jobs=args.jobs,
+            reader=args.reader,
+            cache=cache,
+            stats=stats,
+            dedup=dedup,
+            files=files,
+            analytics=args.analytics,
+        )
+        if not groups:
+            logging.warning("No Kahoot questions found to process. Exiting.")
+            sys.exit(0)
+        failed = make_decks(
+            groups,
+            args.output_path,
+            args.deck_title,
+            jobs=args.jobs,
+            incremental=args.incremental,
+            writer=args.writer,
+            export_csv=args.export_csv,
+            stats=stats,
+            exports=args.exports,
+            media=media,
+            reproducible=args.reproducible,
+            only_below=args.only_below,
+            order=args.order,
+        )
+        if failed:
+            sys.exit(1)
+        return
+
+    df = get_questions(
+        input_directory=args.input_path,
+        sheet_name=args.sheet,
+        jobs=args.jobs,
+        reader=args.reader,
+        cache=cache,
+        stats=stats,
+        dedup=dedup,
+        files=files,
+        analytics=args.analytics,
+    )
 
-    df = get_questions(input_directory=args.input_path, sheet_name=args.sheet)
-    
     if df.empty:
         logging.warning("No Kahoot questions found to process. Exiting.")
         sys.exit(0)
 
-    if args.export_csv:
-        df.to_csv(
-            os.path.join(args.output_path, "kahoot.csv"),
-            sep=";",
-            index=False,
-            encoding="utf-8-sig",
-        )
-        
-    make_anki(df, args.output_path, args.deck_title)
+    formats = export_formats(args.export_csv, args.exports)
+    if formats:
+        with stats.stage("export") as stage:
+            write_exports(df, args.output_path, formats)
+            stage["rows"] = len(df)
+
+    written = make_anki(
+        df, args.output_path, args.deck_title, incremental=args.incremental, writer=args.writer, stats=stats,
+        media=media, reproducible=args.reproducible, only_below=args.only_below, order=args.order,
+    )
+    # the questions of a package which was not written must not be dropped as duplicates by the next run
+    if args.dedup_index and written:
+        dedup.save(args.dedup_index)
+
+
+def convert_batch(args: CLIArgs, stats: Stats) -> None:
+    """
+    Runs the conversions of the jobs file given with --batch and exits with status 1 if any job failed.
+
+    :param args: The command line arguments
+    :param stats: Records the throughput and latency of each job
+    :return: None
+    """
+    from kahoot_to_anki.batch import read_jobs, run_batch
+
+    jobs = read_jobs(args.batch)
+    if not jobs:
+        logging.warning("No jobs found in '%s'. Exiting.", args.batch)
+        return
+
+    results = run_batch(
+        jobs, workers=args.jobs, reader=args.reader, writer=args.writer, cache=make_cache(args), stats=stats,
+        reproducible=args.reproducible, analytics=args.analytics,
+    )
+    if any(result.error for result in results):
+        sys.exit(1)
+
+
+def convert_watch(args: CLIArgs, stats: Stats) -> None:
+    """
+    Keeps the Anki package (and export files) up to date with the input directory until interrupted.
+
+    :param args: The command line arguments
+    :param stats: Records the timings of the stages and files
+    :return: None
+    """
+    from kahoot_to_anki.dedup import DedupIndex
+    from kahoot_to_anki.watch import DeckWatcher
+
+    dedup = None
+    if args.dedup_normalize or args.dedup_answers or args.dedup_bits != DEFAULT_DEDUP_DIGEST_BITS:
+        dedup = DedupIndex(args.dedup_normalize, args.dedup_answers, args.dedup_bits)
+
+    watcher = DeckWatcher(
+        input_directory=args.input_path,
+        out=args.output_path,
+        title=args.deck_title,
+        sheet_name=args.sheet,
+        export_csv=args.export_csv,
+        reader=args.reader,
+        cache=make_cache(args),
+        incremental=args.incremental,
+        writer=args.writer,
+        dedup=dedup,
+        debounce=args.debounce,
+        stats=stats,
+        exports=args.exports,
+        include=args.include,
+        exclude=args.exclude,
+        media=make_media_store(args),
+        reproducible=args.reproducible,
+        only_below=args.only_below,
+        order=args.order,
+        analytics=args.analytics,
+    )
+    try:
+        watcher.run(poll_interval=args.poll_interval)
+    except KeyboardInterrupt:
+        logging.info("Stopped watching '%s'.", args.input_path)
 
 
 if __name__ == "__main__":
     main()
-    
-    
-    
-    
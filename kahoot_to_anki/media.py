@@ -0,0 +1,250 @@
+# Standard library imports
+import hashlib
+import html
+import logging
+import os
+import tempfile
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple
+
+from kahoot_to_anki.readers import MEDIA_COLUMN
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+# Constants
+DEFAULT_MEDIA_WORKERS = 8
+MEDIA_TIMEOUT = 30
+HASH_CHUNK_SIZE = 1024 * 1024
+# Media which Anki plays with [sound:...], all other media are shown with <img>
+SOUND_EXTENSIONS = {".mp3", ".mp4", ".m4a", ".mov", ".ogg", ".wav", ".webm"}
+
+
+def is_url(source: str) -> bool:
+    """
+    Returns whether a media source is downloaded.
+
+    :param source: The path or URL of a media file
+    :return: True for http and https URLs
+    """
+    return urllib.parse.urlparse(source).scheme in ("http", "https")
+
+
+def media_extension(source: str) -> str:
+    """
+    Returns the lower case extension of a media file path or URL.
+
+    :param source: The path or URL
+    :return: The extension with the dot or ""
+    """
+    path = urllib.parse.urlparse(source).path if is_url(source) else source
+    return os.path.splitext(path)[1].lower()
+
+
+def media_reference(source: str) -> str:
+    """
+    Returns the reference of a media file in a field, an <img> tag for images and [sound:...] for videos and audio.
+
+    :param source: The HTML-escaped path, URL or file name of the media file, "" for none
+    :return: The reference or "" if there is no source
+    """
+    if not source:
+        return ""
+    if media_extension(html.unescape(source)) in SOUND_EXTENSIONS:
+        return f"[sound:{source}]"
+    return f'<img src="{source}">'
+
+
+class MediaStore:
+    """
+    Content-addressed on-disk store of the media files of the decks.
+
+    Every file is stored once as <sha256>.<extension> in the objects directory, no matter how many questions,
+    decks or sources refer to it. The object of each source is remembered in the sources directory (keyed by
+    the URL, or the path, size and modification time of a local file), so a source is only downloaded or
+    copied again when a local file changed. Sources are resolved by a bounded pool of threads.
+
+    Only the sources of the MEDIA_COLUMN are resolved, never references in the text of the questions.
+    Local files must be relative paths inside media_dir, URLs are only downloaded if allow_remote is set.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        media_dir: Optional[str] = None,
+        workers: int = DEFAULT_MEDIA_WORKERS,
+        timeout: float = MEDIA_TIMEOUT,
+        allow_remote: bool = False,
+    ):
+        """
+        :param directory: The directory of the store, created if it does not exist
+        :param media_dir: The directory of the local media files with relative paths, by default the working directory
+        :param workers: The maximum number of concurrent downloads and copies
+        :param timeout: The timeout of a download in seconds
+        :param allow_remote: Download the media with http and https URLs, by default they fail
+        """
+        self.directory = directory
+        self.media_dir = media_dir
+        self.workers = workers
+        self.timeout = timeout
+        self.allow_remote = allow_remote
+        # the object names of the sources resolved by this store, None if a source failed
+        self.resolved: Dict[str, Optional[str]] = {}
+        self.fetched = 0
+        self.reused = 0
+        os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(directory, "sources"), exist_ok=True)
+
+    def path(self, name: str) -> str:
+        """
+        Returns the path of a stored media file.
+
+        :param name: The object name returned by resolve
+        :return: The path of the file
+        """
+        return os.path.join(self.directory, "objects", name)
+
+    def local_path(self, source: str) -> str:
+        """
+        Returns the path of a local media file relative to media_dir.
+
+        :param source: The relative path of the media file
+        :return: The real path of the file
+        :raises ValueError: if the path is absolute, a URL or resolves outside of media_dir
+        """
+        if os.path.isabs(source) or urllib.parse.urlparse(source).scheme:
+            raise ValueError("only relative paths inside the media directory are allowed")
+        media_dir = os.path.realpath(self.media_dir or os.getcwd())
+        path = os.path.realpath(os.path.join(media_dir, source))
+        if os.path.commonpath([media_dir, path]) != media_dir:
+            raise ValueError("the path is outside of the media directory")
+        return path
+
+    def source_key(self, source: str) -> str:
+        """
+        Returns the hex digest under which the object of a source is remembered.
+
+        :param source: The path or URL of the media file
+        :return: The key of the source
+        :raises OSError: if a local file does not exist
+        :raises ValueError: if a URL is not allowed or a local path is not inside media_dir, see local_path
+        """
+        if is_url(source):
+            if not self.allow_remote:
+                raise ValueError("downloads are disabled")
+            parts = ["url", source]
+        else:
+            path = self.local_path(source)
+            stat = os.stat(path)
+            parts = ["file", path, str(stat.st_size), str(stat.st_mtime_ns)]
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def fetch(self, source: str) -> str:
+        """
+        Downloads or copies a media file into the store, hashing it while it is written.
+
+        :param source: The path or URL of the media file
+        :return: The object name
+        """
+        objects = os.path.join(self.directory, "objects")
+        fd, tmp_path = tempfile.mkstemp(dir=objects, suffix=".tmp")
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(fd, "wb") as out:
+                if is_url(source):
+                    src = urllib.request.urlopen(source, timeout=self.timeout)
+                else:
+                    src = open(self.local_path(source), "rb")
+                with src:
+                    for chunk in iter(lambda: src.read(HASH_CHUNK_SIZE), b""):
+                        digest.update(chunk)
+                        out.write(chunk)
+            name = digest.hexdigest() + media_extension(source)
+            os.replace(tmp_path, self.path(name))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return name
+
+    def resolve_source(self, source: str) -> Tuple[Optional[str], bool]:
+        """
+        Returns the object of a source, fetching it if the store does not know it yet.
+
+        :param source: The path or URL of the media file
+        :return: The object name or None if the source failed, and whether it was downloaded or copied
+        """
+        try:
+            index_path = os.path.join(self.directory, "sources", self.source_key(source))
+            try:
+                with open(index_path, encoding="utf-8") as f:
+                    name = f.read()
+                if os.path.exists(self.path(name)):
+                    return name, False
+            except FileNotFoundError:
+                pass
+
+            name = self.fetch(source)
+            tmp_path = f"{index_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(name)
+            os.replace(tmp_path, index_path)
+            return name, True
+        except Exception as e:
+            logging.warning("Failed to fetch media '%s': %s", source, str(e))
+            return None, False
+
+    def resolve(self, sources: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        Resolves the sources which were not resolved before with up to workers threads.
+
+        :param sources: The paths and URLs of the media files
+        :return: The object name of each source, None for the sources which failed
+        """
+        sources = set(sources)
+        new = sorted(sources - self.resolved.keys())
+        if new:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(new))) as executor:
+                for source, (name, fetched) in zip(new, executor.map(self.resolve_source, new)):
+                    self.resolved[source] = name
+                    if fetched:
+                        self.fetched += 1
+                    elif name is not None:
+                        self.reused += 1
+            logging.info("Media: %d fetched, %d from the media cache", self.fetched, self.reused)
+        return {source: self.resolved[source] for source in sources}
+
+    def references(self, df: "pd.DataFrame") -> Set[str]:
+        """
+        Returns the sources of the media of the questions, see processing.df_processing.
+
+        :param df: The processed questions
+        :return: The paths and URLs of the media files
+        """
+        if MEDIA_COLUMN not in df.columns:
+            return set()
+        return {html.unescape(source) for source in df[MEDIA_COLUMN].dropna().tolist() if source}
+
+    def embed(self, df: "pd.DataFrame") -> Tuple["pd.DataFrame", List[str]]:
+        """
+        Resolves the media of the questions and replaces their references below the questions by the object names,
+        which are the names of the files in the package. References which failed are kept.
+
+        :param df: The processed questions
+        :return: The questions with the replaced references and the paths of the referenced media files
+        """
+        names = self.resolve(self.references(df))
+        if not any(names.values()):
+            return df, []
+
+        questions = []
+        for question, source in zip(df["Question"].tolist(), df[MEDIA_COLUMN].fillna("").tolist()):
+            name = names.get(html.unescape(source)) if source else None
+            if name is not None:
+                # df_processing appends the reference of the source to the question
+                question = question[:-len(media_reference(source))] + media_reference(name)
+            questions.append(question)
+        media_files = sorted({self.path(name) for name in names.values() if name is not None})
+        return df.assign(Question=questions), media_files
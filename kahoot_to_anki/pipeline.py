@@ -0,0 +1,206 @@
+# Standard library imports
+import logging
+import os
+from contextlib import ExitStack
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+# Third-party library imports
+import pandas as pd
+
+from kahoot_to_anki.apkg import ApkgWriter
+from kahoot_to_anki.cache import ParseCache
+from kahoot_to_anki.dedup import DedupIndex
+from kahoot_to_anki.export import QuestionExporter, export_formats
+from kahoot_to_anki.media import MediaStore
+from kahoot_to_anki.processing import (
+    ANKI_DECK_ID, ANKI_MODEL, ANKI_PACKAGE_FILE, get_excels, iter_questions, note_guid, question_tags,
+    select_questions,
+)
+from kahoot_to_anki.stats import Stats
+
+
+# Constants
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def run_pipeline(
+    input_directory: str,
+    out: str,
+    title: str,
+    sheet_name: str,
+    export_csv: bool = False,
+    jobs: int = 1,
+    reader: str = "pandas",
+    cache: Optional[ParseCache] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    stats: Optional[Stats] = None,
+    dedup: Optional[DedupIndex] = None,
+    exports: Sequence[str] = (),
+    files: Optional[Sequence[str]] = None,
+    media: Optional[MediaStore] = None,
+    reproducible: bool = False,
+    only_below: Optional[float] = None,
+    analytics: bool = False,
+) -> int:
+    """
+    Converts the Kahoot questions to an Anki package (and export files) as a stream of generator stages.
+
+    The Excel files are read and processed one after another (see iter_questions), deduplicated with
+    a set of question hashes and written to the package and the export files in chunks of chunk_size questions,
+    so the memory stays flat regardless of the number of input files.
+    The package is written with the SQLite writer of kahoot_to_anki.apkg and only if there are notes,
+    like make_anki it is not written if only_below selects none of the questions.
+
+    :param input_directory: The path to the input directory or Excel file
+    :param out: The path to the output directory
+    :param title: The title of the Anki deck
+    :param sheet_name: The Excel sheet name with the Kahoot Answers
+    :param export_csv: Also write the questions to kahoot.csv
+    :param jobs: The number of worker processes used to read the Excel files
+    :param reader: The Excel reader, one of EXCEL_READERS
+    :param cache: An optional cache of the processed questions of each file
+    :param chunk_size: The number of questions written at once
+    :param stats: Records the timings of the stages and files
+    :param dedup: An optional index of the questions seen so far, by default exact duplicates are dropped
+    :param exports: Further export formats, some of EXPORT_FORMATS, written with a row group per chunk
+    :param files: The input files if they were already listed, by default the files of get_excels(input_directory)
+    :param media: An optional store of the media files, the media referenced by each chunk are added to the package
+    :param reproducible: Write a package with fixed timestamps and zip metadata, see ApkgWriter
+    :param only_below: Only write the questions which less than this percent of the players answered correctly
+        to the package, the exports get all questions
+    :param analytics: Tag the notes with the analytics of the questions, see timed_read_questions,
+        always read with only_below
+    :return: The number of questions written
+    :raises OSError: if the package cannot be written, unlike in make_anki the error is raised and not only logged
+    """
+    if stats is None:
+        stats = Stats()
+
+    if files is None:
+        with stats.stage("discover") as stage:
+            files = list(get_excels(input_directory))
+            stage["rows"] = len(files)
+
+    frames = iter_questions(
+        files, sheet_name=sheet_name, jobs=jobs, reader=reader, cache=cache, stats=stats,
+        analytics=analytics or only_below is not None,
+    )
+    chunks = chunked(unique_questions(count_questions(frames), index=dedup, stats=stats), chunk_size)
+
+    questions_cnt = 0
+    notes_cnt = 0
+    formats = export_formats(export_csv, exports)
+    with ExitStack() as stack:
+        apkg = None
+        # the export files are created on the first chunk
+        exporter = stack.enter_context(QuestionExporter(out, formats))
+        for chunk in chunks:
+            # the GUIDs and exports keep the original media references like in the in-memory conversion
+            selected = select_questions(chunk, only_below=only_below)
+            if not selected.empty:
+                # the package is created on the first note, so no empty package is written
+                if apkg is None:
+                    apkg = stack.enter_context(
+                        ApkgWriter(
+                            os.path.join(out, ANKI_PACKAGE_FILE), ANKI_MODEL, ANKI_DECK_ID, title,
+                            reproducible=reproducible,
+                        )
+                    )
+
+                notes = selected
+                if media is not None:
+                    with stats.stage("media") as stage:
+                        notes, media_files = media.embed(selected)
+                        apkg.add_media(media_files)
+                        stage["rows"] = len(media_files)
+
+                with stats.stage("package") as stage:
+                    apkg.add_notes(zip(
+                        map(note_guid, selected["Question"].tolist()),
+                        map(list, zip(
+                            notes["Question"].tolist(), notes["Correct Answers"].tolist(),
+                            notes["Possible Answers"].tolist(),
+                        )),
+                        question_tags(selected),
+                    ))
+                    stage["rows"] = len(notes)
+                notes_cnt += len(notes)
+            if formats:
+                with stats.stage("export") as stage:
+                    exporter.write(chunk)
+                    stage["rows"] = len(chunk)
+            questions_cnt += len(chunk)
+
+    logging.info("Unique questions: %d", questions_cnt)
+    if only_below is not None:
+        logging.info("Questions below %g%% correct: %d of %d", only_below, notes_cnt, questions_cnt)
+        if questions_cnt and not notes_cnt:
+            logging.warning("No questions below %g%% correct, Anki package not written.", only_below)
+    return questions_cnt
+
+
+def count_questions(frames: Iterable[Optional[pd.DataFrame]]) -> Iterator[pd.DataFrame]:
+    """
+    Logs the number of read files and questions like get_questions and drops the unreadable files.
+
+    :param frames: The processed questions or None of each file
+    :return: a generator of the processed questions
+    """
+    files_cnt = 0
+    questions_cnt = 0
+    for df in frames:
+        if df is None:
+            continue
+        files_cnt += 1
+        questions_cnt += len(df)
+        yield df
+
+    logging.info("Read input files: %d", files_cnt)
+    logging.info("Read questions: %d", questions_cnt)
+
+
+def unique_questions(
+    frames: Iterable[pd.DataFrame], index: Optional[DedupIndex] = None, stats: Optional[Stats] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Drops the questions which were already seen, like drop_duplicates(subset=["Question"]) over all frames,
+    but only keeps a hash of each question in the index.
+
+    :param frames: The processed questions
+    :param index: The index of the questions seen so far, updated in place
+    :param stats: Records the time of the deduplication
+    :return: a generator of the frames without the duplicated questions
+    """
+    if index is None:
+        index = DedupIndex()
+    if stats is None:
+        stats = Stats()
+
+    for df in frames:
+        with stats.stage("dedup") as stage:
+            keep = index.mask(df)
+            stage["rows"] = sum(keep)
+        if any(keep):
+            yield df[keep]
+
+
+def chunked(frames: Iterable[pd.DataFrame], chunk_size: int) -> Iterator[pd.DataFrame]:
+    """
+    Combines the frames into chunks of at least chunk_size rows (the last chunk may be smaller).
+
+    :param frames: The processed questions
+    :param chunk_size: The minimum number of rows of a chunk
+    :return: a generator of the chunks
+    """
+    buffer: List[pd.DataFrame] = []
+    rows = 0
+    for df in frames:
+        buffer.append(df)
+        rows += len(df)
+        if rows >= chunk_size:
+            yield pd.concat(buffer, ignore_index=True)
+            buffer = []
+            rows = 0
+
+    if buffer:
+        yield pd.concat(buffer, ignore_index=True)
@@ -1,147 +1,769 @@
 # Standard library imports
+import hashlib
+import json
 import logging
 import os
-import glob
-from typing import Iterator, Optional
-import html
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import ExitStack
+from functools import partial
+from typing import IO, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+import zipfile
 
 # Third-party library imports
 import genanki
+import numpy as np
 import pandas as pd
 
+from kahoot_to_anki.apkg import PackageTarget, write_apkg, write_genanki_package
+from kahoot_to_anki.cache import ParseCache
+from kahoot_to_anki.constants import ANKI_WRITERS, DECK_ORDERS, EXCEL_READERS
+from kahoot_to_anki.dedup import DedupIndex
+from kahoot_to_anki.discovery import DEFAULT_DISCOVER_THREADS, discover_files
+from kahoot_to_anki.export import QUESTION_COLUMNS
+from kahoot_to_anki.media import MediaStore, media_reference
+from kahoot_to_anki.readers import (
+    ANALYTICS_COLUMNS, ANSWER_COLUMNS, MEDIA_COLUMN, PLAYER_COLUMNS, RAW_DATA_COLUMNS, InputSource, MemoryFile, get_reader,
+    input_extensions, is_raw_data, open_source, read_input, source_name,
+)
+from kahoot_to_anki.stats import Stats, peak_rss, peak_rss_growth
 
-def get_questions(input_directory: str, sheet_name: str) -> pd.DataFrame:
+
+# Replacements of html.escape, "&" has to be replaced first
+HTML_ESCAPES = [("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"), ('"', "&quot;"), ("'", "&#x27;")]
+
+# Answer columns which are stored as categoricals if at most this share of their values is distinct,
+# see compact_questions
+COMPACT_COLUMNS = ["Possible Answers", "Correct Answers"]
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+# Values of the "Correct / Incorrect" column of the players who answered
+CORRECT_RESULT = "Correct"
+PLAYER_RESULTS = ["Correct", "Incorrect"]
+
+# Name of the workbooks passed to get_excel_data as bytes or file objects without a name, used in the log
+MEMORY_WORKBOOK_NAME = "<workbook in memory>"
+
+# Output files
+ANKI_PACKAGE_FILE = "anki.apkg"
+ANKI_MANIFEST_VERSION = 1
+
+# Anki note type and deck ID of the generated decks, the model is shared by all decks
+ANKI_DECK_ID = 2059400110
+ANKI_MODEL = genanki.Model(
+    1607392319,
+    "Simple Model",
+    fields=[
+        {"name": "Question"},
+        {"name": "Answer"},
+        {"name": "selects"},
+    ],
+    templates=[
+        {
+            "name": "Card 1",
+            "qfmt": "{{Question}}<br><br>{{selects}}",
+            "afmt": '{{FrontSide}}<hr id="answer">{{Answer}}',
+        },
+    ],
+)
+
+
+def get_questions(
+    input_directory: str,
+    sheet_name: str,
+    jobs: int = 1,
+    reader: str = "pandas",
+    cache: Optional[ParseCache] = None,
+    stats: Optional[Stats] = None,
+    dedup: Optional[DedupIndex] = None,
+    files: Optional[Sequence[InputSource]] = None,
+    analytics: bool = False,
+) -> pd.DataFrame:
     """
     Extracts all the kahoot questions out of the Excel file(s)
 
     :param input_directory: The path to the input directory or Excel file
     :param sheet_name: The Excel sheet name with the Kahoot Answers
+    :param jobs: The number of worker processes used to read the Excel files
+    :param reader: The Excel reader, one of EXCEL_READERS
+    :param cache: An optional cache of the processed questions of each file
+    :param stats: Records the timings of the stages and files
+    :param dedup: An optional index of the questions seen so far, which also drops the questions that only
+        differ by its normalization rules. By default, questions with the same text are dropped.
+    :param files: The input files if they were already listed, by default the files of get_excels(input_directory).
+        MemoryFile inputs are read without touching the disk.
+    :param analytics: Add the ANALYTICS_COLUMNS of the questions, see timed_read_questions
     :return: All the questions with the possible answers and the solution
     :rtype: pd.DataFrame
     """
+    if stats is None:
+        stats = Stats()
 
-    out = pd.DataFrame(columns=["Question", "Possible Answers", "Correct Answers"])
+    if files is None:
+        with stats.stage("discover") as stage:
+            files = list(get_excels(input_directory))
+            stage["rows"] = len(files)
+
+    # collect the per-file results and combine them once at the end,
+    # concatenating inside the loop would copy the growing frame every time
+    frames = []
 
     questions_cnt = 0
     files_cnt = 0
 
-    for file in get_excels(input_directory):
-        df = get_excel_data(excel_file=file, sheet_name=sheet_name)
-        if df is None:
-            continue
-        files_cnt += 1
-
-        df = df_processing(df)
+    with stats.stage("read") as stage:
+        questions = iter_questions(
+            files, sheet_name=sheet_name, jobs=jobs, reader=reader, cache=cache, stats=stats, analytics=analytics
+        )
+        for df in questions:
+            if df is None:
+                continue
+            files_cnt += 1
 
-        # add to out dataframe
-        out = pd.concat([out, df], axis=0, ignore_index=True)
+            if df.empty:
+                continue
 
-        questions_cnt += len(df)
+            frames.append(df)
+            questions_cnt += len(df)
+        stage["rows"] = questions_cnt
 
     logging.info("Read input files: %d", files_cnt)
     logging.info("Read questions: %d", questions_cnt)
-    out = out.drop_duplicates(subset=["Question"])
+
+    if not frames:
+        return pd.DataFrame(columns=QUESTION_COLUMNS)
+
+    with stats.stage("dedup") as stage:
+        out = pd.concat(frames, axis=0, ignore_index=True)
+        if dedup is None:
+            out = out.drop_duplicates(subset=["Question"])
+        else:
+            out = dedup.filter(out)
+        stage["rows"] = len(out)
+
+    with stats.stage("compact") as stage:
+        out = compact_questions(out)
+        stage["rows"] = len(out)
     return out
 
 
-def get_excels(path: str) -> Iterator[str]:
+def iter_questions(
+    files: List[InputSource],
+    sheet_name: str,
+    jobs: int = 1,
+    reader: str = "pandas",
+    cache: Optional[ParseCache] = None,
+    stats: Optional[Stats] = None,
+    analytics: bool = False,
+) -> Iterator[Optional[pd.DataFrame]]:
+    """
+    Returns a generator with the processed questions of each Excel file, in the order of the files.
+    Cached files are loaded from the cache, the others are read with read_questions in up to jobs worker
+    processes. At most a few files per worker are in flight, so the memory does not grow with the number of files.
+
+    :param files: The Excel files, paths or MemoryFile inputs
+    :param sheet_name: The Excel sheet name with the Kahoot Answers
+    :param jobs: The number of worker processes used to read the Excel files
+    :param reader: The Excel reader, one of EXCEL_READERS
+    :param cache: An optional cache of the processed questions of each file on disk
+    :param stats: Records the timings of each file
+    :param analytics: Add the ANALYTICS_COLUMNS of the questions, see timed_read_questions
+    :return: a generator of the processed questions or None for each file which could not be read
+    """
+    if stats is None:
+        stats = Stats()
+    read = partial(timed_read_questions, sheet_name=sheet_name, reader=reader, analytics=analytics)
+
+    def resolve(file: InputSource, key: Optional[str], result, cached: bool) -> Optional[pd.DataFrame]:
+        if cached:
+            stats.add_file(file, source="cache", rows=len(result))
+            return result
+
+        if isinstance(result, Future):
+            result = result.result()
+        result, timings = result
+        stats.add_file(source_name(file), source="parsed", rows=None if result is None else len(result), **timings)
+        if cache is not None and key is not None and result is not None:
+            cache.store(key, result)
+        return result
+
+    with ExitStack() as stack:
+        executor = None
+        if jobs > 1 and len(files) > 1:
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=min(jobs, len(files))))
+
+        # results are yielded in the order of the files, so the deduplication keeps
+        # the same rows as a serial run
+        window = max(1, jobs) * 4
+        in_flight = deque()
+        for file in files:
+            key = None
+            result = None
+            # the cache keys are derived from the file stats, files in memory are always parsed
+            if cache is not None and not isinstance(file, MemoryFile):
+                with stats.stage("cache_lookup"):
+                    try:
+                        key = cache.key(file, sheet_name=sheet_name, reader=reader, analytics=analytics)
+                    except OSError as e:
+                        logging.warning("Failed to compute cache key of file '%s': %s", file, str(e))
+                    else:
+                        result = cache.load(key)
+
+            if result is not None:
+                in_flight.append((file, key, result, True))
+            elif executor is not None:
+                in_flight.append((file, key, executor.submit(read, file), False))
+            else:
+                in_flight.append((file, key, read(file), False))
+
+            while len(in_flight) >= window:
+                yield resolve(*in_flight.popleft())
+
+        while in_flight:
+            yield resolve(*in_flight.popleft())
+
+    if cache is not None:
+        cache.evict()
+        logging.info("Parse cache: %d hits, %d misses", cache.hits, cache.misses)
+
+
+def read_questions(
+    excel_file: InputSource, sheet_name: str, reader: str = "pandas", analytics: bool = False
+) -> Optional[pd.DataFrame]:
+    """
+    Reads and processes the Kahoot questions of a single Excel file.
+
+    :param excel_file: an Excel file with Kahoot raw data, a path or a MemoryFile
+    :param sheet_name: the Excel sheet name with the Kahoot answers
+    :param reader: the Excel reader, one of EXCEL_READERS
+    :param analytics: add the ANALYTICS_COLUMNS of the questions, see timed_read_questions
+    :return: the processed questions or None if the file could not be read
+    """
+    return timed_read_questions(excel_file, sheet_name=sheet_name, reader=reader, analytics=analytics)[0]
+
+
+def timed_read_questions(
+    excel_file: InputSource, sheet_name: str, reader: str = "pandas", analytics: bool = False
+) -> Tuple[Optional[pd.DataFrame], Dict[str, Optional[float]]]:
+    """
+    Reads and processes the Kahoot questions of a single Excel file and measures the time of both steps
+    and the growth of the peak RSS of the process which read it.
+    The files of the other input readers are read with read_input, see kahoot_to_anki.readers.
+    This is the unit of work of the worker processes in iter_questions.
+
+    :param excel_file: an Excel file (or CSV, Parquet, Feather or JSON Lines file) with Kahoot raw data,
+        a path or a MemoryFile
+    :param sheet_name: the Excel sheet name with the Kahoot answers
+    :param reader: the Excel reader, one of EXCEL_READERS
+    :param analytics: aggregate the PLAYER_COLUMNS of the raw data to the ANALYTICS_COLUMNS of the questions,
+        otherwise the player columns are not read from Excel files and dropped from the other inputs,
+        like the ANALYTICS_COLUMNS of processed questions
+    :return: the processed questions or None if the file could not be read,
+        and the read_s, process_s and cpu_s timings in seconds and the peak_rss_growth_bytes, see peak_rss_growth
     """
-    Returns a generator with all Excel files in the given path.
+    rss = peak_rss()
+    start = time.perf_counter()
+    cpu = time.process_time()
+    if get_reader(source_name(excel_file)) is not None:
+        # CSV, Parquet and JSON Lines files are read without openpyxl, exports are already processed
+        try:
+            df = read_input(excel_file)
+        except Exception as e:
+            logging.error("Failed to read file '%s': %s", source_name(excel_file), str(e))
+            df = None
+    else:
+        df = get_excel_data(excel_file=excel_file, sheet_name=sheet_name, reader=reader, analytics=analytics)
+    read = time.perf_counter()
+    if df is not None and is_raw_data(df):
+        if not analytics:
+            df = df.drop(columns=PLAYER_COLUMNS, errors="ignore")
+        df = df_processing(df)
+    elif df is not None and not analytics:
+        # processed questions, e.g. exports, keep their analytics only if they are used like those of the raw data
+        df = df.drop(columns=ANALYTICS_COLUMNS, errors="ignore")
+    end = time.perf_counter()
+    return df, {
+        "read_s": read - start, "process_s": end - read, "cpu_s": time.process_time() - cpu,
+        "peak_rss_growth_bytes": peak_rss_growth(rss),
+    }
+
+
+def get_excels(
+    path: str,
+    include: Sequence[str] = (),
+    exclude: Sequence[str] = (),
+    recursive: bool = False,
+    threads: int = DEFAULT_DISCOVER_THREADS,
+) -> Iterator[str]:
+    """
+    Returns a generator with all Excel files (and the files of the other input readers, see input_extensions)
+    in the given path, sorted by path. Excel lock files (~$*.xlsx) are skipped.
     :param path: the path to an Excel file or a directory with Excel files
+    :param include: glob patterns of the relative file paths of which the files have to match one
+    :param exclude: glob patterns of the relative paths of the skipped files and directories
+    :param recursive: whether the files of the subdirectories are returned as well
+    :param threads: the number of threads listing the directories, see discover_files
     :return: a generator of Excel file paths
     """
-    if os.path.isfile(path):
-        yield path
-    else:
-        yield from glob.glob(os.path.join(path, "*.xlsx"))
+    yield from discover_files(path, input_extensions(), include, exclude, recursive, threads)
 
 
-def get_excel_data(excel_file: str, sheet_name:str) -> Optional[pd.DataFrame]:
+def get_excel_data(
+    excel_file: Union[InputSource, "os.PathLike[str]", bytes, IO[bytes]],
+    sheet_name: str,
+    reader: str = "pandas",
+    analytics: bool = True,
+) -> Optional[pd.DataFrame]:
     """
     Returns a pd.DataFrame with the kahoot raw data
-    :param excel_file: an Excel file with Kahoot raw data
+    :param excel_file: an Excel file with Kahoot raw data: a path (str or os.PathLike), a MemoryFile, or the content
+        of the workbook as bytes or a binary file object (e.g. io.BytesIO), which is read without touching the disk
     :param sheet_name: the Excel sheet name with the Kahoot answers
+    :param reader: "pandas" reads the whole sheet with pd.read_excel,
+        "streaming" only reads the needed rows and columns with read_excel_streaming
+    :param analytics: whether the PLAYER_COLUMNS are read, which are only needed for the analytics of the questions
     :return: a DataFrame with the data
     """
+    if isinstance(excel_file, os.PathLike):
+        excel_file = os.fspath(excel_file)
+    elif not isinstance(excel_file, (str, MemoryFile)):
+        excel_file = MemoryFile(getattr(excel_file, "name", MEMORY_WORKBOOK_NAME), excel_file)
     try:
         # read file
+        if reader == "streaming":
+            return read_excel_streaming(open_source(excel_file), sheet_name=sheet_name, analytics=analytics)
         return pd.read_excel(
-            excel_file, sheet_name=sheet_name
+            open_source(excel_file), sheet_name=sheet_name,
+            usecols=None if analytics else lambda name: name not in PLAYER_COLUMNS,
         )
     except ValueError:
         logging.warning(
-            "Skipping file '%s' as it is not a valid Excel file.", excel_file
+            "Skipping file '%s' as it is not a valid Excel file.", source_name(excel_file)
         )
         return None
     except Exception as e:
-        logging.error("Failed to read file '%s': %s", excel_file, str(e))
+        logging.error("Failed to read file '%s': %s", source_name(excel_file), str(e))
         return None
 
 
+def read_excel_streaming(excel_file: Union[str, IO[bytes]], sheet_name: str, analytics: bool = True) -> pd.DataFrame:
+    """
+    Reads the Kahoot raw data by streaming the rows of the sheet with a read-only openpyxl workbook.
+    Only the RAW_DATA_COLUMNS (and MEDIA_COLUMN) are kept and the per-player rows that repeat a question number
+    are skipped before they are materialised. With analytics, only the PLAYER_COLUMNS of these rows are collected
+    and aggregated to the ANALYTICS_COLUMNS, see question_analytics.
+    :param excel_file: an Excel file with Kahoot raw data, a path or a binary file object with its content
+    :param sheet_name: the Excel sheet name with the Kahoot answers
+    :param analytics: whether the PLAYER_COLUMNS are read, otherwise the cells right of the last needed
+        question column are not materialised
+    :return: a DataFrame with one row per question, with the ANALYTICS_COLUMNS if analytics is set and
+        the sheet has PLAYER_COLUMNS
+    :raises ValueError: if the file is not a valid Excel file or the sheet does not exist
+    """
+    # openpyxl is only imported if Excel files are read
+    import openpyxl
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    try:
+        workbook = openpyxl.load_workbook(excel_file, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError) as e:
+        raise ValueError(f"Excel file '{getattr(excel_file, 'name', excel_file)}' could not be opened: {e}") from e
+
+    try:
+        if sheet_name not in workbook.sheetnames:
+            raise ValueError(f"Worksheet named '{sheet_name}' not found")
+
+        sheet = workbook[sheet_name]
+        header = next(sheet.iter_rows(max_row=1, values_only=True), None)
+        if header is None:
+            return pd.DataFrame()
+
+        # project the needed columns in the order of the sheet
+        indices = [i for i, name in enumerate(header) if name in RAW_DATA_COLUMNS or name == MEDIA_COLUMN]
+        columns = [header[i] for i in indices]
+        number_index = columns.index("Question Number") if "Question Number" in columns else None
+        # the player columns of all rows are aggregated to the analytics of the questions
+        player_indices = []
+        if analytics and number_index is not None:
+            player_indices = [i for i, name in enumerate(header) if name in PLAYER_COLUMNS]
+
+        # cells right of the last needed column are not materialised
+        rows = sheet.iter_rows(min_row=2, max_col=max(indices + player_indices, default=0) + 1, values_only=True)
+        records = []
+        players = []
+        seen = set()
+        for row in rows:
+            record = tuple(row[i] if i < len(row) else None for i in indices)
+            if all(value is None for value in record):
+                continue
+            if number_index is not None:
+                number = record[number_index]
+                if player_indices:
+                    players.append((number, *(row[i] if i < len(row) else None for i in player_indices)))
+                if number in seen:
+                    continue
+                seen.add(number)
+            records.append(record)
+    finally:
+        workbook.close()
+
+    df = pd.DataFrame.from_records(records, columns=columns)
+    if players:
+        analytics = question_analytics(
+            pd.DataFrame.from_records(players, columns=["Question Number", *(header[i] for i in player_indices)])
+        )
+        for column in ANALYTICS_COLUMNS:
+            df[column] = analytics[column].reindex(df["Question Number"].to_numpy()).to_numpy(dtype=float)
+    return df
+
+
 def df_processing(data: pd.DataFrame) -> pd.DataFrame:
     """
     Processes the Kahoot question data.
+    The image or video of the optional MEDIA_COLUMN is referenced below the question, see media_reference,
+    and its HTML-escaped source is kept in the MEDIA_COLUMN for MediaStore.embed.
+    If the data has the PLAYER_COLUMNS, the ANALYTICS_COLUMNS of each question are added, see question_analytics.
     :param data: DataFrame with Kahoot question data
     :return: Processed DataFrame
     """
     if data.empty:
-        return pd.DataFrame(columns=["Question", "Possible Answers", "Correct Answers"])
-    
+        return pd.DataFrame(columns=QUESTION_COLUMNS)
+
+    # the per-player rows are aggregated in one groupby before the duplicated questions are deleted
+    analytics = None
+    if any(column in data.columns for column in PLAYER_COLUMNS):
+        analytics = question_analytics(data)
+
     # delete duplicated questions
     data = data.drop_duplicates(subset=["Question Number"])
-    data = data.fillna("")
-    
-    # HTML-encode special chars
-    data = data.apply(lambda col: col.map(lambda x: html.escape(x) if isinstance(x, str) else x))
+    if analytics is not None:
+        analytics = analytics.reindex(data["Question Number"].to_numpy())
+    elif all(column in data.columns for column in ANALYTICS_COLUMNS):
+        # aggregated while the rows were read, see read_excel_streaming
+        analytics = data[ANALYTICS_COLUMNS]
+    media = [MEDIA_COLUMN] if MEDIA_COLUMN in data.columns else []
+    data = data[["Question", *ANSWER_COLUMNS, "Correct Answers", *media]].fillna("").astype(str)
+
+    # HTML-encode special chars of the output fields
+    possible_answers = escape_html(data[ANSWER_COLUMNS[0]])
+    for column in ANSWER_COLUMNS[1:]:
+        possible_answers = possible_answers + "<br>" + escape_html(data[column])
+
+    question = escape_html(data["Question"])
+    if media:
+        sources = escape_html(data[MEDIA_COLUMN].str.strip())
+        references = sources.map(media_reference)
+        question = question.where(references == "", question + "<br>" + references)
 
-    data["Possible Answers"] = data[
-        ["Answer 1", "Answer 2", "Answer 3", "Answer 4", "Answer 5", "Answer 6"]
-    ].astype(str).agg("<br>".join, axis=1)
+    df = pd.DataFrame({
+        "Question": question,
+        "Possible Answers": possible_answers,
+        "Correct Answers": escape_html(data["Correct Answers"]),
+    })
+    if media:
+        df[MEDIA_COLUMN] = sources
+    if analytics is not None:
+        for column in ANALYTICS_COLUMNS:
+            df[column] = analytics[column].to_numpy(dtype=float)
+    return df
 
-    # keep only needed columns
-    data = data[["Question", "Possible Answers", "Correct Answers"]]
-    
-    return data
 
+def question_analytics(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregates the per-player rows of the raw data to the percent of the players who answered each question
+    correctly and their average answer time in seconds, in a single groupby over the loaded rows.
+    Players without a result (who did not answer) are not counted.
 
-def make_anki(df: pd.DataFrame, out: str, title: str) -> None:
+    :param data: The raw data with the Question Number and some of the PLAYER_COLUMNS, one row per player and question
+    :return: The ANALYTICS_COLUMNS indexed by the question number, NaN if the player column is missing
+    """
+    values = {}
+    answered = None
+    if "Correct / Incorrect" in data.columns:
+        result = data["Correct / Incorrect"]
+        answered = result.isin(PLAYER_RESULTS)
+        values["Percent Correct"] = result.eq(CORRECT_RESULT).astype(float).where(answered) * 100
+    if "Answer Time (seconds)" in data.columns:
+        seconds = pd.to_numeric(data["Answer Time (seconds)"], errors="coerce").astype(float)
+        values["Average Answer Time"] = seconds if answered is None else seconds.where(answered)
+
+    # grouping by the column hashes the question numbers in their own dtype, e.g. Arrow strings
+    analytics = pd.DataFrame(values, index=data.index).groupby(data["Question Number"], sort=False).mean()
+    return analytics.reindex(columns=ANALYTICS_COLUMNS)
+
+
+def select_questions(df: pd.DataFrame, only_below: Optional[float] = None, order: str = "input") -> pd.DataFrame:
+    """
+    Filters and orders the questions of a deck by their analytics, see question_analytics.
+    Questions without analytics, e.g. of raw data without the player rows or of exports written without
+    analytics, are dropped by only_below and ordered last by difficulty, with a warning.
+
+    :param df: The processed questions
+    :param only_below: Only keep the questions which less than this percent of the players answered correctly
+    :param order: One of DECK_ORDERS, "input" keeps the order of the input files, "difficulty" orders
+        the questions from the lowest to the highest percent correct
+    :return: The selected questions
+    """
+    if only_below is None and order == "input":
+        return df
+
+    if "Percent Correct" in df.columns:
+        percent = df["Percent Correct"].to_numpy(dtype=float)
+    else:
+        percent = np.full(len(df), np.nan)
+    without = int(np.isnan(percent).sum())
+    if without:
+        logging.warning(
+            "%d of %d questions have no analytics (no player rows in the input), they are %s",
+            without, len(df), "skipped" if only_below is not None else "ordered last",
+        )
+    if only_below is not None:
+        keep = percent < only_below
+        df, percent = df[keep], percent[keep]
+    if order == "difficulty":
+        # NaN is sorted last, questions with the same percentage keep their order
+        df = df.iloc[np.argsort(percent, kind="stable")]
+    return df
+
+
+def question_tags(df: pd.DataFrame) -> List[List[str]]:
+    """
+    Returns the tags of the analytics of each question, so the notes can be searched by difficulty in Anki,
+    e.g. "percent_correct::60" for 60 to 69 percent correct and "answer_time::5" for 5 to 5.99 seconds.
+
+    :param df: The processed questions
+    :return: The tags of each question, empty if the question has no analytics
+    """
+    missing = [np.nan] * len(df)
+    percents = df["Percent Correct"].tolist() if "Percent Correct" in df.columns else missing
+    times = df["Average Answer Time"].tolist() if "Average Answer Time" in df.columns else missing
+
+    tags = []
+    for percent, seconds in zip(percents, times):
+        note_tags = []
+        if not np.isnan(percent):
+            note_tags.append(f"percent_correct::{int(percent // 10 * 10)}")
+        if not np.isnan(seconds):
+            note_tags.append(f"answer_time::{int(seconds)}")
+        tags.append(note_tags)
+    return tags
+
+
+def compact_questions(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Reduces the memory of the questions kept between the processing and the deck writing.
+    Answers like "True" and "False" repeat across many questions, so answer columns with few distinct
+    values are stored as categoricals, which keep every distinct string once and a small integer code per row.
+    The questions are unique after the deduplication and stay strings.
+
+    :param df: The processed questions
+    :return: The questions with the repetitive answer columns as categoricals
+    """
+    columns = {}
+    for column in COMPACT_COLUMNS:
+        series = df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            continue
+        if series.nunique() <= len(series) * CATEGORY_MAX_UNIQUE_RATIO:
+            columns[column] = series.astype("category")
+    return df.assign(**columns) if columns else df
+
+
+def escape_html(series: pd.Series) -> pd.Series:
+    """
+    HTML-encodes the special chars of a string Series, like html.escape but with vectorized string operations.
+    :param series: Series of strings
+    :return: Series with the escaped strings
+    """
+    for char, entity in HTML_ESCAPES:
+        series = series.str.replace(char, entity, regex=False)
+    return series
+
+
+def make_anki(
+    df: pd.DataFrame,
+    out: Union[str, IO[bytes]],
+    title: str,
+    incremental: bool = False,
+    writer: str = "genanki",
+    stats: Optional[Stats] = None,
+    deck_id: int = ANKI_DECK_ID,
+    filename: str = ANKI_PACKAGE_FILE,
+    media: Optional[MediaStore] = None,
+    reproducible: bool = False,
+    only_below: Optional[float] = None,
+    order: str = "input",
+    timestamp: Optional[float] = None,
+) -> bool:
     """
     Creates an Anki deck from the given Kahoot questions
 
+    The notes get a GUID derived from the question, so re-importing a package into Anki
+    updates the existing notes instead of duplicating them. Questions with analytics are tagged with them,
+    see question_tags.
+    In incremental mode, the package only contains the notes which are new or changed since the
+    previous incremental run, as recorded in the manifest next to the package.
+
     :param df: The kahoot questions in a pd.DataFrame
-    :param out: The path to the output directory
+    :param out: The path to the output directory, or a writable binary file object (e.g. io.BytesIO)
+        the package is written into. The collection of a package written into a file object is built in memory,
+        see kahoot_to_anki.apkg.temporary_collection.
     :param title: The title of the Anki deck
-    :return: None
+    :param incremental: Only write new or changed questions to the package
+    :param writer: The package writer, one of ANKI_WRITERS. "genanki" writes the package with
+        genanki.Package, "fast" with the bulk SQLite writer kahoot_to_anki.apkg.write_apkg
+    :param stats: Records the timings of building the notes and writing the package
+    :param deck_id: The ID of the Anki deck
+    :param filename: The name of the package file, the manifest is named after it
+    :param media: An optional store of the media files, the media referenced by the questions are added to the package
+    :param reproducible: Write a package with fixed timestamps and zip metadata, so the same questions and media
+        always give the same bytes
+    :param only_below: Only write the questions which less than this percent of the players answered correctly
+    :param order: The order of the notes, one of DECK_ORDERS, see select_questions
+    :param timestamp: Seconds since the epoch of the notes, by default see kahoot_to_anki.apkg.reproducible_timestamp
+        for reproducible packages and now otherwise
+    :return: True if the package was written, False if there were no notes to write or writing it failed
+    :raises ValueError: if an incremental package is written into a file object, which has no manifest
     """
-    my_model = genanki.Model(
-        1607392319,
-        "Simple Model",
-        fields=[
-            {"name": "Question"},
-            {"name": "Answer"},
-            {"name": "selects"},
-        ],
-        templates=[
-            {
-                "name": "Card 1",
-                "qfmt": "{{Question}}<br><br>{{selects}}",
-                "afmt": '{{FrontSide}}<hr id="answer">{{Answer}}',
-            },
-        ],
-    )
-
-    my_deck = genanki.Deck(2059400110, title)
-
-    for index, row in df.iterrows():
-        my_note = genanki.Note(
-            model=my_model,
-            fields=[row["Question"], row["Correct Answers"], row["Possible Answers"]],
+    if stats is None:
+        stats = Stats()
+    to_directory = isinstance(out, str)
+    if incremental and not to_directory:
+        logging.error("Incremental builds need an output directory for the manifest")
+        raise ValueError("Incremental builds need an output directory for the manifest")
+
+    if only_below is not None or order != "input":
+        selected = select_questions(df, only_below=only_below, order=order)
+        if only_below is not None:
+            logging.info("Questions below %g%% correct: %d of %d", only_below, len(selected), len(df))
+            if selected.empty:
+                logging.warning("No questions below %g%% correct, Anki package not written.", only_below)
+                return False
+        df = selected
+
+    # the GUIDs are derived from the questions with the original media references
+    guids = map(note_guid, df["Question"].tolist())
+    media_files = []
+    if media is not None:
+        with stats.stage("media") as stage:
+            df, media_files = media.embed(df)
+            stage["rows"] = len(media_files)
+
+    manifest_path = os.path.join(out, manifest_filename(filename)) if to_directory else None
+    manifest = load_manifest(manifest_path) if incremental else {}
+    checksums = {}
+    notes = []
+
+    with stats.stage("notes") as stage:
+        # pull the fields out of the frame once instead of building a Series per row
+        rows = zip(df["Question"].tolist(), df["Correct Answers"].tolist(), df["Possible Answers"].tolist())
+        for guid, fields, tags in zip(guids, rows, question_tags(df)):
+            if incremental:
+                checksum = fields_checksum([*fields, *tags])
+                checksums[guid] = checksum
+                if manifest.get(guid) == checksum:
+                    continue
+
+            notes.append((guid, list(fields), tags))
+        stage["rows"] = len(notes)
+
+    if incremental:
+        logging.info(
+            "New or changed questions: %d of %d", len(notes), len(checksums)
         )
-        my_deck.add_note(my_note)
+        if not notes:
+            logging.info("No new or changed questions, Anki package not written.")
+            return False
 
+    path: PackageTarget = os.path.join(out, filename) if to_directory else out
     try:
-        genanki.Package(my_deck).write_to_file(
-            os.path.join(out, "anki.apkg"),
-        )
+        with stats.stage("package") as stage:
+            if writer == "fast":
+                write_apkg(
+                    path, ANKI_MODEL, deck_id, title, notes, timestamp=timestamp, media_files=media_files,
+                    reproducible=reproducible,
+                )
+            else:
+                my_deck = genanki.Deck(deck_id, title)
+                for guid, fields, tags in notes:
+                    my_deck.add_note(genanki.Note(model=ANKI_MODEL, fields=fields, guid=guid, tags=tags))
+                write_genanki_package(
+                    genanki.Package(my_deck, media_files=media_files), path, timestamp=timestamp,
+                    reproducible=reproducible,
+                )
+            stage["rows"] = len(notes)
     except Exception as e:
-        logging.error("Failed to write Anki package file: %s", str(e))
\ No newline at end of file
+        logging.error("Failed to write Anki package file: %s", str(e))
+        return False
+
+    if incremental:
+        write_manifest(manifest_path, {**manifest, **checksums})
+    return True
+
+
+def manifest_filename(package_filename: str) -> str:
+    """
+    Returns the name of the manifest of an incremental build of a package, e.g. anki.manifest.json for anki.apkg.
+
+    :param package_filename: The name of the package file
+    :return: The name of the manifest file
+    """
+    return os.path.splitext(package_filename)[0] + ".manifest.json"
+
+
+def note_guid(question: str) -> str:
+    """
+    Returns the GUID of the note of a question.
+    It only depends on the question, so a changed answer updates the note in Anki.
+
+    :param question: The (HTML-escaped) question text
+    :return: The Anki note GUID
+    """
+    return genanki.guid_for(question)
+
+
+def fields_checksum(fields: Sequence[str]) -> str:
+    """
+    Returns a checksum of the note fields to detect changed questions.
+
+    :param fields: The fields of the note
+    :return: The hex digest of the fields
+    """
+    return hashlib.sha1("\x1f".join(str(field) for field in fields).encode("utf-8")).hexdigest()
+
+
+def load_manifest(path: str) -> Dict[str, str]:
+    """
+    Reads the manifest of an incremental build.
+
+    :param path: The path of the manifest file
+    :return: The field checksums of the notes by GUID, empty if there is no valid manifest
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logging.warning("Ignoring invalid manifest '%s', writing all questions: %s", path, str(e))
+        return {}
+
+    if manifest.get("version") != ANKI_MANIFEST_VERSION:
+        logging.warning("Ignoring manifest '%s' with unknown version, writing all questions.", path)
+        return {}
+    return manifest["notes"]
+
+
+def write_manifest(path: str, notes: Dict[str, str]) -> None:
+    """
+    Writes the manifest of an incremental build.
+
+    :param path: The path of the manifest file
+    :param notes: The field checksums of the notes by GUID
+    :return: None
+    """
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"version": ANKI_MANIFEST_VERSION, "notes": notes}, f)
+    except OSError as e:
+        logging.error("Failed to write manifest file: %s", str(e))
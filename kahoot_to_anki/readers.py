@@ -0,0 +1,272 @@
+# Standard library imports
+import csv
+import io
+import logging
+import os
+from dataclasses import dataclass
+from typing import IO, TYPE_CHECKING, Callable, Dict, List, Optional, Union
+
+from kahoot_to_anki.constants import QUESTION_COLUMNS
+
+# pandas is only imported when a file is read, so the CLI can list the input extensions without it
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+# Columns of the Kahoot raw data ("RawReportData Data" sheet) used by df_processing
+ANSWER_COLUMNS = ["Answer 1", "Answer 2", "Answer 3", "Answer 4", "Answer 5", "Answer 6"]
+RAW_DATA_COLUMNS = ["Question Number", "Question", *ANSWER_COLUMNS, "Correct Answers"]
+# Optional column of the raw data with the path or URL of an image or video of the question, see media_reference
+MEDIA_COLUMN = "Media"
+# Optional per-player columns of the raw data, aggregated to the analytics of each question, see question_analytics
+PLAYER_COLUMNS = ["Correct / Incorrect", "Answer Time (seconds)"]
+OPTIONAL_RAW_DATA_COLUMNS = [MEDIA_COLUMN, *PLAYER_COLUMNS]
+# Columns of the per-question analytics, aggregated from the per-player rows of the raw data, see question_analytics
+ANALYTICS_COLUMNS = ["Percent Correct", "Average Answer Time"]
+# Optional columns of the processed questions, kept by read_input and exported by export.QuestionExporter
+OPTIONAL_QUESTION_COLUMNS = [MEDIA_COLUMN, *ANALYTICS_COLUMNS]
+# Columns without which a raw data file cannot be processed, missing answer columns are empty
+REQUIRED_RAW_DATA_COLUMNS = ["Question Number", "Question", "Correct Answers"]
+
+# Delimiters of the CSV files, "," for raw data and ";" for the kahoot.csv export
+CSV_DELIMITERS = ",;\t"
+
+# A reader loads the columns of an input file from its path or from a binary file object, see read_input
+InputReader = Callable[[Union[str, IO[bytes]]], "pd.DataFrame"]
+
+
+@dataclass(frozen=True)
+class MemoryFile:
+    """
+    An input file which is already in memory, e.g. an upload, read without writing it to disk.
+    The extension of the name selects the reader like for the files on disk.
+    """
+    name: str
+    data: Union[bytes, bytearray, memoryview, IO[bytes]]
+
+    def open(self) -> IO[bytes]:
+        """
+        Returns a binary file object with the content, positioned at its start.
+
+        :return: A BytesIO sharing the bytes or the seekable file object of the data
+        """
+        if isinstance(self.data, (bytes, bytearray, memoryview)):
+            return io.BytesIO(self.data)
+        self.data.seek(0)
+        return self.data
+
+
+# An input file: the path of a file on disk or a MemoryFile
+InputSource = Union[str, MemoryFile]
+
+
+def source_name(source: InputSource) -> str:
+    """
+    Returns the name of an input file used to select its reader and in the log.
+
+    :param source: The path or the MemoryFile
+    :return: The path or the name of the MemoryFile
+    """
+    return source.name if isinstance(source, MemoryFile) else source
+
+
+def open_source(source: InputSource) -> Union[str, IO[bytes]]:
+    """
+    Returns what a reader reads an input file from.
+
+    :param source: The path or the MemoryFile
+    :return: The path or a binary file object with the content of the MemoryFile
+    """
+    return source.open() if isinstance(source, MemoryFile) else source
+
+
+def input_columns(columns: List[str]) -> List[str]:
+    """
+    Returns the columns of an input file which are needed, of the raw data or of the processed questions.
+
+    :param columns: The columns of the file
+    :return: The needed columns in the order of the file
+    """
+    return [column for column in columns if is_input_column(column)]
+
+
+def is_input_column(column: str) -> bool:
+    """
+    Returns whether a column of an input file is needed.
+
+    :param column: The column name
+    :return: True for the raw data columns and the processed question columns, with their optional columns
+    """
+    return (
+        column in RAW_DATA_COLUMNS or column in OPTIONAL_RAW_DATA_COLUMNS
+        or column in QUESTION_COLUMNS or column in OPTIONAL_QUESTION_COLUMNS
+    )
+
+
+def read_csv_data(path: Union[str, IO[bytes]]) -> "pd.DataFrame":
+    """
+    Reads a CSV file, the delimiter is detected from the header line.
+
+    :param path: The path of the CSV file or a binary file object with its content
+    :return: The needed columns as strings
+    """
+    import pandas as pd
+
+    if isinstance(path, str):
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            header = f.readline()
+    else:
+        position = path.tell()
+        header = path.readline().decode("utf-8-sig", errors="replace")
+        path.seek(position)
+    try:
+        delimiter = csv.Sniffer().sniff(header, delimiters=CSV_DELIMITERS).delimiter
+    except csv.Error:
+        delimiter = ","
+    return pd.read_csv(
+        path, sep=delimiter, encoding="utf-8-sig", dtype=str, keep_default_na=False,
+        usecols=is_input_column,
+    )
+
+
+def read_parquet_data(path: Union[str, IO[bytes]]) -> "pd.DataFrame":
+    """
+    Reads the needed columns of a Parquet file, the other columns are not decoded.
+
+    :param path: The path of the Parquet file or a binary file object with its content
+    :return: The needed columns
+    """
+    import pandas as pd
+    from kahoot_to_anki.export import import_pyarrow
+
+    pa = import_pyarrow()
+    position = None if isinstance(path, str) else path.tell()
+    names = pa.parquet.read_schema(path).names
+    if position is not None:
+        path.seek(position)
+    return pd.read_parquet(path, columns=input_columns(names))
+
+
+def read_feather_data(path: Union[str, IO[bytes]]) -> "pd.DataFrame":
+    """
+    Reads the needed columns of a Feather file.
+
+    :param path: The path of the Feather file or a binary file object with its content
+    :return: The needed columns
+    """
+    import pandas as pd
+    from kahoot_to_anki.export import import_pyarrow
+
+    pa = import_pyarrow()
+    position = None if isinstance(path, str) else path.tell()
+    with pa.ipc.open_file(path) as reader:
+        names = reader.schema.names
+    if position is not None:
+        path.seek(position)
+    return pd.read_feather(path, columns=input_columns(names))
+
+
+def read_jsonl_data(path: Union[str, IO[bytes]]) -> "pd.DataFrame":
+    """
+    Reads a JSON Lines file with one object per row.
+
+    :param path: The path of the JSON Lines file or a binary file object with its content
+    :return: The needed columns
+    """
+    import pandas as pd
+
+    df = pd.read_json(path, orient="records", lines=True, dtype=False)
+    return df[input_columns(list(df.columns))]
+
+
+# Readers of the input files other than Excel by extension, see register_reader
+INPUT_READERS: Dict[str, InputReader] = {
+    ".csv": read_csv_data,
+    ".parquet": read_parquet_data,
+    ".feather": read_feather_data,
+    ".jsonl": read_jsonl_data,
+}
+
+
+def register_reader(extension: str, reader: InputReader) -> None:
+    """
+    Registers the reader of the input files with an extension, e.g. for data exported from a warehouse.
+    The reader returns a DataFrame with the columns of the "RawReportData Data" sheet (RAW_DATA_COLUMNS)
+    or of the processed questions (QUESTION_COLUMNS).
+
+    :param extension: The file extension with the dot, e.g. ".tsv"
+    :param reader: A function which reads a file from its path, or from a binary file object for a MemoryFile
+    :return: None
+    """
+    extension = extension.lower()
+    if extension == ".xlsx":
+        logging.error("Excel files are read by get_excel_data")
+        raise ValueError("Excel files are read by get_excel_data")
+    INPUT_READERS[extension] = reader
+
+
+def get_reader(path: str) -> Optional[InputReader]:
+    """
+    Returns the reader of an input file by its extension.
+
+    :param path: The path of the input file
+    :return: The reader or None for Excel files and unknown extensions
+    """
+    return INPUT_READERS.get(os.path.splitext(path)[1].lower())
+
+
+def input_extensions() -> List[str]:
+    """
+    Returns the extensions of the input files, the Excel files and those of the registered readers.
+
+    :return: The extensions with the dot
+    """
+    return [".xlsx", *INPUT_READERS]
+
+
+def is_raw_data(df: "pd.DataFrame") -> bool:
+    """
+    Returns whether the data of an input file is raw data which still has to be processed by df_processing.
+
+    :param df: The data returned by read_input
+    :return: True for raw data, False for processed questions
+    """
+    return "Question Number" in df.columns
+
+
+def read_input(source: InputSource) -> "pd.DataFrame":
+    """
+    Reads an input file other than Excel with the reader of its extension. Files with a "Question Number"
+    column are raw data like the "RawReportData Data" sheet, the other files must contain the
+    processed questions, e.g. the exports of earlier runs.
+
+    :param source: The path of the input file or a MemoryFile
+    :return: The RAW_DATA_COLUMNS (and OPTIONAL_RAW_DATA_COLUMNS) of raw data, see is_raw_data,
+        or the QUESTION_COLUMNS (and OPTIONAL_QUESTION_COLUMNS) of processed questions
+    :raises ValueError: if there is no reader for the extension or needed columns are missing
+    """
+    path = source_name(source)
+    reader = get_reader(path)
+    if reader is None:
+        raise ValueError(f"{path} has no reader, expected one of {sorted(INPUT_READERS)}")
+    df = reader(open_source(source))
+
+    if is_raw_data(df):
+        missing = [column for column in REQUIRED_RAW_DATA_COLUMNS if column not in df.columns]
+        if missing:
+            raise ValueError(f"{path} does not contain the columns {missing}")
+        optional = [column for column in OPTIONAL_RAW_DATA_COLUMNS if column in df.columns]
+        return df.reindex(columns=RAW_DATA_COLUMNS + optional)
+
+    missing = [column for column in QUESTION_COLUMNS if column not in df.columns]
+    if missing:
+        raise ValueError(f"{path} does not contain the raw data column 'Question Number' or the columns {missing}")
+    import pandas as pd
+
+    strings = [column for column in OPTIONAL_QUESTION_COLUMNS if column in df.columns and column not in ANALYTICS_COLUMNS]
+    out = df[QUESTION_COLUMNS + strings].fillna("").astype(str)
+    for column in ANALYTICS_COLUMNS:
+        if column in df.columns:
+            # empty cells of the CSV export are questions without analytics
+            out[column] = pd.to_numeric(df[column], errors="coerce").astype(float)
+    return out
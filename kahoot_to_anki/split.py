@@ -0,0 +1,248 @@
+# Standard library imports
+import hashlib
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence
+
+# Third-party library imports
+import pandas as pd
+
+from kahoot_to_anki.cache import ParseCache
+from kahoot_to_anki.constants import SPLIT_MODES
+from kahoot_to_anki.dedup import DedupIndex
+from kahoot_to_anki.export import export_formats, write_exports
+from kahoot_to_anki.media import MediaStore
+from kahoot_to_anki.processing import compact_questions, get_excels, iter_questions, make_anki
+from kahoot_to_anki.stats import Stats
+
+
+# Range of the derived deck IDs, the same range genanki uses for random deck IDs
+DECK_ID_MIN = 1 << 30
+DECK_ID_MAX = 1 << 31
+
+
+def group_key(
+    file: str, split_by: str, pattern: Optional[str] = None, root: Optional[str] = None
+) -> Optional[str]:
+    """
+    Returns the key of the deck an Excel file belongs to.
+
+    "file" groups by the file name without extension, "directory" by the path of the parent directory relative
+    to the root (e.g. "courseA/week1", the name of the root for the files directly inside it) and
+    "pattern" by the first group of the regular expression matched against the file name
+    (or by the whole match if it has no groups).
+
+    :param file: The path of the Excel file
+    :param split_by: One of SPLIT_MODES
+    :param pattern: The regular expression for "pattern"
+    :param root: The input directory of "directory", by default the key is the name of the parent directory
+    :return: The group key or None if the file name does not match the pattern
+    """
+    if split_by == "file":
+        return os.path.splitext(os.path.basename(file))[0]
+    if split_by == "directory":
+        parent = os.path.dirname(os.path.abspath(file))
+        if root is not None:
+            # subdirectories with the same name in different courses must not share a deck
+            relative = os.path.relpath(parent, os.path.abspath(root))
+            if relative != os.curdir and not relative.startswith(os.pardir):
+                return relative.replace(os.sep, "/")
+        return os.path.basename(parent)
+    if split_by == "pattern":
+        match = re.search(pattern, os.path.basename(file))
+        if match is None:
+            return None
+        return match.group(1) if match.re.groups and match.group(1) is not None else match.group(0)
+    raise ValueError(f"Unknown split mode {split_by}, expected one of {SPLIT_MODES}")
+
+
+def get_question_groups(
+    input_directory: str,
+    sheet_name: str,
+    split_by: str,
+    pattern: Optional[str] = None,
+    jobs: int = 1,
+    reader: str = "pandas",
+    cache: Optional[ParseCache] = None,
+    stats: Optional[Stats] = None,
+    dedup: Optional[DedupIndex] = None,
+    files: Optional[Sequence[str]] = None,
+    analytics: bool = False,
+) -> Dict[str, pd.DataFrame]:
+    """
+    Extracts the kahoot questions out of the Excel file(s) grouped into decks.
+    Every file is read once, the questions are deduplicated within each group.
+
+    :param input_directory: The path to the input directory or Excel file
+    :param sheet_name: The Excel sheet name with the Kahoot Answers
+    :param split_by: The grouping of the files, one of SPLIT_MODES
+    :param pattern: The regular expression of split_by "pattern"
+    :param jobs: The number of worker processes used to read the Excel files
+    :param reader: The Excel reader, one of EXCEL_READERS
+    :param cache: An optional cache of the processed questions of each file
+    :param stats: Records the timings of the stages and files
+    :param dedup: An optional index whose settings are used for the deduplication within each group
+    :param files: The input files if they were already listed, by default the files of get_excels(input_directory)
+    :param analytics: Add the analytics of the questions, see timed_read_questions
+    :return: The questions of each group with at least one question, sorted by group key
+    """
+    if stats is None:
+        stats = Stats()
+
+    with stats.stage("discover") as stage:
+        root = input_directory if os.path.isdir(input_directory) else os.path.dirname(os.path.abspath(input_directory))
+        input_files = files
+        files = []
+        keys = []
+        for file in input_files if input_files is not None else get_excels(input_directory):
+            key = group_key(file, split_by, pattern, root=root)
+            if key is None:
+                logging.warning("Skipping file '%s', the name does not match the split pattern.", file)
+                continue
+            files.append(file)
+            keys.append(key)
+        stage["rows"] = len(files)
+
+    frames: Dict[str, List[pd.DataFrame]] = {}
+    with stats.stage("read") as stage:
+        questions = iter_questions(
+            files, sheet_name=sheet_name, jobs=jobs, reader=reader, cache=cache, stats=stats, analytics=analytics
+        )
+        # the generator comes first, so it is exhausted and evicts the cache
+        for df, key in zip(questions, keys):
+            if df is None or df.empty:
+                continue
+            frames.setdefault(key, []).append(df)
+            stage["rows"] += len(df)
+
+    groups = {}
+    with stats.stage("dedup") as stage:
+        for key in sorted(frames):
+            df = pd.concat(frames[key], axis=0, ignore_index=True)
+            if dedup is None:
+                groups[key] = df.drop_duplicates(subset=["Question"])
+            else:
+                groups[key] = DedupIndex(**dedup.settings).filter(df)
+            # the groups are kept until all decks are written and pickled to the worker processes
+            groups[key] = compact_questions(groups[key])
+            stage["rows"] += len(groups[key])
+
+    logging.info("Decks: %d", len(groups))
+    return groups
+
+
+def deck_id(title: str, key: str) -> int:
+    """
+    Returns the Anki deck ID of a group, derived from the deck title and the group key,
+    so a deck keeps its ID across runs.
+
+    :param title: The title of the parent deck
+    :param key: The group key
+    :return: The deck ID
+    """
+    digest = hashlib.sha1(f"{title}\x1f{key}".encode("utf-8")).digest()
+    return DECK_ID_MIN + int.from_bytes(digest[:8], "big") % (DECK_ID_MAX - DECK_ID_MIN)
+
+
+def group_filenames(keys: Iterable[str]) -> Dict[str, str]:
+    """
+    Returns the base names of the output files of the groups, made of the file name safe characters of the key.
+    If two keys end up with the same name, a hash of the key is appended.
+
+    :param keys: The group keys
+    :return: The base name of the output files by group key
+    """
+    names = {}
+    for key in sorted(keys):
+        name = re.sub(r"[^\w.-]+", "_", key).strip("._") or "deck"
+        names[key] = name
+    counts = {}
+    for name in names.values():
+        counts[name] = counts.get(name, 0) + 1
+    return {
+        key: name if counts[name] == 1 else f"{name}-{hashlib.sha1(key.encode('utf-8')).hexdigest()[:8]}"
+        for key, name in names.items()
+    }
+
+
+def make_decks(
+    groups: Dict[str, pd.DataFrame],
+    out: str,
+    title: str,
+    jobs: int = 1,
+    incremental: bool = False,
+    writer: str = "genanki",
+    export_csv: bool = False,
+    stats: Optional[Stats] = None,
+    exports: Sequence[str] = (),
+    media: Optional[MediaStore] = None,
+    reproducible: bool = False,
+    only_below: Optional[float] = None,
+    order: str = "input",
+) -> List[str]:
+    """
+    Writes one Anki package (and export files) per group, in up to jobs worker processes.
+    The packages are named after the group key and contain the sub-deck "<title>::<key>",
+    so the decks are imported below a common parent deck.
+    make_anki also skips packages without notes, which is expected with only_below or incremental,
+    so in these modes the packages which were not written are not counted as failed.
+
+    :param groups: The questions of each group, see get_question_groups
+    :param out: The path to the output directory
+    :param title: The title of the parent deck
+    :param jobs: The number of worker processes writing the packages
+    :param incremental: Only write new or changed questions to the packages
+    :param writer: The package writer, one of ANKI_WRITERS
+    :param export_csv: Also write the questions of each group to a CSV file
+    :param stats: Records the timings of writing the packages
+    :param exports: Further export formats of the questions of each group, some of EXPORT_FORMATS
+    :param media: An optional store of the media files, the media referenced by each group are added to its package
+    :param reproducible: Write packages with fixed timestamps and zip metadata, see make_anki
+    :param only_below: Only write the questions which less than this percent of the players answered correctly
+    :param order: The order of the notes, one of DECK_ORDERS, see select_questions
+    :return: The keys of the groups whose packages failed to write
+    """
+    if stats is None:
+        stats = Stats()
+
+    if media is not None:
+        # the media of all groups are fetched once here, the worker processes get the resolved sources
+        with stats.stage("media") as stage:
+            sources = set()
+            for df in groups.values():
+                sources |= media.references(df)
+            media.resolve(sources)
+            stage["rows"] = len(sources)
+
+    names = group_filenames(groups)
+    with stats.stage("package") as stage:
+        formats = export_formats(export_csv, exports)
+        if formats:
+            for key, df in groups.items():
+                write_exports(df, out, formats, basename=names[key])
+
+        tasks = [
+            dict(df=df, out=out, title=f"{title}::{key}", incremental=incremental, writer=writer,
+                 deck_id=deck_id(title, key), filename=f"{names[key]}.apkg", media=media,
+                 reproducible=reproducible, only_below=only_below, order=order)
+            for key, df in groups.items()
+        ]
+        if jobs > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as executor:
+                written = [future.result() for future in [executor.submit(make_anki, **task) for task in tasks]]
+        else:
+            written = [make_anki(**task) for task in tasks]
+        stage["rows"] = sum(len(df) for df in groups.values())
+
+    failed = []
+    for key, deck_written in zip(groups, written):
+        if deck_written:
+            logging.info("Deck '%s::%s': %d questions -> %s.apkg", title, key, len(groups[key]), names[key])
+        elif only_below is not None or incremental:
+            logging.info("Deck '%s::%s': %s.apkg not written", title, key, names[key])
+        else:
+            logging.error("Deck '%s::%s': failed to write %s.apkg", title, key, names[key])
+            failed.append(key)
+    return failed
@@ -0,0 +1,184 @@
+# Standard library imports
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from kahoot_to_anki import __version__
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+# Constants
+TOP_ALLOCATIONS = 10
+
+
+def peak_rss(children: bool = False) -> Optional[int]:
+    """
+    Returns the peak resident set size of this process or of its terminated child processes.
+
+    :param children: Return the peak of the child processes, e.g. the workers of get_questions
+    :return: The peak RSS in bytes or None if it is not available on this platform
+    """
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def current_rss() -> Optional[int]:
+    """
+    Returns the current resident set size of this process.
+
+    :return: The RSS in bytes or None if /proc is not available (only Linux has /proc/self/statm)
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def peak_rss_growth(start: Optional[int]) -> Optional[int]:
+    """
+    Returns how much the peak resident set size of this process grew since a peak_rss() measurement.
+    Unlike the peak itself, which only grows over the lifetime of the process, the growth can be
+    attributed to the code that ran in between.
+
+    :param start: The peak RSS at the start
+    :return: The growth in bytes or None if the peak RSS is not available on this platform
+    """
+    end = peak_rss()
+    if start is None or end is None:
+        return None
+    return end - start
+
+
+class Stats:
+    """
+    Collects the wall time, CPU time, memory and row counts of the conversion stages and of each input file.
+
+    Stages with the same name are accumulated, so a stage can also be timed chunk by chunk.
+    The memory of a stage is the growth of the peak RSS of the process during its calls (peak_rss_growth_bytes)
+    and the RSS at the end of its last call (rss_bytes). The peak RSS of the whole run is reported in the total.
+    If tracemalloc is tracing, the peak of the traced Python memory of each stage and the top allocation
+    sites are recorded as well.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.files: List[Dict[str, Any]] = []
+        self.jobs: List[Dict[str, Any]] = []
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        self._depth = 0
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Dict[str, int]]:
+        """
+        Times the code in the with block as the stage.
+        The yielded dict takes the number of processed rows: stage["rows"] = ...
+
+        :param name: The name of the stage
+        :return: a context manager
+        """
+        record = self.stages.setdefault(name, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "rows": 0})
+        tracing = tracemalloc.is_tracing()
+        # the traced peak of a nested stage includes the outer stage up to its start
+        if tracing and self._depth == 0:
+            tracemalloc.reset_peak()
+        self._depth += 1
+
+        counter = {"rows": 0}
+        rss = peak_rss()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield counter
+        finally:
+            self._depth -= 1
+            record["calls"] += 1
+            record["wall_s"] += time.perf_counter() - wall
+            record["cpu_s"] += time.process_time() - cpu
+            record["rows"] += counter["rows"]
+            growth = peak_rss_growth(rss)
+            if growth is not None:
+                record["peak_rss_growth_bytes"] = record.get("peak_rss_growth_bytes", 0) + growth
+            record["rss_bytes"] = current_rss()
+            if tracing:
+                traced_peak = tracemalloc.get_traced_memory()[1]
+                record["traced_peak_bytes"] = max(record.get("traced_peak_bytes", 0), traced_peak)
+
+    def add_file(self, path: str, source: str, rows: Optional[int], **timings: float) -> None:
+        """
+        Records an input file.
+
+        :param path: The path of the file
+        :param source: Where the questions came from, e.g. "parsed" or "cache"
+        :param rows: The number of questions or None if the file could not be read
+        :param timings: Durations in seconds and memory in bytes, e.g. read_s, process_s, cpu_s
+            and peak_rss_growth_bytes
+        :return: None
+        """
+        self.files.append({"path": path, "source": source, "rows": rows, **timings})
+
+    def add_job(self, input_path: str, output_path: str, questions: int, **timings: Any) -> None:
+        """
+        Records a job of a batch run.
+
+        :param input_path: The input of the job
+        :param output_path: The output directory of the job
+        :param questions: The number of questions
+        :param timings: Durations in seconds and the error, e.g. seconds, latency_s and error
+        :return: None
+        """
+        self.jobs.append({"input": input_path, "output": output_path, "questions": questions, **timings})
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns the report as a JSON-serializable dict.
+
+        :return: The report
+        """
+        report = {
+            "version": __version__,
+            "total": {
+                "wall_s": time.perf_counter() - self._wall,
+                "cpu_s": time.process_time() - self._cpu,
+                "peak_rss_bytes": peak_rss(),
+                "children_peak_rss_bytes": peak_rss(children=True),
+            },
+            "stages": [{"name": name, **record} for name, record in self.stages.items()],
+            "files": self.files,
+        }
+        if self.jobs:
+            report["jobs"] = self.jobs
+        if tracemalloc.is_tracing():
+            statistics = tracemalloc.take_snapshot().statistics("lineno")[:TOP_ALLOCATIONS]
+            report["top_allocations"] = [
+                {"location": str(stat.traceback), "size_bytes": stat.size, "count": stat.count}
+                for stat in statistics
+            ]
+        return report
+
+    def write(self, path: str) -> None:
+        """
+        Writes the report as JSON file.
+
+        :param path: The path of the JSON file
+        :return: None
+        """
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.to_dict(), f, indent=2)
+        except OSError as e:
+            logging.error("Failed to write stats file '%s': %s", path, str(e))
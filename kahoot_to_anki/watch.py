@@ -0,0 +1,315 @@
+# Standard library imports
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Third-party library imports
+import pandas as pd
+
+from kahoot_to_anki.cache import ParseCache
+from kahoot_to_anki.dedup import DedupIndex
+from kahoot_to_anki.discovery import is_input_file
+from kahoot_to_anki.export import EXPORT_FILES, export_formats, write_exports
+from kahoot_to_anki.media import MediaStore
+from kahoot_to_anki.processing import iter_questions, make_anki
+from kahoot_to_anki.readers import input_extensions
+from kahoot_to_anki.stats import Stats
+
+
+# Constants
+DEFAULT_DEBOUNCE = 2.0
+DEFAULT_POLL_INTERVAL = 1.0
+
+# inotify events of a directory which can add, change or remove an Excel file, see inotify(7)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+INOTIFY_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# (size, mtime_ns) of a file
+Signature = Tuple[int, int]
+
+
+class PollingWatcher:
+    """
+    Waits for the next snapshot of the input directory, used where inotify is not available.
+    """
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Waits until the directory may have changed.
+
+        :param timeout: The maximum time to wait in seconds
+        :return: True if the directory should be scanned
+        """
+        time.sleep(timeout)
+        return True
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """
+    Waits for changes of a directory with the inotify API of Linux, so the directory is only scanned
+    when a file was created, written, moved or deleted.
+    """
+
+    def __init__(self, directory: str):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        # raises AttributeError on platforms without inotify
+        init, add_watch = libc.inotify_init1, libc.inotify_add_watch
+
+        self.fd = init(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        if add_watch(self.fd, os.fsencode(directory), INOTIFY_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, os.strerror(errno), directory)
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Waits until the directory changed.
+
+        :param timeout: The maximum time to wait in seconds
+        :return: True if the directory changed
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        # the events are not parsed, the directory is compared with the last snapshot instead
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def make_watcher(directory: str):
+    """
+    Returns an InotifyWatcher of the directory, or a PollingWatcher if inotify is not available.
+
+    :param directory: The directory to watch
+    :return: The watcher
+    """
+    try:
+        return InotifyWatcher(directory)
+    except (OSError, AttributeError, TypeError) as e:
+        logging.info("inotify not available (%s), polling the input directory.", str(e) or type(e).__name__)
+        return PollingWatcher()
+
+
+def snapshot(input_directory: str, include: Sequence[str] = (), exclude: Sequence[str] = ()) -> Dict[str, Signature]:
+    """
+    Returns the size and modification time of the input files, like get_excels but with a single scandir.
+
+    :param input_directory: The path to the input directory or Excel file
+    :param include: Glob patterns of the file names of which the files have to match one
+    :param exclude: Glob patterns of the skipped file names
+    :return: The (size, mtime_ns) of each input file
+    """
+    if os.path.isfile(input_directory):
+        stat = os.stat(input_directory)
+        return {input_directory: (stat.st_size, stat.st_mtime_ns)}
+
+    extensions = input_extensions()
+    files = {}
+    try:
+        with os.scandir(input_directory) as entries:
+            for entry in entries:
+                if is_input_file(entry.name, entry.name, extensions, include, exclude) and entry.is_file():
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    files[entry.path] = (stat.st_size, stat.st_mtime_ns)
+    except FileNotFoundError:
+        pass
+    return files
+
+
+class DeckWatcher:
+    """
+    Keeps the Anki package (and export files) up to date with the input files of the input directory.
+
+    The questions of every file are kept in memory, so a change only reads the new or modified files.
+    A file is only read once it was not modified for debounce seconds, so files which are still being
+    copied into the directory are not read half-written. Only the top level of the input directory is watched,
+    the include and exclude patterns are matched against the file names.
+    """
+
+    def __init__(
+        self,
+        input_directory: str,
+        out: str,
+        title: str,
+        sheet_name: str,
+        export_csv: bool = False,
+        reader: str = "pandas",
+        cache: Optional[ParseCache] = None,
+        incremental: bool = False,
+        writer: str = "genanki",
+        dedup: Optional[DedupIndex] = None,
+        debounce: float = DEFAULT_DEBOUNCE,
+        stats: Optional[Stats] = None,
+        exports: Sequence[str] = (),
+        include: Sequence[str] = (),
+        exclude: Sequence[str] = (),
+        media: Optional[MediaStore] = None,
+        reproducible: bool = False,
+        only_below: Optional[float] = None,
+        order: str = "input",
+        analytics: bool = False,
+    ):
+        self.input_directory = input_directory
+        self.out = out
+        self.title = title
+        self.sheet_name = sheet_name
+        self.exports = export_formats(export_csv, exports)
+        # the exports are inputs as well, they must not trigger a scan if they are written into the input directory
+        self.outputs = {os.path.join(out, EXPORT_FILES[fmt]) for fmt in self.exports}
+        self.reader = reader
+        self.cache = cache
+        self.incremental = incremental
+        self.writer = writer
+        self.dedup = dedup
+        self.debounce = debounce
+        self.stats = stats if stats is not None else Stats()
+        self.include = include
+        self.exclude = exclude
+        self.media = media
+        self.reproducible = reproducible
+        self.only_below = only_below
+        self.order = order
+        # the player columns are only read if the notes are tagged, filtered or ordered by the analytics
+        self.analytics = analytics or only_below is not None or order == "difficulty"
+
+        self.signatures: Dict[str, Signature] = {}
+        self.frames: Dict[str, pd.DataFrame] = {}
+        # the time at which the next pending file will be ready
+        self.deadline: Optional[float] = None
+
+    def scan(self, now: Optional[float] = None) -> bool:
+        """
+        Reads the new and modified files which are ready, drops the removed files and rewrites the outputs
+        if anything changed.
+
+        :param now: The current time (time.time()), for tests
+        :return: True if the outputs were written
+        """
+        if now is None:
+            now = time.time()
+
+        files = {
+            file: sig for file, sig in snapshot(self.input_directory, self.include, self.exclude).items()
+            if file not in self.outputs
+        }
+        removed = [file for file in self.signatures if file not in files]
+        ready: List[str] = []
+        self.deadline = None
+        for file, signature in files.items():
+            if self.signatures.get(file) == signature:
+                continue
+            ready_at = signature[1] / 1e9 + self.debounce
+            if ready_at <= now:
+                ready.append(file)
+            else:
+                self.deadline = ready_at if self.deadline is None else min(self.deadline, ready_at)
+
+        if not removed and not ready:
+            return False
+
+        for file in removed:
+            logging.info("Removed: %s", file)
+            del self.signatures[file]
+            self.frames.pop(file, None)
+
+        ready.sort()
+        questions = iter_questions(
+            ready, sheet_name=self.sheet_name, reader=self.reader, cache=self.cache, stats=self.stats,
+            analytics=self.analytics,
+        )
+        for df, file in zip(questions, ready):
+            logging.info("%s: %s", "Modified" if file in self.signatures else "New", file)
+            # a file which cannot be read is retried when it changes again
+            self.signatures[file] = files[file]
+            if df is None:
+                self.frames.pop(file, None)
+            else:
+                self.frames[file] = df
+
+        self.write()
+        return True
+
+    def write(self) -> None:
+        """
+        Writes the questions of all files to the outputs, deduplicated in the order of the file names.
+
+        :return: None
+        """
+        frames = [self.frames[file] for file in sorted(self.frames) if not self.frames[file].empty]
+        if not frames:
+            logging.warning("No Kahoot questions found to process.")
+            return
+
+        df = pd.concat(frames, axis=0, ignore_index=True)
+        if self.dedup is None:
+            df = df.drop_duplicates(subset=["Question"])
+        else:
+            df = DedupIndex(**self.dedup.settings).filter(df)
+
+        if self.exports:
+            write_exports(df, self.out, self.exports)
+        written = make_anki(
+            df, self.out, self.title, incremental=self.incremental, writer=self.writer, stats=self.stats,
+            media=self.media, reproducible=self.reproducible, only_below=self.only_below, order=self.order,
+        )
+        if written:
+            logging.info("Updated the Anki package: %d questions from %d files", len(df), len(frames))
+        elif self.only_below is not None or self.incremental:
+            logging.info("Anki package not updated: %d questions from %d files", len(df), len(frames))
+        else:
+            logging.error("Failed to update the Anki package, watching for further changes")
+
+    def run(
+        self, poll_interval: float = DEFAULT_POLL_INTERVAL, stop: Optional[threading.Event] = None, watcher=None
+    ) -> None:
+        """
+        Converts the files of the input directory and then watches it until stop is set (or forever).
+
+        :param poll_interval: The maximum time between two scans in seconds
+        :param stop: An optional event which ends the watch
+        :param watcher: The watcher of the directory, by default make_watcher
+        :return: None
+        """
+        directory = self.input_directory
+        if os.path.isfile(directory):
+            directory = os.path.dirname(directory)
+        if watcher is None:
+            watcher = make_watcher(directory)
+
+        logging.info("Watching '%s' for Kahoot exports.", self.input_directory)
+        try:
+            self.scan()
+            while stop is None or not stop.is_set():
+                timeout = poll_interval
+                if self.deadline is not None:
+                    timeout = min(timeout, max(0.0, self.deadline - time.time()))
+                if watcher.wait(timeout) or self.deadline is not None:
+                    self.scan()
+        finally:
+            watcher.close()
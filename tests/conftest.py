@@ -0,0 +1,51 @@
+import io
+import os
+import sqlite3
+import zipfile
+from pathlib import Path
+
+import pandas as pd
+
+# Helpers shared by the test modules, imported from tests.conftest
+KAHOOT_SHEET_NAME = "RawReportData Data"
+
+
+def write_report(path, questions, sheet_name=KAHOOT_SHEET_NAME, mtime=None):
+    """
+    Writes a Kahoot report of the questions, with the answers "Yes" (correct) and "No", or of raw data rows.
+
+    :return: The path of the report
+    """
+    if isinstance(questions, pd.DataFrame):
+        df = questions
+    else:
+        df = pd.DataFrame({
+            "Question Number": range(1, len(questions) + 1),
+            "Question": questions,
+            "Answer 1": ["Yes"] * len(questions),
+            "Answer 2": ["No"] * len(questions),
+            **{f"Answer {i}": [""] * len(questions) for i in range(3, 7)},
+            "Correct Answers": ["Yes"] * len(questions),
+        })
+    df.to_excel(path, sheet_name=sheet_name, index=False)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def extract_collection(apkg, directory):
+    """Extracts the collection of an Anki package, a path or the package bytes, and returns its path."""
+    with zipfile.ZipFile(io.BytesIO(apkg) if isinstance(apkg, bytes) else apkg) as z:
+        z.extract("collection.anki2", directory)
+    return Path(directory) / "collection.anki2"
+
+
+def read_note_fields(apkg, tmp_path):
+    """Returns the fields of the notes of an Anki package in the order of their IDs."""
+    with sqlite3.connect(extract_collection(apkg, tmp_path)) as conn:
+        return [row[0].split("\x1f") for row in conn.execute("SELECT flds FROM notes ORDER BY id")]
+
+
+def read_questions(apkg, tmp_path):
+    """Returns the sorted questions of the notes of an Anki package."""
+    return sorted(fields[0] for fields in read_note_fields(apkg, tmp_path))
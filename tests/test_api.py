@@ -0,0 +1,154 @@
+import asyncio
+import inspect
+import io
+import json
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from kahoot_to_anki.api import convert, convert_sync, guess_extension
+from kahoot_to_anki.apkg import SQLITE_SERIALIZE
+from kahoot_to_anki.cli import get_commandline_arguments
+from tests.conftest import read_note_fields
+
+TEST_KAHOOT_FILE = Path(__file__).parent.parent / "data" / "test_kahoot.xlsx"
+
+
+def read_package(package, tmp_path):
+    """Returns the deck names and the questions of the package content."""
+    target = tmp_path / str(time.perf_counter_ns())
+    questions = [fields[0] for fields in read_note_fields(package, target)]
+    with sqlite3.connect(target / "collection.anki2") as conn:
+        decks = json.loads(conn.execute("SELECT decks FROM col").fetchone()[0])
+    return sorted(deck["name"] for deck in decks.values()), questions
+
+
+def raw_csv(questions):
+    return pd.DataFrame({
+        "Question Number": range(1, len(questions) + 1),
+        "Question": questions,
+        "Answer 1": ["Yes"] * len(questions),
+        "Answer 2": ["No"] * len(questions),
+        "Correct Answers": ["Yes"] * len(questions),
+    }).to_csv(index=False).encode("utf-8")
+
+
+def test_guess_extension():
+    assert guess_extension(TEST_KAHOOT_FILE.read_bytes()) == ".xlsx"
+    assert guess_extension(b'\xef\xbb\xbf{"Question": "Q?"}\n') == ".jsonl"
+    assert guess_extension(raw_csv(["Q?"])) == ".csv"
+
+
+def test_convert_sync_inputs(tmp_path):
+    """Test that paths, bytes, file objects and named contents are converted in the order of the inputs."""
+    content = TEST_KAHOOT_FILE.read_bytes()
+
+    for item in [str(TEST_KAHOOT_FILE), TEST_KAHOOT_FILE, content, io.BytesIO(content)]:
+        decks, questions = read_package(convert_sync([item], title="Upload"), tmp_path)
+        assert "Upload" in decks
+        assert len(questions) == 2
+
+    _, questions = read_package(
+        convert_sync([("a.csv", raw_csv(["Q1?", "Q2?"])), io.BytesIO(raw_csv(["Q3?", "Q1?"]))]), tmp_path
+    )
+    assert questions == ["Q1?", "Q2?", "Q3?"]
+
+
+@pytest.mark.skipif(not SQLITE_SERIALIZE, reason="sqlite3 cannot serialize databases")
+def test_convert_sync_in_memory(tmp_path, monkeypatch):
+    """Test that in-memory inputs are converted into a buffer without creating any file."""
+    content = TEST_KAHOOT_FILE.read_bytes()
+    upload = tempfile.SpooledTemporaryFile()
+    upload.write(raw_csv(["Q1?"]))
+
+    def no_files(*args, **kwargs):
+        raise AssertionError("file created")
+
+    monkeypatch.setattr(tempfile, "mkstemp", no_files)
+    monkeypatch.setattr(tempfile, "mkdtemp", no_files)
+    out = io.BytesIO()
+    assert convert_sync([content, upload], title="Upload", out=out) is None
+    monkeypatch.undo()
+
+    decks, questions = read_package(out.getvalue(), tmp_path)
+    assert "Upload" in decks
+    assert len(questions) == 3
+    assert questions[-1] == "Q1?"
+
+
+def test_convert_writer_defaults_to_cli(monkeypatch):
+    """Test that the API writes the package with the same writer as the CLI by default."""
+    monkeypatch.setattr(sys, "argv", ["kahoot-to-anki"])
+    writer = get_commandline_arguments().writer
+
+    for function in (convert, convert_sync):
+        assert inspect.signature(function).parameters["writer"].default == writer
+
+
+def test_convert_sync_without_questions():
+    with pytest.raises(ValueError):
+        convert_sync([b"Question Number,Question,Correct Answers\n"])
+
+
+def test_convert_concurrently(tmp_path):
+    """Test that concurrent conversions neither block the event loop nor share files."""
+    uploads = [raw_csv([f"Upload {i} question {j}?" for j in range(200)]) for i in range(16)]
+
+    async def run():
+        ticks = 0
+        done = asyncio.Event()
+
+        async def ticker():
+            nonlocal ticks
+            while not done.is_set():
+                ticks += 1
+                await asyncio.sleep(0.001)
+
+        ticking = asyncio.create_task(ticker())
+        packages = await asyncio.gather(*[convert([upload], title=f"Deck {i}") for i, upload in enumerate(uploads)])
+        done.set()
+        await ticking
+        return packages, ticks
+
+    packages, ticks = asyncio.run(run())
+
+    # the event loop kept running while the conversions ran in the executor
+    assert ticks > 1
+    for i, package in enumerate(packages):
+        decks, questions = read_package(package, tmp_path)
+        assert f"Deck {i}" in decks
+        assert questions == [f"Upload {i} question {j}?" for j in range(200)]
+
+
+def test_convert_process_pool(tmp_path):
+    """Test that the conversions can run on several cores in a process pool."""
+    content = TEST_KAHOOT_FILE.read_bytes()
+
+    async def run(executor):
+        return await asyncio.gather(*[convert([content], title=f"Deck {i}", executor=executor) for i in range(4)])
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        packages = asyncio.run(run(executor))
+
+    assert [read_package(package, tmp_path)[0] for package in packages] == [
+        sorted(["Default", f"Deck {i}"]) for i in range(4)
+    ]
+
+
+def test_convert_process_pool_into_out(tmp_path):
+    """Test that a package converted in a process pool is written into out by the calling process."""
+    out = io.BytesIO()
+
+    async def run(executor):
+        return await convert([TEST_KAHOOT_FILE.read_bytes()], title="Deck", out=out, executor=executor)
+
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        assert asyncio.run(run(executor)) is None
+
+    assert read_package(out.getvalue(), tmp_path)[0] == sorted(["Default", "Deck"])
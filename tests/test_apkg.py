@@ -0,0 +1,209 @@
+import io
+import json
+import sqlite3
+import time
+import zipfile
+from pathlib import Path
+
+import genanki
+import pandas as pd
+import pytest
+
+from kahoot_to_anki import apkg
+from kahoot_to_anki.apkg import REPRODUCIBLE_TIMESTAMP, SQLITE_SERIALIZE, ZIP_DATE_TIME, write_apkg
+from kahoot_to_anki.processing import ANKI_DECK_ID, ANKI_MODEL, get_questions, make_anki, note_guid
+from tests.conftest import KAHOOT_SHEET_NAME, extract_collection, read_note_fields
+
+TEST_KAHOOT_FILE = Path(__file__).parent.parent / "data" / "test_kahoot.xlsx"
+TIMESTAMP = 1752000000.0
+
+
+def read_collection(apkg, tmp_path):
+    """Returns the rows of the collection tables of an Anki package, with the JSON columns decoded."""
+    with zipfile.ZipFile(apkg) as z:
+        assert sorted(z.namelist()) == ["collection.anki2", "media"]
+        assert json.loads(z.read("media")) == {}
+
+    with sqlite3.connect(extract_collection(apkg, tmp_path / apkg.stem)) as conn:
+        col = conn.execute("SELECT * FROM col").fetchall()
+        tables = {
+            table: conn.execute(f"SELECT * FROM {table} ORDER BY id").fetchall()
+            for table in ["notes", "cards", "revlog"]
+        }
+        schema = conn.execute("SELECT type, name, sql FROM sqlite_master ORDER BY name").fetchall()
+
+    decoded_col = [tuple(json.loads(v) if isinstance(v, str) else v for v in row) for row in col]
+    return decoded_col, tables, schema
+
+
+def make_notes(df):
+    return [
+        (note_guid(question), [question, correct, possible])
+        for question, correct, possible in zip(df["Question"], df["Correct Answers"], df["Possible Answers"])
+    ]
+
+
+# --- write_apkg ---
+def test_write_apkg_matches_genanki(tmp_path):
+    """Test that the SQLite contents equal the genanki output for the test Kahoot export."""
+    df = get_questions(str(TEST_KAHOOT_FILE), sheet_name=KAHOOT_SHEET_NAME)
+    notes = make_notes(df)
+    assert len(notes) == 2
+
+    deck = genanki.Deck(ANKI_DECK_ID, "Kahoot")
+    for guid, fields in notes:
+        deck.add_note(genanki.Note(model=ANKI_MODEL, fields=fields, guid=guid))
+    genanki.Package(deck).write_to_file(tmp_path / "genanki.apkg", timestamp=TIMESTAMP)
+
+    write_apkg(str(tmp_path / "fast.apkg"), ANKI_MODEL, ANKI_DECK_ID, "Kahoot", notes, timestamp=TIMESTAMP)
+
+    assert read_collection(tmp_path / "fast.apkg", tmp_path) == read_collection(tmp_path / "genanki.apkg", tmp_path)
+
+
+def test_write_apkg_skips_cards_without_required_fields(tmp_path):
+    """Test that notes without content in the card template fields get no card, like in genanki."""
+    notes = [(note_guid("Q"), ["Q", "A", "B"]), (note_guid(""), ["", "A", ""])]
+
+    write_apkg(str(tmp_path / "fast.apkg"), ANKI_MODEL, ANKI_DECK_ID, "Kahoot", notes, timestamp=TIMESTAMP)
+
+    _, tables, _ = read_collection(tmp_path / "fast.apkg", tmp_path)
+    assert len(tables["notes"]) == 2
+    assert [card[1] for card in tables["cards"]] == [tables["notes"][0][0]]
+
+
+def test_write_apkg_defaults_to_current_time(tmp_path):
+    start = int(time.time())
+
+    write_apkg(str(tmp_path / "fast.apkg"), ANKI_MODEL, ANKI_DECK_ID, "Kahoot", [(note_guid("Q"), ["Q", "A", "B"])])
+
+    _, tables, _ = read_collection(tmp_path / "fast.apkg", tmp_path)
+    assert tables["notes"][0][3] >= start
+
+
+def shift_clock(monkeypatch, seconds):
+    """Moves the clock of time.time and time.localtime, which date the notes and the zip entries."""
+    now, localtime = time.time, time.localtime
+    monkeypatch.setattr(time, "time", lambda: now() + seconds)
+    monkeypatch.setattr(time, "localtime", lambda secs=None: localtime((now() if secs is None else secs) + seconds))
+
+
+@pytest.mark.parametrize("writer", ["genanki", "fast"])
+def test_make_anki_reproducible(tmp_path, monkeypatch, writer):
+    """Test that reproducible packages written at different times are byte-identical."""
+    df = get_questions(str(TEST_KAHOOT_FILE), sheet_name=KAHOOT_SHEET_NAME)
+    packages = []
+    for day in range(2):
+        shift_clock(monkeypatch, day * 86400)
+        out = tmp_path / str(day)
+        out.mkdir()
+        make_anki(df, str(out), "Kahoot", writer=writer, reproducible=True)
+        packages.append((out / "anki.apkg").read_bytes())
+        monkeypatch.undo()
+
+    assert packages[0] == packages[1]
+    with zipfile.ZipFile(tmp_path / "0" / "anki.apkg") as z:
+        assert {info.date_time for info in z.infolist()} == {ZIP_DATE_TIME}
+    _, tables, _ = read_collection(tmp_path / "0" / "anki.apkg", tmp_path)
+    assert {note[3] for note in tables["notes"]} == {REPRODUCIBLE_TIMESTAMP}
+
+
+def test_make_anki_reproducible_writers_agree(tmp_path):
+    """Test that both writers give the same reproducible package."""
+    df = get_questions(str(TEST_KAHOOT_FILE), sheet_name=KAHOOT_SHEET_NAME)
+    for writer in ["genanki", "fast"]:
+        (tmp_path / writer).mkdir()
+        make_anki(df, str(tmp_path / writer), "Kahoot", writer=writer, reproducible=True)
+
+    assert (tmp_path / "genanki" / "anki.apkg").read_bytes() == (tmp_path / "fast" / "anki.apkg").read_bytes()
+
+
+def test_make_anki_source_date_epoch(tmp_path, monkeypatch):
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", str(int(TIMESTAMP)))
+    df = get_questions(str(TEST_KAHOOT_FILE), sheet_name=KAHOOT_SHEET_NAME)
+
+    make_anki(df, str(tmp_path), "Kahoot", writer="fast", reproducible=True)
+
+    _, tables, _ = read_collection(tmp_path / "anki.apkg", tmp_path)
+    assert {note[3] for note in tables["notes"]} == {int(TIMESTAMP)}
+
+
+def test_reproducible_timestamp(monkeypatch):
+    """Test that the timestamp is fixed unless SOURCE_DATE_EPOCH is set."""
+    monkeypatch.delenv("SOURCE_DATE_EPOCH", raising=False)
+    assert apkg.reproducible_timestamp() == REPRODUCIBLE_TIMESTAMP
+
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1")
+    assert apkg.reproducible_timestamp() == 1
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "yesterday")
+    with pytest.raises(ValueError):
+        apkg.reproducible_timestamp()
+
+
+@pytest.mark.parametrize("writer", ["genanki", "fast"])
+def test_make_anki_reproducible_ids(tmp_path, writer):
+    """Test that the IDs of reproducible notes and cards follow the GUIDs, not the position in the package."""
+    df = get_questions(str(TEST_KAHOOT_FILE), sheet_name=KAHOOT_SHEET_NAME)
+    ids = []
+    # the second deck has the questions in the opposite order, one with an edited answer
+    edited = df.iloc[::-1].assign(**{"Correct Answers": ["edited", *df["Correct Answers"].tolist()[:-1][::-1]]})
+    for name, questions in [("first", df), ("second", edited)]:
+        (tmp_path / name).mkdir()
+        make_anki(questions, str(tmp_path / name), "Kahoot", writer=writer, reproducible=True, timestamp=TIMESTAMP)
+        _, tables, _ = read_collection(tmp_path / name / "anki.apkg", tmp_path / name)
+        ids.append(({note[1]: note[0] for note in tables["notes"]}, {card[1]: card[0] for card in tables["cards"]}))
+
+    assert ids[0] == ids[1]
+    note_ids = ids[0][0]
+    assert note_ids == {guid: apkg.reproducible_id(guid) for guid in note_ids}
+    assert set(note_ids.values()).isdisjoint(ids[0][1].values())
+
+
+# --- packages in memory ---
+def forbid_temporary_files(monkeypatch):
+    def mkstemp(*args, **kwargs):
+        raise AssertionError("temporary file created")
+    monkeypatch.setattr(apkg.tempfile, "mkstemp", mkstemp)
+
+
+@pytest.mark.skipif(not SQLITE_SERIALIZE, reason="sqlite3 cannot serialize databases")
+@pytest.mark.parametrize("writer", ["genanki", "fast"])
+def test_make_anki_into_buffer(tmp_path, monkeypatch, writer):
+    """Test that a package written into a file object is built in memory with the same collection as on disk."""
+    df = get_questions(str(TEST_KAHOOT_FILE), sheet_name=KAHOOT_SHEET_NAME)
+    make_anki(df, str(tmp_path), "Kahoot", writer=writer, reproducible=True)
+
+    forbid_temporary_files(monkeypatch)
+    buffers = [io.BytesIO(), io.BytesIO()]
+    for buffer in buffers:
+        buffer.write(b"prefix")
+        make_anki(df, buffer, "Kahoot", writer=writer, reproducible=True)
+
+    # the package is written after the content of the file object, the same bytes every time
+    package = buffers[0].getvalue()
+    assert package.startswith(b"prefix")
+    assert package == buffers[1].getvalue()
+    (tmp_path / "memory.apkg").write_bytes(package[len(b"prefix"):])
+    assert read_collection(tmp_path / "memory.apkg", tmp_path) == read_collection(tmp_path / "anki.apkg", tmp_path)
+
+
+def test_make_anki_into_buffer_incremental():
+    df = get_questions(str(TEST_KAHOOT_FILE), sheet_name=KAHOOT_SHEET_NAME)
+
+    with pytest.raises(ValueError):
+        make_anki(df, io.BytesIO(), "Kahoot", incremental=True)
+
+
+# --- make_anki ---
+def test_make_anki_fast_writer(tmp_path):
+    df = pd.DataFrame({
+        "Question": ["What is 2+2?"],
+        "Possible Answers": ["2<br>3<br>4"],
+        "Correct Answers": ["4"]
+    })
+
+    make_anki(df=df, out=str(tmp_path), title="Test Deck", writer="fast")
+
+    col, tables, _ = read_collection(tmp_path / "anki.apkg", tmp_path)
+    assert tables["notes"][0][1] == note_guid("What is 2+2?")
+    assert read_note_fields(tmp_path / "anki.apkg", tmp_path / "notes") == [["What is 2+2?", "4", "2<br>3<br>4"]]
+    assert col[0][10][str(ANKI_DECK_ID)]["name"] == "Test Deck"
@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+from kahoot_to_anki.batch import BatchJob, read_jobs, run_batch
+from kahoot_to_anki.stats import Stats
+from tests.conftest import read_questions, write_report
+
+
+def make_jobs(tmp_path, count):
+    jobs = []
+    for i in range(count):
+        inp = tmp_path / f"class{i}"
+        out = tmp_path / f"deck{i}"
+        inp.mkdir()
+        out.mkdir()
+        write_report(inp / "quiz.xlsx", [f"Class {i} Q1?", f"Class {i} Q2?"])
+        jobs.append(BatchJob(str(inp), str(out), deck_title=f"Class {i}", export_csv=i == 0))
+    return jobs
+
+
+# --- read_jobs ---
+def test_read_jobs(tmp_path, monkeypatch):
+    """Test that the jobs file is parsed with defaults and relative paths."""
+    monkeypatch.chdir(tmp_path)
+    jobs_file = tmp_path / "jobs.jsonl"
+    jobs_file.write_text(
+        '{"input": "a", "output": "out-a", "title": "A", "csv": true}\n'
+        "\n"
+        '{"input": "b.xlsx", "output": "out-b", "sheet": "Sheet"}\n'
+    )
+
+    jobs = read_jobs(str(jobs_file))
+
+    assert jobs == [
+        BatchJob(str(tmp_path / "a"), str(tmp_path / "out-a"), deck_title="A", export_csv=True),
+        BatchJob(str(tmp_path / "b.xlsx"), str(tmp_path / "out-b"), sheet="Sheet"),
+    ]
+
+
+@pytest.mark.parametrize("line", [
+    "not json",
+    '{"input": "a"}',
+    '{"input": "a", "output": "b", "deck": "c"}',
+])
+def test_read_jobs_invalid_line(tmp_path, line):
+    """Test that invalid jobs are rejected with the line number."""
+    jobs_file = tmp_path / "jobs.jsonl"
+    jobs_file.write_text('{"input": "x", "output": "y"}\n' + line + "\n")
+
+    with pytest.raises(ValueError, match="(?i)line 2"):
+        read_jobs(str(jobs_file))
+
+
+def test_read_jobs_duplicate_output(tmp_path):
+    """Test that two jobs cannot write to the same output directory."""
+    jobs_file = tmp_path / "jobs.jsonl"
+    jobs_file.write_text(
+        json.dumps({"input": "a", "output": str(tmp_path)}) + "\n"
+        + json.dumps({"input": "b", "output": str(tmp_path)}) + "\n"
+    )
+
+    with pytest.raises(ValueError, match="more than one job"):
+        read_jobs(str(jobs_file))
+
+
+# --- run_batch ---
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_batch(tmp_path, workers):
+    """Test that every job writes its own package and the results keep the order of the jobs."""
+    jobs = make_jobs(tmp_path, 3)
+    stats = Stats()
+
+    results = run_batch(jobs, workers=workers, stats=stats)
+
+    assert [result.job for result in results] == jobs
+    assert [result.questions for result in results] == [2, 2, 2]
+    assert all(result.error is None and result.seconds > 0 for result in results)
+    for i, job in enumerate(jobs):
+        assert read_questions(f"{job.output_path}/anki.apkg", tmp_path / f"extracted{i}") == [
+            f"Class {i} Q1?", f"Class {i} Q2?"
+        ]
+    assert (tmp_path / "deck0" / "kahoot.csv").exists()
+    assert not (tmp_path / "deck1" / "kahoot.csv").exists()
+    assert [job["questions"] for job in stats.to_dict()["jobs"]] == [2, 2, 2]
+
+
+def test_run_batch_failed_job_does_not_stop_batch(tmp_path):
+    """Test that a failing job is reported and the other jobs still run."""
+    jobs = make_jobs(tmp_path, 2)
+    jobs.insert(1, BatchJob(str(tmp_path / "missing"), str(tmp_path)))
+
+    results = run_batch(jobs)
+
+    assert [result.error is None for result in results] == [True, False, True]
+    assert "does not exist" in results[1].error
+    assert (tmp_path / "deck1" / "anki.apkg").exists()
@@ -0,0 +1,25 @@
+from benchmarks.synthetic import KAHOOT_SHEET_NAME, make_raw_data, write_report
+from kahoot_to_anki.processing import get_questions
+
+
+# --- make_raw_data ---
+def test_make_raw_data_shape():
+    df = make_raw_data(questions=3, players=4, answers=2, quiz=1)
+
+    assert len(df) == 12
+    assert df["Question Number"].nunique() == 3
+    assert df[["Answer 3", "Answer 4", "Answer 5", "Answer 6"]].isna().all().all()
+    assert df["Correct Answers"].isin(df["Answer 1"].tolist() + df["Answer 2"].tolist()).all()
+
+
+def test_make_raw_data_is_reproducible():
+    assert make_raw_data(quiz=2, rich_text=True).equals(make_raw_data(quiz=2, rich_text=True))
+
+
+# --- write_report ---
+def test_write_report_can_be_converted(tmp_path):
+    write_report(str(tmp_path / "quiz.xlsx"), questions=5, players=3, rich_text=True)
+
+    df = get_questions(str(tmp_path), sheet_name=KAHOOT_SHEET_NAME)
+
+    assert len(df) == 5
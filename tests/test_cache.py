@@ -0,0 +1,119 @@
+import logging
+import os
+
+import pandas as pd
+
+from kahoot_to_anki import processing
+from kahoot_to_anki.cache import ParseCache
+from kahoot_to_anki.processing import get_questions
+
+KAHOOT_SHEET_NAME = "RawReportData Data"
+
+
+def write_excel(tmp_path, question="What is 2+2?", filename="sample.xlsx"):
+    df = pd.DataFrame({
+        "Question Number": [1],
+        "Question": [question],
+        "Answer 1": ["4"],
+        "Answer 2": ["3"],
+        "Answer 3": [""],
+        "Answer 4": [""],
+        "Answer 5": [""],
+        "Answer 6": [""],
+        "Correct Answers": ["4"]
+    })
+    path = tmp_path / filename
+    df.to_excel(path, sheet_name=KAHOOT_SHEET_NAME, index=False)
+    return path
+
+
+# --- ParseCache.key ---
+def test_key_is_stable_for_unchanged_file(tmp_path):
+    path = write_excel(tmp_path)
+    cache = ParseCache(str(tmp_path / "cache"))
+
+    assert cache.key(str(path), KAHOOT_SHEET_NAME, "pandas") == cache.key(str(path), KAHOOT_SHEET_NAME, "pandas")
+
+
+def test_key_changes_with_content_sheet_and_reader(tmp_path):
+    path = write_excel(tmp_path)
+    cache = ParseCache(str(tmp_path / "cache"))
+    key = cache.key(str(path), KAHOOT_SHEET_NAME, "pandas")
+
+    assert key != cache.key(str(path), "Other Sheet", "pandas")
+    assert key != cache.key(str(path), KAHOOT_SHEET_NAME, "streaming")
+    assert key != cache.key(str(path), KAHOOT_SHEET_NAME, "pandas", analytics=True)
+
+    stat = os.stat(path)
+    write_excel(tmp_path, question="What is 3+3?")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert key != cache.key(str(path), KAHOOT_SHEET_NAME, "pandas")
+
+
+# --- ParseCache.load / store ---
+def test_store_and_load(tmp_path):
+    cache = ParseCache(str(tmp_path / "cache"))
+    df = pd.DataFrame({"Question": ["Q"], "Possible Answers": ["A<br>B"], "Correct Answers": ["A"]})
+
+    assert cache.load("abc") is None
+    cache.store("abc", df)
+    pd.testing.assert_frame_equal(cache.load("abc"), df)
+
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_load_ignores_corrupted_entry(tmp_path, caplog):
+    cache = ParseCache(str(tmp_path / "cache"))
+    (tmp_path / "cache" / "abc.pkl").write_text("not a pickle")
+
+    with caplog.at_level(logging.WARNING):
+        assert cache.load("abc") is None
+
+    assert "Ignoring unreadable cache entry" in caplog.text
+
+
+# --- ParseCache.evict ---
+def test_evict_removes_least_recently_used_entries(tmp_path):
+    df = pd.DataFrame({"Question": ["Q" * 1000]})
+    cache = ParseCache(str(tmp_path / "cache"))
+    for i, key in enumerate(["old", "used", "new"]):
+        cache.store(key, df)
+        os.utime(tmp_path / "cache" / f"{key}.pkl", ns=(i * 10**9, i * 10**9))
+
+    entry_size = os.path.getsize(tmp_path / "cache" / "old.pkl")
+    cache.max_size = 2 * entry_size
+    cache.load("used")
+    cache.evict()
+
+    assert sorted(os.listdir(tmp_path / "cache")) == ["new.pkl", "used.pkl"]
+
+
+# --- get_questions ---
+def test_get_questions_uses_cache(tmp_path, monkeypatch, caplog):
+    write_excel(tmp_path, filename="quiz1.xlsx")
+    write_excel(tmp_path, question="What is 3+3?", filename="quiz2.xlsx")
+    cache_dir = str(tmp_path / "cache")
+
+    first = get_questions(str(tmp_path), KAHOOT_SHEET_NAME, cache=ParseCache(cache_dir))
+
+    def fail(*args, **kwargs):
+        raise AssertionError("cached file was parsed again")
+
+    monkeypatch.setattr(processing, "get_excel_data", fail)
+    cache = ParseCache(cache_dir)
+    with caplog.at_level(logging.INFO):
+        second = get_questions(str(tmp_path), KAHOOT_SHEET_NAME, cache=cache)
+
+    pd.testing.assert_frame_equal(first, second)
+    assert (cache.hits, cache.misses) == (2, 0)
+    assert "Parse cache: 2 hits, 0 misses" in caplog.text
+
+
+def test_get_questions_does_not_cache_invalid_files(tmp_path):
+    (tmp_path / "fake.xlsx").write_text("This is not a real Excel file.")
+    cache_dir = tmp_path / "cache"
+
+    get_questions(str(tmp_path), KAHOOT_SHEET_NAME, cache=ParseCache(str(cache_dir)))
+
+    assert os.listdir(cache_dir) == []
@@ -3,6 +3,7 @@ from pathlib import Path
 
 import pytest
 
+from kahoot_to_anki import readers
 from kahoot_to_anki.cli import get_commandline_arguments, validation
 
 
@@ -42,8 +43,247 @@ def test_get_commandline_arguments_no_csv(monkeypatch):
     args = get_commandline_arguments()
 
     assert args.export_csv is False
-    
-    
+
+
+
+def test_get_commandline_arguments_jobs(monkeypatch):
+    """Test that the number of worker processes is parsed and defaults to the CPU count."""
+
+    monkeypatch.setattr(sys, "argv", ["kahoot-to-anki", "--jobs", "3"])
+    assert get_commandline_arguments().jobs == 3
+
+    monkeypatch.setattr(sys, "argv", ["kahoot-to-anki"])
+    assert get_commandline_arguments().jobs >= 1
+
+
+def test_get_commandline_arguments_invalid_jobs(monkeypatch):
+    """Test that less than one worker process is rejected."""
+
+    monkeypatch.setattr(sys, "argv", ["kahoot-to-anki", "--jobs", "0"])
+
+    with pytest.raises(SystemExit):
+        get_commandline_arguments()
+
+
+def test_get_commandline_arguments_reader(monkeypatch):
+    """Test that the Excel reader defaults to pandas and can be switched to streaming."""
+
+    monkeypatch.setattr(sys, "argv", ["kahoot-to-anki"])
+    assert get_commandline_arguments().reader == "pandas"
+
+    monkeypatch.setattr(sys, "argv", ["kahoot-to-anki", "--reader", "streaming"])
+    assert get_commandline_arguments().reader == "streaming"
+
+
+def test_get_commandline_arguments_cache(monkeypatch, tmp_path):
+    """Test that the parse cache is enabled by default and can be configured."""
+
+    monkeypatch.setattr(sys, "argv", ["kahoot-to-anki"])
+    args = get_commandline_arguments()
+    assert args.cache is True
+
+    monkeypatch.setattr(sys, "argv", [
+        "kahoot-to-anki", "--no-cache", "--cache-dir", str(tmp_path), "--cache-size", "2"
+    ])
+    args = get_commandline_arguments()
+    assert args.cache is False
+    assert args.cache_dir == str(tmp_path)
+    assert args.cache_size == 2 * 1024 * 1024
+
+
+def test_get_commandline_arguments_incremental(monkeypatch):
+    """Test that --incremental is parsed and disabled by default."""
+
+    monkeypatch.setattr(sys, "argv", ["kahoot-to-anki"])
+    assert get_commandline_arguments().incremental is False
+
+    monkeypatch.setattr(sys, "argv", ["kahoot-to-anki", "--incremental"])
+    assert get_commandline_arguments().incremental is True
+
+
+
+def test_get_commandline_arguments_stream(monkeypatch):
+    """Test that --stream and --chunk-size are parsed."""
+
+    monkeypatch.setattr(sys, "argv", ["kahoot-to-anki"])
+    args = get_commandline_arguments()
+    assert args.stream is False
+    assert args.chunk_size == 1000
+
+    monkeypatch.setattr(sys, "argv", ["kahoot-to-anki", "--stream", "--chunk-size", "50"])
+    args = get_commandline_arguments()
+    assert args.stream is True
+    assert args.chunk_size == 50
+
+
+def test_get_commandline_arguments_stream_incremental(monkeypatch):
+    """Test that --stream cannot be combined with --incremental."""
+
+    monkeypatch.setattr(sys, "argv", ["kahoot-to-anki", "--stream", "--incremental"])
+
+    with pytest.raises(SystemExit):
+        get_commandline_arguments()
+
+
+
+def test_get_commandline_arguments_instrumentation(monkeypatch):
+    """Test that the stats and profiling arguments are parsed."""
+
+    monkeypatch.setattr(sys, "argv", ["kahoot-to-anki"])
+    args = get_commandline_arguments()
+    assert args.stats_json is None
+    assert args.profile is None
+    assert args.trace_memory is False
+
+    monkeypatch.setattr(sys, "argv", [
+        "kahoot-to-anki", "--stats-json", "stats.json", "--profile", "run.prof", "--trace-memory"
+    ])
+    args = get_commandline_arguments()
+    assert Path(args.stats_json).name == "stats.json"
+    assert Path(args.profile).name == "run.prof"
+    assert args.trace_memory is True
+
+
+def test_get_commandline_arguments_reproducible(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["kahoot-to-anki"])
+    assert get_commandline_arguments().reproducible is False
+
+    monkeypatch.setattr(sys, "argv", ["kahoot-to-anki", "--reproducible"])
+    assert get_commandline_arguments().reproducible is True
+
+
+def test_get_commandline_arguments_analytics(monkeypatch):
+    """Test that --only-below accepts a percentage with or without % and --order difficulty is rejected with --stream.
+    The analytics are only read if they are used."""
+
+    monkeypatch.setattr(sys, "argv", ["kahoot-to-anki"])
+    args = get_commandline_arguments()
+    assert (args.only_below, args.order, args.analytics) == (None, "input", False)
+
+    monkeypatch.setattr(sys, "argv", ["kahoot-to-anki", "--only-below", "60%", "--order", "difficulty"])
+    args = get_commandline_arguments()
+    assert (args.only_below, args.order, args.analytics) == (60.0, "difficulty", True)
+
+    for argv in (["--analytics"], ["--only-below", "60"], ["--order", "difficulty"]):
+        monkeypatch.setattr(sys, "argv", ["kahoot-to-anki", *argv])
+        assert get_commandline_arguments().analytics is True
+
+    for argv in (["--only-below", "abc"], ["--only-below", "120"], ["--order", "difficulty", "--stream"]):
+        monkeypatch.setattr(sys, "argv", ["kahoot-to-anki", *argv])
+        with pytest.raises(SystemExit):
+            get_commandline_arguments()
+
+
+def test_get_commandline_arguments_split_by(monkeypatch):
+    """Test that --split-by is parsed and --split-pattern is required for the pattern mode."""
+
+    monkeypatch.setattr(sys, "argv", ["kahoot-to-anki"])
+    assert get_commandline_arguments().split_by is None
+
+    monkeypatch.setattr(sys, "argv", ["kahoot-to-anki", "--split-by", "pattern", "--split-pattern", r"^(\w+)-"])
+    args = get_commandline_arguments()
+    assert args.split_by == "pattern"
+    assert args.split_pattern == r"^(\w+)-"
+
+    for argv in (["--split-by", "pattern"], ["--split-by", "pattern", "--split-pattern", "("],
+                 ["--split-pattern", "x"], ["--split-by", "file", "--stream"]):
+        monkeypatch.setattr(sys, "argv", ["kahoot-to-anki", *argv])
+        with pytest.raises(SystemExit):
+            get_commandline_arguments()
+
+
+def test_get_commandline_arguments_dedup(monkeypatch, tmp_path):
+    """Test that the dedup options are parsed and unknown normalization rules are rejected."""
+
+    monkeypatch.setattr(sys, "argv", ["kahoot-to-anki"])
+    args = get_commandline_arguments()
+    assert (args.dedup_normalize, args.dedup_answers, args.dedup_bits, args.dedup_index) == ((), False, 128, None)
+
+    monkeypatch.setattr(sys, "argv", [
+        "kahoot-to-anki", "--dedup-normalize", "case, whitespace", "--dedup-answers", "--dedup-bits", "64",
+        "--dedup-index", str(tmp_path / "dedup.idx"),
+    ])
+    args = get_commandline_arguments()
+    assert args.dedup_normalize == ("case", "whitespace")
+    assert args.dedup_answers is True
+    assert args.dedup_bits == 64
+    assert args.dedup_index == str(tmp_path / "dedup.idx")
+
+    monkeypatch.setattr(sys, "argv", ["kahoot-to-anki", "--dedup-normalize", "stemming"])
+    with pytest.raises(SystemExit):
+        get_commandline_arguments()
+
+
+def test_get_commandline_arguments_watch(monkeypatch):
+    """Test that --watch is parsed with its timings and rejected with --stream."""
+
+    monkeypatch.setattr(sys, "argv", ["kahoot-to-anki", "--watch", "--debounce", "0.5", "--poll-interval", "3"])
+    args = get_commandline_arguments()
+    assert (args.watch, args.debounce, args.poll_interval) == (True, 0.5, 3.0)
+
+    monkeypatch.setattr(sys, "argv", ["kahoot-to-anki", "--watch", "--stream"])
+    with pytest.raises(SystemExit):
+        get_commandline_arguments()
+
+
+
+def test_get_commandline_arguments_export(monkeypatch):
+    """Test that the export formats are parsed and unknown formats are rejected."""
+
+    monkeypatch.setattr(sys, "argv", ["kahoot-to-anki"])
+    assert get_commandline_arguments().exports == ()
+
+    monkeypatch.setattr(sys, "argv", ["kahoot-to-anki", "--export", "jsonl,csv"])
+    assert get_commandline_arguments().exports == ("jsonl", "csv")
+
+    monkeypatch.setattr(sys, "argv", ["kahoot-to-anki", "--export", "xml"])
+    with pytest.raises(SystemExit):
+        get_commandline_arguments()
+
+
+def test_get_commandline_arguments_discovery(monkeypatch):
+    """Test that the discovery options are parsed and rejected with --watch and --batch."""
+
+    monkeypatch.setattr(sys, "argv", ["kahoot-to-anki"])
+    args = get_commandline_arguments()
+    assert (args.recursive, args.include, args.exclude, args.discover_threads) == (False, (), (), 1)
+
+    monkeypatch.setattr(sys, "argv", [
+        "kahoot-to-anki", "-r", "--include", "2024/*", "--include", "2025/*", "--exclude", "*/drafts/*",
+        "--discover-threads", "8",
+    ])
+    args = get_commandline_arguments()
+    assert (args.recursive, args.include, args.exclude, args.discover_threads) == (
+        True, ("2024/*", "2025/*"), ("*/drafts/*",), 8
+    )
+
+    for argv in (["--watch", "-r"], ["--batch", "jobs.jsonl", "--include", "*.xlsx"], ["--discover-threads", "0"]):
+        monkeypatch.setattr(sys, "argv", ["kahoot-to-anki", *argv])
+        with pytest.raises(SystemExit):
+            get_commandline_arguments()
+
+
+def test_get_commandline_arguments_media(monkeypatch, tmp_path):
+    """Test that --media-dir and --media-remote imply --media and the media options are validated."""
+
+    monkeypatch.setattr(sys, "argv", ["kahoot-to-anki"])
+    args = get_commandline_arguments()
+    assert (args.media, args.media_dir, args.media_workers, args.media_remote) == (False, None, 8, False)
+
+    monkeypatch.setattr(sys, "argv", ["kahoot-to-anki", "--media-dir", str(tmp_path), "--media-workers", "2"])
+    args = get_commandline_arguments()
+    assert (args.media, args.media_dir, args.media_workers, args.media_remote) == (True, str(tmp_path), 2, False)
+
+    monkeypatch.setattr(sys, "argv", ["kahoot-to-anki", "--media-remote"])
+    args = get_commandline_arguments()
+    assert (args.media, args.media_remote) == (True, True)
+
+    for argv in (["--media-workers", "0"], ["--media-dir", str(tmp_path / "missing")], ["--batch", "jobs.jsonl", "--media"]):
+        monkeypatch.setattr(sys, "argv", ["kahoot-to-anki", *argv])
+        with pytest.raises(SystemExit):
+            get_commandline_arguments()
+
+
 # --- validation ---
 def test_validation_valid_excel_file(tmp_path):
     # Create dummy Excel file
@@ -100,6 +340,30 @@ def test_validation_input_directory_no_excel_files(tmp_path):
         validation(str(input_dir), str(output_dir))
         
         
+def test_validation_uses_listed_files(tmp_path):
+    """Test that the files listed by discover_files are validated instead of listing the directory again."""
+    (tmp_path / "~$quiz.xlsx").write_text("Excel lock file")
+
+    with pytest.raises(FileNotFoundError, match="does not contain any excel files"):
+        validation(str(tmp_path), str(tmp_path))
+    validation(str(tmp_path), str(tmp_path), files=[str(tmp_path / "sub" / "quiz.xlsx")])
+    with pytest.raises(FileNotFoundError):
+        validation(str(tmp_path), str(tmp_path), files=[])
+
+
+def test_validation_registered_reader(tmp_path, monkeypatch):
+    """Test that the files of a reader registered with register_reader are accepted like by get_excels."""
+    monkeypatch.setattr(readers, "INPUT_READERS", dict(readers.INPUT_READERS))
+    (tmp_path / "quiz.tsv").write_text("Question Number\tQuestion\tCorrect Answers\n1\tQ1?\tYes\n")
+    with pytest.raises(FileNotFoundError):
+        validation(str(tmp_path), str(tmp_path))
+
+    readers.register_reader(".tsv", lambda path: None)
+
+    validation(str(tmp_path), str(tmp_path))
+    validation(str(tmp_path / "quiz.tsv"), str(tmp_path))
+
+
 def test_validation_output_not_a_directory(tmp_path):
     excel_file = tmp_path / "valid.xlsx"
     excel_file.write_text("Excel content")
@@ -109,3 +373,19 @@ def test_validation_output_not_a_directory(tmp_path):
 
     with pytest.raises(ValueError, match="Output is not a directory"):
         validation(str(excel_file), str(output_path))
+
+
+def test_validation_watch_allows_empty_directory(tmp_path):
+    """Test that a watched input directory does not need to contain Excel files yet."""
+
+    with pytest.raises(FileNotFoundError):
+        validation(str(tmp_path), str(tmp_path))
+    validation(str(tmp_path), str(tmp_path), require_excels=False)
+
+
+def test_validation_accepts_exports(tmp_path):
+    """Test that the exports of earlier runs are valid inputs."""
+    (tmp_path / "kahoot.jsonl").write_text("")
+
+    validation(str(tmp_path), str(tmp_path))
+    validation(str(tmp_path / "kahoot.jsonl"), str(tmp_path))
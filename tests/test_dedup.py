@@ -0,0 +1,165 @@
+import sys
+
+import pandas as pd
+import pytest
+
+from kahoot_to_anki import pipeline, processing
+from kahoot_to_anki.dedup import DedupIndex, load_dedup_index
+from kahoot_to_anki.main import main
+from kahoot_to_anki.processing import get_questions
+
+KAHOOT_SHEET_NAME = "RawReportData Data"
+
+
+def frame(questions, answers=None):
+    return pd.DataFrame({
+        "Question": questions,
+        "Possible Answers": answers or ["A<br>B"] * len(questions),
+        "Correct Answers": ["A"] * len(questions),
+    })
+
+
+# --- DedupIndex ---
+def test_filter_matches_drop_duplicates():
+    """Test that the default index drops exact duplicates like drop_duplicates."""
+    df = frame(["A", "B", "A", "a", " B", "C"])
+
+    assert DedupIndex().filter(df).equals(df.drop_duplicates(subset=["Question"]))
+
+
+@pytest.mark.parametrize("rules, question, duplicate", [
+    (["whitespace"], "What  is\n2 + 2? ", "What is 2 + 2?"),
+    (["case"], "What is PYTHON?", "what is python?"),
+    (["html"], "&lt;b&gt;bold&lt;/b&gt; &amp; more", "&lt;i&gt;bold&lt;/i&gt; &amp; more"),
+    (["unicode"], "ｆｕｌｌ width", "full width"),
+    (["html", "whitespace", "case"], "<b>Größe</b>  &amp; Mehr", "größe & mehr"),
+])
+def test_normalization_rules(rules, question, duplicate):
+    """Test that questions which only differ by the normalization rules are duplicates."""
+    assert DedupIndex().filter(frame([question, duplicate]))["Question"].tolist() == [question, duplicate]
+    assert DedupIndex(rules).filter(frame([question, duplicate]))["Question"].tolist() == [question]
+
+
+def test_html_rule_drops_escaped_tags():
+    """Test that the html rule compares the text of escaped markup, as produced by df_processing."""
+    index = DedupIndex(["html", "whitespace"])
+
+    assert index.normalize("&lt;b&gt;bold&lt;/b&gt;<br>text") == "bold text"
+    assert index.normalize("x &lt; y &gt; z") == "x < y > z"
+
+
+def test_include_answers():
+    """Test that questions with other answers are kept, independent of the answer order."""
+    index = DedupIndex(include_answers=True)
+    df = frame(["Q", "Q", "Q"], answers=["A<br>B", "B<br>A", "A<br>C"])
+
+    assert index.filter(df)["Possible Answers"].tolist() == ["A<br>B", "A<br>C"]
+
+
+def test_mask_updates_index_across_frames():
+    """Test that the index can be filled frame by frame."""
+    index = DedupIndex(digest_bits=64)
+
+    assert index.mask(frame(["A", "B", "A"])) == [True, True, False]
+    assert index.mask(frame(["B", "C"])) == [False, True]
+    assert len(index) == 3
+    assert all(digest < 1 << 64 for digest in index.digests)
+
+
+def test_invalid_settings():
+    with pytest.raises(ValueError):
+        DedupIndex(["stemming"])
+    with pytest.raises(ValueError):
+        DedupIndex(digest_bits=32)
+
+
+# --- save / load ---
+@pytest.mark.parametrize("digest_bits", [64, 128])
+def test_save_and_load(tmp_path, digest_bits):
+    """Test that the persisted index keeps the hashes and the settings."""
+    index = DedupIndex(["case"], include_answers=True, digest_bits=digest_bits)
+    index.mask(frame(["A", "B"]))
+    path = tmp_path / "dedup.idx"
+
+    index.save(str(path))
+    loaded = DedupIndex.load(str(path))
+
+    assert loaded.settings == index.settings
+    assert loaded.digests == index.digests
+    assert path.stat().st_size < 100 + 2 * digest_bits // 8
+
+
+def test_load_dedup_index(tmp_path, caplog):
+    """Test that a persisted index is only reused with the same settings."""
+    path = tmp_path / "dedup.idx"
+    assert len(load_dedup_index(str(path))) == 0
+
+    index = DedupIndex(["case"])
+    index.mask(frame(["A"]))
+    index.save(str(path))
+
+    assert len(load_dedup_index(str(path), ["case"])) == 1
+    assert len(load_dedup_index(str(path), ["whitespace"])) == 0
+    assert "other settings" in caplog.text
+
+    path.write_bytes(b"garbage")
+    assert len(load_dedup_index(str(path), ["case"])) == 0
+    assert "Ignoring invalid dedup index" in caplog.text
+
+
+# --- get_questions ---
+def test_get_questions_with_dedup_index(tmp_path):
+    """Test that get_questions uses the index across calls."""
+    df = pd.DataFrame({
+        "Question Number": [1, 2, 3],
+        "Question": ["What is  Python?", "what is python?", "New?"],
+        "Answer 1": ["A", "A", "A"],
+        "Answer 2": ["B", "B", "B"],
+        "Answer 3": [""] * 3,
+        "Answer 4": [""] * 3,
+        "Answer 5": [""] * 3,
+        "Answer 6": [""] * 3,
+        "Correct Answers": ["A", "A", "A"],
+    })
+    df.to_excel(tmp_path / "quiz.xlsx", sheet_name=KAHOOT_SHEET_NAME, index=False)
+    index = DedupIndex(["whitespace", "case"])
+
+    assert get_questions(str(tmp_path), KAHOOT_SHEET_NAME, dedup=index)["Question"].tolist() == [
+        "What is  Python?", "New?"
+    ]
+    assert get_questions(str(tmp_path), KAHOOT_SHEET_NAME, dedup=index).empty
+
+
+# --- main ---
+@pytest.mark.parametrize("stream", [False, True])
+def test_dedup_index_not_saved_if_package_fails(tmp_path, monkeypatch, stream):
+    """Test that the questions of a package which could not be written are not recorded as seen."""
+    pd.DataFrame({
+        "Question Number": [1],
+        "Question": ["Q1?"],
+        "Correct Answers": ["A"],
+    }).to_csv(tmp_path / "quiz.csv", index=False)
+    index = tmp_path / "dedup.idx"
+    argv = [
+        "kahoot-to-anki", "--inp", str(tmp_path), "--out", str(tmp_path), "--no-cache", "--dedup-index", str(index),
+        *(["--stream"] if stream else []),
+    ]
+    monkeypatch.setattr(sys, "argv", argv)
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(processing, "write_genanki_package", fail)
+    monkeypatch.setattr(pipeline, "ApkgWriter", fail)
+    if stream:
+        with pytest.raises(OSError):
+            main()
+    else:
+        main()
+    assert not index.exists()
+
+    monkeypatch.undo()
+    monkeypatch.setattr(sys, "argv", argv)
+    main()
+    assert (tmp_path / "anki.apkg").exists()
+    assert len(load_dedup_index(str(index), [])) == 1
@@ -0,0 +1,82 @@
+import os
+
+import pytest
+
+from kahoot_to_anki import discovery
+from kahoot_to_anki.discovery import discover_files, is_input_file
+
+EXTENSIONS = [".xlsx", ".csv"]
+
+
+@pytest.fixture
+def archive(tmp_path):
+    """An archive organised as term/course/week subdirectories."""
+    for path in [
+        "intro.xlsx",
+        "~$intro.xlsx",
+        ".hidden.xlsx",
+        "notes.txt",
+        "2023/math/week1.xlsx",
+        "2024/math/week1.xlsx",
+        "2024/math/week2.csv",
+        "2024/math/~$week2.xlsx",
+        "2024/bio/drafts/week1.xlsx",
+        ".git/quiz.xlsx",
+    ]:
+        file = tmp_path / path
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.write_text("")
+    return tmp_path
+
+
+def relative(files, root):
+    return [os.path.relpath(file, root).replace(os.sep, "/") for file in files]
+
+
+def test_is_input_file():
+    assert is_input_file("quiz.xlsx", "2024/quiz.xlsx", EXTENSIONS)
+    assert not is_input_file("~$quiz.xlsx", "~$quiz.xlsx", EXTENSIONS)
+    assert not is_input_file("quiz.txt", "quiz.txt", EXTENSIONS)
+    assert not is_input_file("quiz.xlsx", "2023/quiz.xlsx", EXTENSIONS, include=["2024/*"])
+    assert not is_input_file("quiz.xlsx", "2024/quiz.xlsx", EXTENSIONS, exclude=["*quiz*"])
+
+
+def test_discover_files_top_level(archive):
+    """Test that only the top level is listed by default, without lock files and hidden files."""
+    assert relative(discover_files(str(archive), EXTENSIONS), archive) == ["intro.xlsx"]
+    assert discover_files(str(archive / "intro.xlsx"), EXTENSIONS) == [str(archive / "intro.xlsx")]
+    assert discover_files(str(archive / "missing"), EXTENSIONS) == []
+
+
+@pytest.mark.parametrize("threads", [1, 4])
+def test_discover_files_recursive(archive, threads):
+    """Test that the subdirectories are listed in sorted order, serially and by several threads."""
+    files = discover_files(str(archive), EXTENSIONS, recursive=True, threads=threads)
+
+    assert relative(files, archive) == [
+        "2023/math/week1.xlsx",
+        "2024/bio/drafts/week1.xlsx",
+        "2024/math/week1.xlsx",
+        "2024/math/week2.csv",
+        "intro.xlsx",
+    ]
+
+
+def test_discover_files_include_exclude(archive):
+    files = discover_files(str(archive), EXTENSIONS, include=["2024/*"], exclude=["*.csv"], recursive=True)
+
+    assert relative(files, archive) == ["2024/bio/drafts/week1.xlsx", "2024/math/week1.xlsx"]
+
+
+def test_discover_files_exclude_skips_directories(archive, monkeypatch):
+    """Test that excluded directories are not listed at all."""
+    listed = []
+    original = discovery.list_directory
+    monkeypatch.setattr(discovery, "list_directory", lambda directory, **kwargs: (
+        listed.append(directory[1]) or original(directory, **kwargs)
+    ))
+
+    files = discover_files(str(archive), EXTENSIONS, exclude=["*/drafts/*", "2023/*"], recursive=True)
+
+    assert relative(files, archive) == ["2024/math/week1.xlsx", "2024/math/week2.csv", "intro.xlsx"]
+    assert sorted(listed) == ["", "2024/", "2024/bio/", "2024/math/"]
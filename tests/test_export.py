@@ -0,0 +1,111 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from kahoot_to_anki.export import QUESTION_COLUMNS, QuestionExporter, export_formats, write_exports
+from kahoot_to_anki.pipeline import run_pipeline
+from kahoot_to_anki.processing import get_questions
+from kahoot_to_anki.readers import read_input
+
+KAHOOT_SHEET_NAME = "RawReportData Data"
+TEST_KAHOOT_FILE = str(Path(__file__).parent.parent / "data" / "test_kahoot.xlsx")
+
+
+def frame(questions):
+    return pd.DataFrame({
+        "Question": questions,
+        "Possible Answers": ["A &amp; B<br>Größe 🐍"] * len(questions),
+        "Correct Answers": [""] * len(questions),
+    })
+
+
+def test_export_formats():
+    assert export_formats() == []
+    assert export_formats(True) == ["csv"]
+    assert export_formats(True, ["jsonl", "csv", "parquet"]) == ["csv", "parquet", "jsonl"]
+
+
+# --- write_exports / read_input ---
+@pytest.mark.parametrize("fmt", ["jsonl", "parquet", "feather"])
+def test_export_round_trip(tmp_path, fmt):
+    """Test that the exported questions are read back unchanged."""
+    if fmt != "jsonl":
+        pytest.importorskip("pyarrow")
+    df = frame(["Q1?", "Q2 & <b>?", "1"])
+
+    write_exports(df, str(tmp_path), [fmt])
+
+    assert read_input(str(tmp_path / f"kahoot.{fmt}")).equals(df)
+
+
+def test_export_csv_matches_previous_format(tmp_path):
+    """Test that the CSV export keeps the semicolon-separated format of kahoot.csv."""
+    df = frame(["Q1?", "Q2?"])
+
+    write_exports(df, str(tmp_path), ["csv"])
+
+    assert (tmp_path / "kahoot.csv").read_bytes().startswith(b"\xef\xbb\xbfQuestion;Possible Answers;Correct Answers")
+    csv = pd.read_csv(tmp_path / "kahoot.csv", sep=";", encoding="utf-8-sig", keep_default_na=False)
+    assert csv.equals(df)
+
+
+def test_exporter_writes_row_group_per_chunk(tmp_path):
+    """Test that every chunk becomes a compressed row group of the Parquet file and a Feather record batch."""
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    with QuestionExporter(str(tmp_path), ["parquet", "feather", "jsonl"], basename="deck") as exporter:
+        for i in range(3):
+            exporter.write(frame([f"Q{i}a", f"Q{i}b"]))
+
+    metadata = pq.ParquetFile(tmp_path / "deck.parquet").metadata
+    assert metadata.num_row_groups == 3
+    assert metadata.row_group(0).column(0).compression == "ZSTD"
+    with pa.ipc.open_file(tmp_path / "deck.feather") as reader:
+        assert reader.num_record_batches == 3
+    assert len(read_input(str(tmp_path / "deck.jsonl"))) == 6
+
+
+def test_exporter_without_chunks_creates_no_files(tmp_path):
+    with QuestionExporter(str(tmp_path), ["csv", "jsonl"]):
+        pass
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_read_input_invalid_export(tmp_path):
+    (tmp_path / "other.jsonl").write_text('{"Question": "Q1?"}\n')
+
+    with pytest.raises(ValueError, match="columns"):
+        read_input(str(tmp_path / "other.jsonl"))
+    with pytest.raises(ValueError, match="reader"):
+        read_input(str(tmp_path / "kahoot.apkg"))
+
+
+# --- exports as input ---
+@pytest.mark.parametrize("fmt", ["jsonl", "parquet", "feather"])
+def test_get_questions_reads_exports(tmp_path, fmt):
+    """Test that an export can be converted again instead of the Excel file, the exports only keep the note fields."""
+    if fmt != "jsonl":
+        pytest.importorskip("pyarrow")
+    expected = get_questions(TEST_KAHOOT_FILE, KAHOOT_SHEET_NAME)
+    write_exports(expected, str(tmp_path), [fmt])
+
+    df = get_questions(str(tmp_path), KAHOOT_SHEET_NAME)
+
+    assert df.reset_index(drop=True).equals(expected[QUESTION_COLUMNS].reset_index(drop=True))
+
+
+def test_run_pipeline_exports(tmp_path):
+    """Test that the streaming pipeline writes every export format chunk by chunk."""
+    inp = tmp_path / "input"
+    out = tmp_path / "output"
+    out.mkdir()
+    inp.mkdir()
+    write_exports(frame([f"Q{i}" for i in range(5)]), str(inp), ["jsonl"], basename="quiz")
+
+    run_pipeline(str(inp), str(out), "Test", KAHOOT_SHEET_NAME, export_csv=True, exports=["jsonl"], chunk_size=2)
+
+    assert read_input(str(out / "kahoot.jsonl"))["Question"].tolist() == [f"Q{i}" for i in range(5)]
+    assert len(pd.read_csv(out / "kahoot.csv", sep=";", encoding="utf-8-sig")) == 5
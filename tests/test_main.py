@@ -0,0 +1,48 @@
+import subprocess
+import sys
+from pathlib import Path
+
+# Cumulative import time of the CLI modules on the --help path
+IMPORT_TIME_BUDGET_US = 150_000
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl", "genanki")
+REPO_ROOT = Path(__file__).parent.parent
+
+
+def import_times(*args):
+    """Runs the CLI with -X importtime and returns the cumulative import time in microseconds by module."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "kahoot_to_anki.main", *args],
+        capture_output=True, text=True, cwd=REPO_ROOT,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, module = line.split("|")
+        if cumulative.strip().isdigit():
+            times[module.strip()] = int(cumulative)
+    return result, times
+
+
+# --- import time ---
+def test_help_does_not_import_heavy_dependencies():
+    result, times = import_times("--help")
+
+    assert result.returncode == 0
+    assert "usage:" in result.stdout
+    assert not [module for module in times if module.split(".")[0] in HEAVY_MODULES]
+
+
+def test_help_import_time_budget():
+    _, times = import_times("--help")
+
+    cli_time = sum(time for module, time in times.items() if module.startswith("kahoot_to_anki"))
+    assert cli_time < IMPORT_TIME_BUDGET_US
+
+
+def test_invalid_input_does_not_import_heavy_dependencies(tmp_path):
+    result, times = import_times("--inp", str(tmp_path / "missing"), "--out", str(tmp_path))
+
+    assert result.returncode != 0
+    assert "does not exist" in result.stderr
+    assert not [module for module in times if module.split(".")[0] in HEAVY_MODULES]
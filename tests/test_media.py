@@ -0,0 +1,260 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zipfile
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from kahoot_to_anki.export import QuestionExporter, write_exports
+from kahoot_to_anki.media import MediaStore, media_reference
+from kahoot_to_anki.pipeline import run_pipeline
+from kahoot_to_anki.processing import df_processing, get_questions, make_anki
+from kahoot_to_anki.readers import read_input
+from tests.conftest import KAHOOT_SHEET_NAME, extract_collection, read_questions
+
+PNG = b"\x89PNG\r\n\x1a\n fake image"
+
+
+def raw_data(media):
+    return pd.DataFrame({
+        "Question Number": range(1, len(media) + 1),
+        "Question": [f"Q{i}?" for i in range(len(media))],
+        "Answer 1": ["Yes"] * len(media),
+        "Answer 2": ["No"] * len(media),
+        **{f"Answer {i}": [""] * len(media) for i in range(3, 7)},
+        "Correct Answers": ["Yes"] * len(media),
+        "Media": media,
+    })
+
+
+def read_package(apkg, tmp_path):
+    """Returns the question fields and the media files (name -> content) of a package."""
+    with zipfile.ZipFile(apkg) as z:
+        media = {name: z.read(index) for index, name in json.loads(z.read("media")).items()}
+    return read_questions(apkg, tmp_path), media
+
+
+@pytest.fixture
+def media_dir(tmp_path):
+    directory = tmp_path / "media"
+    directory.mkdir()
+    (directory / "cat.png").write_bytes(PNG)
+    (directory / "same cat.png").write_bytes(PNG)
+    (directory / "clip.mp4").write_bytes(b"fake video")
+    return directory
+
+
+class CountingHandler(SimpleHTTPRequestHandler):
+    """Serves a directory, counts the requests and the maximum number of concurrent requests."""
+    lock = threading.Lock()
+    requests = 0
+    active = 0
+    max_active = 0
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.requests += 1
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+        try:
+            time.sleep(0.05)
+            super().do_GET()
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(media_dir):
+    handler = type("Handler", (CountingHandler,), {"requests": 0, "active": 0, "max_active": 0})
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), partial(handler, directory=str(media_dir)))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{httpd.server_address[1]}", handler
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+# --- media references ---
+def test_media_reference():
+    assert media_reference("") == ""
+    assert media_reference("cat.png") == '<img src="cat.png">'
+    assert media_reference("https://example.com/clip.MP4?x=1&amp;y=2") == "[sound:https://example.com/clip.MP4?x=1&amp;y=2]"
+
+
+def test_df_processing_media_column():
+    """Test that the media of the optional Media column are referenced below the question."""
+    df = df_processing(raw_data(["cat.png", "", None, "a&b.mp4"]))
+
+    assert df["Question"].tolist() == ['Q0?<br><img src="cat.png">', "Q1?", "Q2?", "Q3?<br>[sound:a&amp;b.mp4]"]
+    assert df["Media"].tolist() == ["cat.png", "", "", "a&amp;b.mp4"]
+
+
+# --- MediaStore ---
+def test_embed_local_files(tmp_path, media_dir):
+    """Test that local files are copied once by content and the references are replaced by the object names."""
+    store = MediaStore(str(tmp_path / "store"), media_dir=str(media_dir))
+    df = df_processing(raw_data(["cat.png", "same cat.png", "clip.mp4", "missing.png", "cat.png"]))
+
+    embedded, files = store.embed(df)
+
+    png = hashlib.sha256(PNG).hexdigest() + ".png"
+    mp4 = hashlib.sha256(b"fake video").hexdigest() + ".mp4"
+    assert embedded["Question"].tolist() == [
+        f'Q0?<br><img src="{png}">', f'Q1?<br><img src="{png}">', f"Q2?<br>[sound:{mp4}]",
+        'Q3?<br><img src="missing.png">', f'Q4?<br><img src="{png}">',
+    ]
+    assert sorted(os.path.basename(file) for file in files) == sorted([png, mp4])
+    assert sorted(os.listdir(tmp_path / "store" / "objects")) == sorted([png, mp4])
+    assert store.fetched == 3
+
+    # a second store reuses the objects of the unchanged files
+    store = MediaStore(str(tmp_path / "store"), media_dir=str(media_dir))
+    store.embed(df)
+    assert (store.fetched, store.reused) == (0, 3)
+
+
+def test_download_once_with_bounded_workers(tmp_path, server):
+    """Test that a URL used by many questions is downloaded once, with at most workers concurrent downloads."""
+    url, handler = server
+    media = [f"{url}/cat.png"] * 1000 + [f"{url}/same%20cat.png", f"{url}/clip.mp4", f"{url}/missing.png"]
+    df = df_processing(raw_data(media))
+
+    store = MediaStore(str(tmp_path / "store"), workers=2, allow_remote=True)
+    embedded, files = store.embed(df)
+
+    assert handler.requests == 4
+    assert handler.max_active <= 2
+    assert len(files) == 2
+    assert embedded["Question"].str.contains(url, regex=False).sum() == 1
+
+    # the on-disk cache is used across runs
+    MediaStore(str(tmp_path / "store"), workers=2, allow_remote=True).embed(df)
+    assert handler.requests == 5
+
+
+def test_downloads_need_opt_in(tmp_path, server):
+    """Test that URLs are not downloaded unless remote media are allowed."""
+    url, handler = server
+    df = df_processing(raw_data([f"{url}/cat.png"]))
+
+    embedded, files = MediaStore(str(tmp_path / "store")).embed(df)
+
+    assert handler.requests == 0
+    assert files == []
+    assert embedded["Question"].tolist() == df["Question"].tolist()
+
+
+@pytest.mark.parametrize("source", ["../secret.png", "/secret.png", "file:///secret.png", "link.png"])
+def test_local_files_outside_media_dir_fail(tmp_path, media_dir, source):
+    """Test that absolute paths, URLs and paths which resolve outside of the media directory are not copied."""
+    secret = tmp_path / "secret.png"
+    secret.write_bytes(PNG)
+    (media_dir / "link.png").symlink_to(secret)
+    source = source.replace("/secret.png", str(secret)) if source.startswith(("/", "file")) else source
+
+    _, files = MediaStore(str(tmp_path / "store"), media_dir=str(media_dir)).embed(df_processing(raw_data([source])))
+
+    assert files == []
+
+
+def test_only_media_column_is_resolved(tmp_path, media_dir):
+    """Test that media references in the text of the questions and answers are not resolved."""
+    raw = raw_data(["", "clip.mp4"])
+    raw["Question"] = ["[sound:cat.png]", "Q1 [sound:cat.png]"]
+    raw["Answer 3"] = ['<img src="cat.png">', "[sound:cat.png]"]
+    df = df_processing(raw)
+
+    embedded, files = MediaStore(str(tmp_path / "store"), media_dir=str(media_dir)).embed(df)
+
+    mp4 = hashlib.sha256(b"fake video").hexdigest() + ".mp4"
+    assert [os.path.basename(file) for file in files] == [mp4]
+    assert embedded["Question"].tolist() == ["[sound:cat.png]", f"Q1 [sound:cat.png]<br>[sound:{mp4}]"]
+    assert embedded["Possible Answers"].tolist() == df["Possible Answers"].tolist()
+
+
+# --- packages ---
+@pytest.mark.parametrize("writer", ["genanki", "fast"])
+def test_make_anki_adds_media(tmp_path, media_dir, writer):
+    out = tmp_path / "out"
+    out.mkdir()
+    df = df_processing(raw_data(["cat.png", "same cat.png", "clip.mp4", ""]))
+
+    make_anki(df, str(out), "Test", writer=writer, media=MediaStore(str(tmp_path / "store"), media_dir=str(media_dir)))
+
+    questions, media = read_package(out / "anki.apkg", tmp_path)
+    png = hashlib.sha256(PNG).hexdigest() + ".png"
+    assert questions[0] == f'Q0?<br><img src="{png}">'
+    assert media[png] == PNG
+    assert len(media) == 2
+
+
+def test_media_keeps_guids(tmp_path, media_dir):
+    """Test that the note GUIDs do not depend on whether the media are embedded."""
+    df = df_processing(raw_data(["cat.png"]))
+    for name, media in [("plain", None), ("embedded", MediaStore(str(tmp_path / "store"), media_dir=str(media_dir)))]:
+        (tmp_path / name).mkdir()
+        make_anki(df, str(tmp_path / name), "Test", writer="fast", media=media)
+
+    guids = []
+    for name in ["plain", "embedded"]:
+        with sqlite3.connect(extract_collection(tmp_path / name / "anki.apkg", tmp_path / name)) as conn:
+            guids.append(conn.execute("SELECT guid FROM notes").fetchall())
+    assert guids[0] == guids[1]
+
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl", "parquet", "feather"])
+def test_exports_keep_media(tmp_path, media_dir, fmt):
+    """Test that the exports keep the Media column, so a package converted from them gets the media too."""
+    if fmt in ("parquet", "feather"):
+        pytest.importorskip("pyarrow")
+    out = tmp_path / "out"
+    out.mkdir()
+    df = df_processing(raw_data(["cat.png", "", "a&b.mp4"]))
+
+    write_exports(df, str(tmp_path), [fmt])
+    exported = read_input(str(tmp_path / f"kahoot.{fmt}"))
+    make_anki(exported, str(out), "Test", media=MediaStore(str(tmp_path / "store"), media_dir=str(media_dir)))
+
+    assert exported.equals(df)
+    questions, media = read_package(out / "anki.apkg", tmp_path)
+    assert questions[0] == f'Q0?<br><img src="{hashlib.sha256(PNG).hexdigest()}.png">'
+    assert len(media) == 1
+
+
+def test_exporter_fills_missing_media(tmp_path):
+    """Test that the chunks without the Media column of the first chunk get empty sources."""
+    with QuestionExporter(str(tmp_path), ["jsonl"]) as exporter:
+        exporter.write(df_processing(raw_data(["cat.png"])))
+        exporter.write(df_processing(raw_data(["cat.png"])).drop(columns="Media"))
+
+    assert read_input(str(tmp_path / "kahoot.jsonl"))["Media"].tolist() == ["cat.png", ""]
+
+
+def test_run_pipeline_media(tmp_path, media_dir):
+    """Test that the streamed package contains the media of every chunk once."""
+    inp = tmp_path / "input"
+    out = tmp_path / "output"
+    inp.mkdir()
+    out.mkdir()
+    raw_data(["cat.png", "clip.mp4", "same cat.png", "cat.png", ""]).to_csv(inp / "quiz.csv", index=False)
+    store = MediaStore(str(tmp_path / "store"), media_dir=str(media_dir))
+
+    run_pipeline(str(inp), str(out), "Test", KAHOOT_SHEET_NAME, chunk_size=2, media=store)
+
+    questions, media = read_package(out / "anki.apkg", tmp_path)
+    assert len(questions) == 5
+    assert len(media) == 2
+    assert get_questions(str(inp), KAHOOT_SHEET_NAME)["Question"].tolist()[0] == 'Q0?<br><img src="cat.png">'
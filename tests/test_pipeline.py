@@ -0,0 +1,128 @@
+import os
+import sqlite3
+
+import pandas as pd
+
+from kahoot_to_anki.apkg import REPRODUCIBLE_TIMESTAMP
+from kahoot_to_anki.dedup import DedupIndex
+from kahoot_to_anki.pipeline import chunked, run_pipeline, unique_questions
+from kahoot_to_anki.processing import get_questions, make_anki
+from tests.conftest import KAHOOT_SHEET_NAME, extract_collection, read_note_fields, write_report
+
+
+def frame(questions):
+    return pd.DataFrame({
+        "Question": questions,
+        "Possible Answers": ["A<br>B"] * len(questions),
+        "Correct Answers": ["A"] * len(questions),
+    })
+
+
+# --- run_pipeline ---
+def test_run_pipeline_matches_get_questions(tmp_path):
+    """Test that the streamed outputs contain the same questions as the in-memory conversion."""
+    inp = tmp_path / "input"
+    out = tmp_path / "output"
+    inp.mkdir()
+    out.mkdir()
+    write_report(inp / "quiz1.xlsx", ["Q1?", "Q2 & <b>?", "Q3?"])
+    write_report(inp / "quiz2.xlsx", ["Q2 & <b>?", "Q4?"])
+    write_report(inp / "quiz3.xlsx", ["Q5?", "Q1?"])
+
+    questions_cnt = run_pipeline(
+        str(inp), str(out), "Test Deck", KAHOOT_SHEET_NAME, export_csv=True, chunk_size=2
+    )
+
+    expected = get_questions(str(inp), KAHOOT_SHEET_NAME)
+    assert questions_cnt == len(expected) == 5
+
+    csv = pd.read_csv(out / "kahoot.csv", sep=";", encoding="utf-8-sig", keep_default_na=False)
+    pd.testing.assert_frame_equal(csv, expected.reset_index(drop=True), check_dtype=False, check_categorical=False)
+
+    notes = read_note_fields(out / "anki.apkg", tmp_path / "extracted")
+    assert notes == expected[["Question", "Correct Answers", "Possible Answers"]].values.tolist()
+
+
+def test_run_pipeline_without_questions_writes_nothing(tmp_path):
+    (tmp_path / "fake.xlsx").write_text("This is not a real Excel file.")
+
+    questions_cnt = run_pipeline(str(tmp_path), str(tmp_path), "Test Deck", KAHOOT_SHEET_NAME, export_csv=True)
+
+    assert questions_cnt == 0
+    assert not (tmp_path / "anki.apkg").exists()
+    assert not (tmp_path / "kahoot.csv").exists()
+
+
+def test_run_pipeline_only_below_without_notes_writes_no_package(tmp_path):
+    """Test that no empty package is written if only_below selects none of the questions, like make_anki."""
+    inp = tmp_path / "input"
+    inp.mkdir()
+    pd.DataFrame({
+        "Question Number": [1, 1, 2],
+        "Question": ["Q1?", "Q1?", "Q2?"],
+        "Answer 1": ["Yes"] * 3,
+        "Correct Answers": ["Yes"] * 3,
+        "Correct / Incorrect": ["Correct"] * 3,
+    }).to_csv(inp / "quiz.csv", index=False)
+
+    questions_cnt = run_pipeline(
+        str(inp), str(tmp_path), "Test Deck", KAHOOT_SHEET_NAME, export_csv=True, only_below=50
+    )
+
+    assert questions_cnt == 2
+    assert not (tmp_path / "anki.apkg").exists()
+    assert (tmp_path / "kahoot.csv").exists()
+
+
+def test_run_pipeline_reproducible_after_touch(tmp_path, monkeypatch):
+    """Test that touching the inputs between two reproducible runs gives the same bytes."""
+    monkeypatch.delenv("SOURCE_DATE_EPOCH", raising=False)
+    inp = tmp_path / "input"
+    inp.mkdir()
+    for filename in ["quiz1.xlsx", "quiz2.xlsx"]:
+        write_report(inp / filename, [f"{filename}?"])
+    packages = []
+    for run, mtime in enumerate([1751000000, 1752000000]):
+        for filename in ["quiz1.xlsx", "quiz2.xlsx"]:
+            os.utime(inp / filename, (mtime, mtime))
+        out = tmp_path / f"run{run}"
+        out.mkdir()
+        run_pipeline(str(inp), str(out), "Test Deck", KAHOOT_SHEET_NAME, reproducible=True)
+        packages.append((out / "anki.apkg").read_bytes())
+    (tmp_path / "memory").mkdir()
+    make_anki(
+        get_questions(str(inp), KAHOOT_SHEET_NAME), str(tmp_path / "memory"), "Test Deck", writer="fast",
+        reproducible=True,
+    )
+
+    assert packages[0] == packages[1]
+    assert packages[0] == (tmp_path / "memory" / "anki.apkg").read_bytes()
+    with sqlite3.connect(extract_collection(tmp_path / "run1" / "anki.apkg", tmp_path / "extracted")) as conn:
+        assert conn.execute("SELECT DISTINCT mod FROM notes").fetchall() == [(REPRODUCIBLE_TIMESTAMP,)]
+
+
+# --- unique_questions ---
+def test_unique_questions_keeps_first_occurrence():
+    frames = [frame(["A", "B", "A"]), frame(["B"]), frame(["C", "A"])]
+
+    result = list(unique_questions(frames))
+
+    assert [list(df["Question"]) for df in result] == [["A", "B"], ["C"]]
+
+
+def test_unique_questions_updates_index():
+    index = DedupIndex()
+    list(unique_questions([frame(["A", "B"])], index=index))
+
+    assert len(index) == 2
+    assert list(unique_questions([frame(["A", "C"])], index=index))[0]["Question"].tolist() == ["C"]
+
+
+# --- chunked ---
+def test_chunked_combines_frames():
+    frames = [frame(["A"]), frame(["B", "C"]), frame(["D"]), frame(["E"])]
+
+    result = list(chunked(frames, chunk_size=2))
+
+    assert [list(df["Question"]) for df in result] == [["A", "B", "C"], ["D", "E"]]
+    assert list(result[0].index) == [0, 1, 2]
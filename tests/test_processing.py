@@ -1,18 +1,32 @@
+import html
+import io
+import json
 import logging
+import sqlite3
 import zipfile
+from pathlib import Path
 
+import numpy as np
 import pandas as pd
+import pytest
 
-from kahoot_to_anki.processing import get_questions, get_excels, get_excel_data, df_processing, make_anki
+from kahoot_to_anki.export import write_exports
+from kahoot_to_anki.processing import (
+    get_questions, get_excels, get_excel_data, df_processing, make_anki, read_questions, read_excel_streaming,
+    note_guid, escape_html, compact_questions, question_analytics, question_tags, select_questions,
+)
+from tests.conftest import KAHOOT_SHEET_NAME, extract_collection, write_report
 
 logging.basicConfig(level=logging.DEBUG)
 
-KAHOOT_SHEET_NAME = "RawReportData Data"
+TEST_KAHOOT_FILE = Path(__file__).parent.parent / "data" / "test_kahoot.xlsx"
+
+def read_notes(apkg, tmp_path):
+    """Returns the (guid, fields) of the notes in an Anki package."""
+    with sqlite3.connect(extract_collection(apkg, tmp_path / "extracted")) as conn:
+        rows = conn.execute("SELECT guid, flds FROM notes ORDER BY id").fetchall()
+    return [(guid, flds.split("\x1f")) for guid, flds in rows]
 
-def write_excel(df: pd.DataFrame, tmp_path, filename="sample.xlsx", sheet_name=KAHOOT_SHEET_NAME):
-    path = tmp_path / filename
-    df.to_excel(path, sheet_name=sheet_name, index=False)
-    return path
 
 # --- get_questions ---
 def test_get_questions_single_file(tmp_path):
@@ -30,7 +44,7 @@ def test_get_questions_single_file(tmp_path):
         "Correct Answers": ["4"]
     })
 
-    excel_file = write_excel(df, tmp_path)
+    excel_file = write_report(tmp_path / "sample.xlsx", df)
     result_df = get_questions(input_directory=str(excel_file), sheet_name=KAHOOT_SHEET_NAME)
 
     # Assertions
@@ -59,7 +73,7 @@ def test_get_questions_deduplicates_questions(tmp_path):
     df2 = df1.copy()
     df = pd.concat([df1, df2], ignore_index=True)
 
-    write_excel(df, tmp_path)
+    write_report(tmp_path / "sample.xlsx", df)
     result_df = get_questions(input_directory=str(tmp_path), sheet_name=KAHOOT_SHEET_NAME)
 
     # Assertions
@@ -81,7 +95,7 @@ def test_get_questions_handles_numeric_answers(tmp_path):
         "Correct Answers": ["4"]
     })
 
-    write_excel(df, tmp_path)
+    write_report(tmp_path / "sample.xlsx", df)
     result_df = get_questions(input_directory=str(tmp_path), sheet_name=KAHOOT_SHEET_NAME)
 
     assert result_df.shape[0] == 1
@@ -94,7 +108,7 @@ def test_get_questions_returns_empty_for_empty_file(tmp_path):
         "Question Number", "Question", "Answer 1", "Answer 2", "Answer 3",
         "Answer 4", "Answer 5", "Answer 6", "Correct Answers"
     ])
-    write_excel(df, tmp_path)
+    write_report(tmp_path / "sample.xlsx", df)
     result_df = get_questions(input_directory=str(tmp_path), sheet_name=KAHOOT_SHEET_NAME)
     assert result_df.empty
     
@@ -125,8 +139,8 @@ def test_get_questions_merges_multiple_files(tmp_path):
     })
 
     # Write both files into the same temp directory
-    write_excel(df1, tmp_path, filename="quiz1.xlsx")
-    write_excel(df2, tmp_path, filename="quiz2.xlsx")
+    write_report(tmp_path / "quiz1.xlsx", df1)
+    write_report(tmp_path / "quiz2.xlsx", df2)
 
     result_df = get_questions(input_directory=str(tmp_path), sheet_name=KAHOOT_SHEET_NAME)
 
@@ -135,6 +149,33 @@ def test_get_questions_merges_multiple_files(tmp_path):
     assert "What is the capital of France?" in result_df["Question"].values
     
     
+def test_get_questions_merges_empty_and_valid_files(tmp_path):
+    """Test that empty reports do not affect the questions of the other files."""
+    empty = pd.DataFrame(columns=[
+        "Question Number", "Question", "Answer 1", "Answer 2", "Answer 3",
+        "Answer 4", "Answer 5", "Answer 6", "Correct Answers"
+    ])
+    df = pd.DataFrame({
+        "Question Number": [1, 2],
+        "Question": ["What is 2+2?", "What is 3+3?"],
+        "Answer 1": ["4", "6"],
+        "Answer 2": ["3", "5"],
+        "Answer 3": ["", ""],
+        "Answer 4": ["", ""],
+        "Answer 5": ["", ""],
+        "Answer 6": ["", ""],
+        "Correct Answers": ["4", "6"]
+    })
+
+    write_report(tmp_path / "quiz1.xlsx", empty)
+    write_report(tmp_path / "quiz2.xlsx", df)
+
+    result_df = get_questions(input_directory=str(tmp_path), sheet_name=KAHOOT_SHEET_NAME)
+
+    assert list(result_df["Question"]) == ["What is 2+2?", "What is 3+3?"]
+    assert list(result_df.index) == [0, 1]
+
+
 def test_get_questions_skips_invalid_sheets(tmp_path):
     df1 = pd.DataFrame({
         "Question Number": [1],
@@ -173,9 +214,9 @@ def test_get_questions_skips_invalid_sheets(tmp_path):
     })
 
     # Write both files into the same temp directory
-    write_excel(df1, tmp_path, filename="quiz1.xlsx")
-    write_excel(df2, tmp_path, filename="quiz2.xlsx")
-    write_excel(df3, tmp_path, filename="quiz3.xlsx", sheet_name="TEST")
+    write_report(tmp_path / "quiz1.xlsx", df1)
+    write_report(tmp_path / "quiz2.xlsx", df2)
+    write_report(tmp_path / "quiz3.xlsx", df3, sheet_name="TEST")
 
     result_df = get_questions(input_directory=str(tmp_path), sheet_name=KAHOOT_SHEET_NAME)
 
@@ -184,6 +225,30 @@ def test_get_questions_skips_invalid_sheets(tmp_path):
     assert "What is the capital of France?" in result_df["Question"].values
 
 
+def test_get_questions_parallel_matches_serial(tmp_path):
+    """Test that reading the files with worker processes keeps the rows of a serial run."""
+    for i in range(4):
+        df = pd.DataFrame({
+            "Question Number": [1, 2],
+            "Question": ["What is 2+2?", f"Question of quiz {i}?"],
+            "Answer 1": ["4", "A"],
+            "Answer 2": ["3", "B"],
+            "Answer 3": ["", ""],
+            "Answer 4": ["", ""],
+            "Answer 5": ["", ""],
+            "Answer 6": ["", ""],
+            "Correct Answers": [str(i), "A"]
+        })
+        write_report(tmp_path / f"quiz{i}.xlsx", df)
+    (tmp_path / "broken.xlsx").write_text("This is not a real Excel file.")
+
+    serial = get_questions(input_directory=str(tmp_path), sheet_name=KAHOOT_SHEET_NAME, jobs=1)
+    parallel = get_questions(input_directory=str(tmp_path), sheet_name=KAHOOT_SHEET_NAME, jobs=3)
+
+    assert serial.shape[0] == 5
+    pd.testing.assert_frame_equal(serial, parallel)
+
+
 # --- get_excels ---
 def test_get_excels_single_file(tmp_path):
     """Test that get_excels yields a single file when given a single .xlsx file path."""
@@ -200,7 +265,7 @@ def test_get_excels_multiple_files_in_directory(tmp_path):
     """Test that get_excels yields all .xlsx files in a directory."""
     file1 = tmp_path / "file1.xlsx"
     file2 = tmp_path / "file2.xlsx"
-    file3 = tmp_path / "file3.csv"  # should be ignored
+    file3 = tmp_path / "file3.txt"  # should be ignored
 
     for f in [file1, file2]:
         f.write_text("dummy content")
@@ -211,6 +276,18 @@ def test_get_excels_multiple_files_in_directory(tmp_path):
     assert len(result) == 2
     assert all(f.endswith(".xlsx") for f in result)
     assert str(file3) not in result
+
+
+def test_get_excels_recursive(tmp_path):
+    """Test that get_excels only descends into subdirectories if recursive and skips Excel lock files."""
+    (tmp_path / "2024" / "math").mkdir(parents=True)
+    for name in ["quiz.xlsx", "~$quiz.xlsx", "2024/math/week1.xlsx", "2024/math/~$week1.xlsx"]:
+        (tmp_path / name).write_text("dummy content")
+
+    assert list(get_excels(str(tmp_path))) == [str(tmp_path / "quiz.xlsx")]
+    assert list(get_excels(str(tmp_path), recursive=True, threads=2)) == [
+        str(tmp_path / "2024" / "math" / "week1.xlsx"), str(tmp_path / "quiz.xlsx")
+    ]
     
     
 # --- get_excel_data ---
@@ -226,6 +303,39 @@ def test_get_excel_data_valid(tmp_path):
     assert not result.empty
     assert "Question" in result.columns
 
+
+@pytest.mark.parametrize("reader", ["pandas", "streaming"])
+def test_get_excel_data_pathlib_path(reader, caplog):
+    """Test that a pathlib.Path is read as a path and not as a file object in memory."""
+    expected = get_excel_data(str(TEST_KAHOOT_FILE), sheet_name=KAHOOT_SHEET_NAME, reader=reader)
+
+    result = get_excel_data(TEST_KAHOOT_FILE, sheet_name=KAHOOT_SHEET_NAME, reader=reader)
+    pd.testing.assert_frame_equal(result, expected)
+
+    with caplog.at_level(logging.WARNING):
+        assert get_excel_data(TEST_KAHOOT_FILE.with_name("missing.xlsx"), sheet_name=KAHOOT_SHEET_NAME) is None
+    assert "missing.xlsx" in caplog.text
+    assert "<workbook in memory>" not in caplog.text
+
+
+@pytest.mark.parametrize("reader", ["pandas", "streaming"])
+def test_get_excel_data_in_memory(reader):
+    """Test that a workbook in memory, as bytes or as a file object, is read like the file."""
+    content = TEST_KAHOOT_FILE.read_bytes()
+    expected = get_excel_data(str(TEST_KAHOOT_FILE), sheet_name=KAHOOT_SHEET_NAME, reader=reader)
+
+    for workbook in [content, io.BytesIO(content)]:
+        result = get_excel_data(workbook, sheet_name=KAHOOT_SHEET_NAME, reader=reader)
+        pd.testing.assert_frame_equal(result, expected)
+
+
+def test_get_excel_data_in_memory_invalid(caplog):
+    with caplog.at_level(logging.WARNING):
+        result = get_excel_data(b"This is not a real Excel file.", sheet_name=KAHOOT_SHEET_NAME)
+
+    assert result is None
+    assert "Skipping file '<workbook in memory>'" in caplog.text
+
 def test_get_excel_data_missing_sheet(tmp_path, caplog):
     """Test behavior when the specified sheet name does not exist."""
     df = pd.DataFrame({"Question": ["Q1"]})
@@ -249,7 +359,110 @@ def test_get_excel_data_invalid_file(tmp_path, caplog):
     assert result is None
     assert "Skipping file" in caplog.text
     
-    
+
+
+def test_get_excel_data_streaming_matches_pandas():
+    """Test that the streaming reader yields the same questions as pd.read_excel."""
+    path = str(TEST_KAHOOT_FILE)
+
+    streaming = df_processing(get_excel_data(path, sheet_name=KAHOOT_SHEET_NAME, reader="streaming"))
+    default = df_processing(get_excel_data(path, sheet_name=KAHOOT_SHEET_NAME))
+
+    pd.testing.assert_frame_equal(streaming.reset_index(drop=True), default.reset_index(drop=True))
+
+
+def test_get_excel_data_streaming_missing_sheet(tmp_path, caplog):
+    """Test that the streaming reader skips files without the sheet."""
+    df = pd.DataFrame({"Question": ["Q1"]})
+    path = tmp_path / "missing_sheet.xlsx"
+    df.to_excel(path, sheet_name="WrongSheet", index=False)
+
+    with caplog.at_level(logging.WARNING):
+        result = get_excel_data(str(path), sheet_name=KAHOOT_SHEET_NAME, reader="streaming")
+
+    assert result is None
+    assert "Skipping file" in caplog.text
+
+
+def test_get_excel_data_streaming_invalid_file(tmp_path, caplog):
+    """Test that the streaming reader skips corrupted Excel files."""
+    path = tmp_path / "fake.xlsx"
+    path.write_text("This is not a real Excel file.")
+
+    with caplog.at_level(logging.WARNING):
+        result = get_excel_data(str(path), sheet_name=KAHOOT_SHEET_NAME, reader="streaming")
+
+    assert result is None
+    assert "Skipping file" in caplog.text
+
+
+# --- read_excel_streaming ---
+def test_read_excel_streaming_projects_columns_and_skips_player_rows(tmp_path):
+    """Test that only the question columns and the first row of each question are read."""
+    df = pd.DataFrame({
+        "Question Number": [1, 1, 1, 2, 2],
+        "Question": ["Q1", "Q1", "Q1", "Q2", "Q2"],
+        "Answer 1": ["A", "A", "A", "C", "C"],
+        "Answer 2": ["B", "B", "B", "D", "D"],
+        "Answer 3": [None] * 5,
+        "Answer 4": [None] * 5,
+        "Answer 5": [None] * 5,
+        "Answer 6": [None] * 5,
+        "Correct Answers": ["A", "A", "A", "D", "D"],
+        "Player": ["P1", "P2", "P3", "P1", "P2"],
+    })
+    path = write_report(tmp_path / "sample.xlsx", df)
+
+    result = read_excel_streaming(str(path), sheet_name=KAHOOT_SHEET_NAME)
+
+    assert list(result.columns) == list(df.columns[:-1])
+    assert list(result["Question"]) == ["Q1", "Q2"]
+
+
+def test_read_excel_streaming_empty_sheet(tmp_path):
+    """Test that a sheet with only a header yields an empty DataFrame."""
+    df = pd.DataFrame(columns=[
+        "Question Number", "Question", "Answer 1", "Answer 2", "Answer 3",
+        "Answer 4", "Answer 5", "Answer 6", "Correct Answers"
+    ])
+    path = write_report(tmp_path / "sample.xlsx", df)
+
+    result = read_excel_streaming(str(path), sheet_name=KAHOOT_SHEET_NAME)
+
+    assert result.empty
+    assert df_processing(result).empty
+
+
+# --- read_questions ---
+def test_read_questions_valid(tmp_path):
+    """Test that a single Excel file is read and processed."""
+    df = pd.DataFrame({
+        "Question Number": [1, 1],
+        "Question": ["Is 1 < 2?", "Is 1 < 2?"],
+        "Answer 1": ["Yes", "Yes"],
+        "Answer 2": ["No", "No"],
+        "Answer 3": ["", ""],
+        "Answer 4": ["", ""],
+        "Answer 5": ["", ""],
+        "Answer 6": ["", ""],
+        "Correct Answers": ["Yes", "Yes"]
+    })
+    path = write_report(tmp_path / "sample.xlsx", df)
+
+    result = read_questions(str(path), sheet_name=KAHOOT_SHEET_NAME)
+
+    assert result.shape[0] == 1
+    assert result.iloc[0]["Question"] == "Is 1 &lt; 2?"
+
+
+def test_read_questions_invalid_file(tmp_path):
+    """Test that an unreadable file results in None."""
+    path = tmp_path / "fake.xlsx"
+    path.write_text("This is not a real Excel file.")
+
+    assert read_questions(str(path), sheet_name=KAHOOT_SHEET_NAME) is None
+
+
 # --- df_processing ---
 def test_df_processing_empty():
     df = pd.DataFrame(columns=[
@@ -315,8 +528,199 @@ def test_df_processing_mixed_types():
     assert result.shape[0] == 1
     assert "6" in result["Possible Answers"].iloc[0]  # check that int was converted
     assert "None" not in result["Possible Answers"].iloc[0]  # check fillna
-    
-    
+
+
+
+def test_df_processing_escapes_html():
+    df = pd.DataFrame({
+        "Question Number": [1],
+        "Question": ["Is <b>1 & 2</b> \"true\" or 'false'?"],
+        "Answer 1": ["<true>"],
+        "Answer 2": ["'false'"],
+        "Answer 3": [""],
+        "Answer 4": [""],
+        "Answer 5": [""],
+        "Answer 6": [""],
+        "Correct Answers": ["<true>"]
+    })
+    result = df_processing(df)
+
+    assert result.iloc[0]["Question"] == html.escape(df.iloc[0]["Question"])
+    assert result.iloc[0]["Possible Answers"] == "&lt;true&gt;<br>&#x27;false&#x27;<br><br><br><br>"
+    assert result.iloc[0]["Correct Answers"] == "&lt;true&gt;"
+
+
+# --- question analytics ---
+def player_rows():
+    """Raw data of two questions answered by three players, one player did not answer the second question."""
+    return pd.DataFrame({
+        "Question Number": [1, 1, 1, 2, 2, 2],
+        "Question": ["Q1", "Q1", "Q1", "Q2", "Q2", "Q2"],
+        **{f"Answer {i}": ["A"] * 6 for i in range(1, 7)},
+        "Correct Answers": ["A"] * 6,
+        "Player": ["P1", "P2", "P3"] * 2,
+        "Correct / Incorrect": ["Correct", "Incorrect", "Correct", "Incorrect", "Correct", ""],
+        "Answer Time (seconds)": [2.0, 4.0, 6.0, 10.0, 5.0, 0.0],
+    })
+
+
+def test_df_processing_analytics():
+    """Test that the percent correct and average answer time of the players who answered are added."""
+    result = df_processing(player_rows())
+
+    assert result["Percent Correct"].tolist() == [pytest.approx(200 / 3), 50.0]
+    assert result["Average Answer Time"].tolist() == [4.0, 7.5]
+
+
+def test_df_processing_without_player_columns():
+    df = player_rows().drop(columns=["Correct / Incorrect", "Answer Time (seconds)"])
+
+    assert list(df_processing(df).columns) == ["Question", "Possible Answers", "Correct Answers"]
+
+
+def test_read_excel_streaming_analytics_match_pandas(tmp_path):
+    """Test that the streaming reader aggregates the skipped player rows to the same analytics."""
+    path = write_report(tmp_path / "sample.xlsx", player_rows())
+
+    streaming = df_processing(read_excel_streaming(str(path), sheet_name=KAHOOT_SHEET_NAME))
+    default = df_processing(get_excel_data(str(path), sheet_name=KAHOOT_SHEET_NAME))
+
+    pd.testing.assert_frame_equal(streaming.reset_index(drop=True), default.reset_index(drop=True))
+
+
+@pytest.mark.parametrize("reader", ["pandas", "streaming"])
+def test_get_questions_reads_analytics_on_request(tmp_path, reader):
+    """Test that the analytics are only added to the questions if they are requested."""
+    write_report(tmp_path / "sample.xlsx", player_rows())
+
+    plain = get_questions(str(tmp_path), KAHOOT_SHEET_NAME, reader=reader)
+    analytics = get_questions(str(tmp_path), KAHOOT_SHEET_NAME, reader=reader, analytics=True)
+
+    assert list(plain.columns) == ["Question", "Possible Answers", "Correct Answers"]
+    assert analytics["Percent Correct"].tolist() == [pytest.approx(200 / 3), 50.0]
+
+
+def test_read_excel_streaming_skips_player_columns(tmp_path, monkeypatch):
+    """Test that the cells of the player columns right of the question columns are only read for the analytics."""
+    from openpyxl.worksheet._read_only import ReadOnlyWorksheet
+
+    path = write_report(tmp_path / "sample.xlsx", player_rows())
+    max_cols = []
+    iter_rows = ReadOnlyWorksheet.iter_rows
+
+    def spy(self, *args, **kwargs):
+        max_cols.append(kwargs.get("max_col"))
+        return iter_rows(self, *args, **kwargs)
+
+    monkeypatch.setattr(ReadOnlyWorksheet, "iter_rows", spy)
+    read_excel_streaming(str(path), KAHOOT_SHEET_NAME, analytics=False)
+    read_excel_streaming(str(path), KAHOOT_SHEET_NAME, analytics=True)
+
+    # the header row is read without a limit, the question columns end with "Correct Answers" (column 9)
+    assert max_cols == [None, 9, None, 12]
+
+
+def test_question_analytics_missing_time():
+    analytics = question_analytics(player_rows().drop(columns=["Answer Time (seconds)"]))
+
+    assert analytics["Percent Correct"].tolist() == [pytest.approx(200 / 3), 50.0]
+    assert analytics["Average Answer Time"].isna().all()
+
+
+def test_select_questions():
+    """Test that questions without analytics are dropped by only_below and ordered last by difficulty."""
+    df = pd.DataFrame({
+        "Question": ["Q1", "Q2", "Q3", "Q4"],
+        "Percent Correct": [80.0, np.nan, 20.0, 59.5],
+    })
+
+    assert select_questions(df) is df
+    assert select_questions(df, only_below=60)["Question"].tolist() == ["Q3", "Q4"]
+    assert select_questions(df, order="difficulty")["Question"].tolist() == ["Q3", "Q4", "Q1", "Q2"]
+    assert select_questions(df[["Question"]], only_below=60).empty
+
+
+def test_select_questions_warns_without_analytics(caplog):
+    df = pd.DataFrame({"Question": ["Q1", "Q2"], "Percent Correct": [80.0, np.nan]})
+
+    with caplog.at_level(logging.WARNING):
+        select_questions(df, only_below=60)
+        select_questions(df[["Question"]], order="difficulty")
+        select_questions(df[["Question"]])
+
+    assert [record.getMessage() for record in caplog.records if record.levelno == logging.WARNING] == [
+        "1 of 2 questions have no analytics (no player rows in the input), they are skipped",
+        "2 of 2 questions have no analytics (no player rows in the input), they are ordered last",
+    ]
+
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl", "parquet", "feather"])
+def test_exports_keep_analytics(tmp_path, fmt):
+    """Test that the analytics are exported and read back if they are requested, like those of the raw data."""
+    if fmt in ("parquet", "feather"):
+        pytest.importorskip("pyarrow")
+    inp = tmp_path / "input"
+    inp.mkdir()
+    write_exports(df_processing(player_rows()), str(inp), [fmt])
+
+    plain = get_questions(str(inp), KAHOOT_SHEET_NAME)
+    analytics = get_questions(str(inp), KAHOOT_SHEET_NAME, analytics=True)
+
+    assert list(plain.columns) == ["Question", "Possible Answers", "Correct Answers"]
+    assert analytics["Percent Correct"].tolist() == [pytest.approx(200 / 3), 50.0]
+    assert analytics["Average Answer Time"].tolist() == [4.0, 7.5]
+    assert select_questions(analytics, only_below=60)["Question"].tolist() == ["Q2"]
+
+
+def test_question_tags():
+    df = pd.DataFrame({"Percent Correct": [100.0, 66.7, np.nan], "Average Answer Time": [4.2, np.nan, np.nan]})
+
+    assert question_tags(df) == [["percent_correct::100", "answer_time::4"], ["percent_correct::60"], []]
+    assert question_tags(df[[]]) == [[], [], []]
+
+
+# --- escape_html ---
+def test_escape_html_matches_html_escape():
+    values = ["", "plain", "&amp;", "<a href=\"x\">it's</a>", "Ünïcödé & ☃ < >", "\"'&<>" * 3]
+
+    result = escape_html(pd.Series(values))
+
+    assert list(result) == [html.escape(value) for value in values]
+
+
+# --- compact_questions ---
+def test_compact_questions_repetitive_answers(tmp_path):
+    """Test that repetitive answer columns become categoricals and the package is unchanged."""
+    df = pd.DataFrame({
+        "Question": [f"Q{i}?" for i in range(6)],
+        "Possible Answers": ["True<br>False<br><br><br><br>"] * 5 + ["A<br>B<br><br><br><br>"],
+        "Correct Answers": ["True", "False", "True", "False", "True", "A"],
+    })
+
+    compact = compact_questions(df)
+
+    assert isinstance(compact["Possible Answers"].dtype, pd.CategoricalDtype)
+    assert isinstance(compact["Correct Answers"].dtype, pd.CategoricalDtype)
+    assert not isinstance(compact["Question"].dtype, pd.CategoricalDtype)
+    assert compact.astype(str).equals(df)
+    assert compact_questions(compact) is compact
+
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    make_anki(df, str(tmp_path / "a"), "Test", writer="fast")
+    make_anki(compact, str(tmp_path / "b"), "Test", writer="fast")
+    assert sorted(read_notes(tmp_path / "a" / "anki.apkg", tmp_path / "a")) == sorted(
+        read_notes(tmp_path / "b" / "anki.apkg", tmp_path / "b")
+    )
+
+
+def test_compact_questions_unique_answers():
+    """Test that answer columns with mostly distinct values stay strings."""
+    df = pd.DataFrame({"Question": ["Q1?", "Q2?"], "Possible Answers": ["A", "B"], "Correct Answers": ["A", "B"]})
+
+    assert compact_questions(df) is df
+
+
 # --- make_anki ---
 def test_make_anki_creates_apkg(tmp_path):
     """Test that make_anki creates a valid .apkg file."""
@@ -337,4 +741,62 @@ def test_make_anki_creates_apkg(tmp_path):
     assert output_file.stat().st_size > 0
 
     # Check that it's a valid ZIP file (as .apkg is zip format internally)
-    assert zipfile.is_zipfile(output_file)
\ No newline at end of file
+    assert zipfile.is_zipfile(output_file)
+
+
+def test_make_anki_uses_question_guid(tmp_path):
+    """Test that the note GUID only depends on the question."""
+    df = pd.DataFrame({
+        "Question": ["What is 2+2?"],
+        "Possible Answers": ["2<br>3<br>4"],
+        "Correct Answers": ["4"]
+    })
+
+    make_anki(df=df, out=str(tmp_path), title="Test Deck")
+
+    notes = read_notes(tmp_path / "anki.apkg", tmp_path)
+    assert notes == [(note_guid("What is 2+2?"), ["What is 2+2?", "4", "2<br>3<br>4"])]
+    assert not (tmp_path / "anki.manifest.json").exists()
+
+
+def test_make_anki_incremental(tmp_path):
+    """Test that incremental builds only write new or changed questions."""
+    df = pd.DataFrame({
+        "Question": ["What is 2+2?", "What is 3+3?"],
+        "Possible Answers": ["2<br>3<br>4", "5<br>6"],
+        "Correct Answers": ["4", "6"]
+    })
+    output_file = tmp_path / "anki.apkg"
+
+    # first run writes all questions
+    make_anki(df=df, out=str(tmp_path), title="Test Deck", incremental=True)
+    assert len(read_notes(output_file, tmp_path)) == 2
+    manifest = json.loads((tmp_path / "anki.manifest.json").read_text())
+    assert set(manifest["notes"]) == {note_guid("What is 2+2?"), note_guid("What is 3+3?")}
+
+    # unchanged questions do not produce a package
+    output_file.unlink()
+    make_anki(df=df, out=str(tmp_path), title="Test Deck", incremental=True)
+    assert not output_file.exists()
+
+    # a changed answer and a new question
+    df.loc[1, "Correct Answers"] = "5"
+    df.loc[2] = ["What is 4+4?", "8<br>9", "8"]
+    make_anki(df=df, out=str(tmp_path), title="Test Deck", incremental=True)
+
+    notes = read_notes(output_file, tmp_path)
+    assert [guid for guid, _ in notes] == [note_guid("What is 3+3?"), note_guid("What is 4+4?")]
+    assert notes[0][1][1] == "5"
+    assert len(json.loads((tmp_path / "anki.manifest.json").read_text())["notes"]) == 3
+
+
+def test_make_anki_analytics(tmp_path):
+    """Test that the notes are tagged with their analytics and only the hard questions are written, hardest first."""
+    df = df_processing(player_rows())
+    df = pd.concat([df, pd.DataFrame({"Question": ["Q3"], "Possible Answers": ["A"], "Correct Answers": ["A"]})])
+
+    make_anki(df=df, out=str(tmp_path), title="Test Deck", writer="fast", only_below=60, order="difficulty")
+
+    with sqlite3.connect(extract_collection(tmp_path / "anki.apkg", tmp_path / "extracted")) as conn:
+        rows = conn.execute("SELECT tags, flds FROM notes ORDER BY id").fetchall()
+    assert rows == [(" percent_correct::50 answer_time::7 ", "Q2\x1fA\x1fA<br>A<br>A<br>A<br>A<br>A")]
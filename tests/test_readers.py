@@ -0,0 +1,126 @@
+import io
+import subprocess
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from kahoot_to_anki import readers
+from kahoot_to_anki.export import write_exports
+from kahoot_to_anki.processing import get_excels, get_questions
+from kahoot_to_anki.readers import RAW_DATA_COLUMNS, MemoryFile, read_input, register_reader
+
+KAHOOT_SHEET_NAME = "RawReportData Data"
+TEST_KAHOOT_FILE = str(Path(__file__).parent.parent / "data" / "test_kahoot.xlsx")
+
+
+def write_raw(df, path):
+    fmt = path.suffix
+    if fmt == ".csv":
+        df.to_csv(path, index=False)
+    elif fmt == ".jsonl":
+        df.to_json(path, orient="records", lines=True, force_ascii=False)
+    elif fmt == ".parquet":
+        df.to_parquet(path)
+    else:
+        df.to_feather(path)
+
+
+@pytest.fixture(scope="module")
+def raw_data():
+    return pd.read_excel(TEST_KAHOOT_FILE, sheet_name=KAHOOT_SHEET_NAME)
+
+
+# --- raw data inputs ---
+@pytest.mark.parametrize("extension", [".csv", ".jsonl", ".parquet", ".feather"])
+def test_get_questions_reads_raw_data(tmp_path, raw_data, extension):
+    """Test that the raw data in another format gives the same questions as the Excel file."""
+    if extension in (".parquet", ".feather"):
+        pytest.importorskip("pyarrow")
+    write_raw(raw_data, tmp_path / f"quiz{extension}")
+
+    df = get_questions(str(tmp_path), KAHOOT_SHEET_NAME)
+    expected = get_questions(TEST_KAHOOT_FILE, KAHOOT_SHEET_NAME)
+
+    assert df.reset_index(drop=True).equals(expected.reset_index(drop=True))
+
+
+@pytest.mark.parametrize("extension", [".xlsx", ".csv", ".jsonl", ".parquet", ".feather"])
+def test_get_questions_reads_memory_files(tmp_path, raw_data, extension):
+    """Test that the inputs in memory, as bytes or as file objects, give the same questions as the files."""
+    if extension in (".parquet", ".feather"):
+        pytest.importorskip("pyarrow")
+    if extension == ".xlsx":
+        content = Path(TEST_KAHOOT_FILE).read_bytes()
+    else:
+        write_raw(raw_data, tmp_path / f"quiz{extension}")
+        content = (tmp_path / f"quiz{extension}").read_bytes()
+
+    files = [MemoryFile(f"upload{extension}", content), MemoryFile(f"stream{extension}", io.BytesIO(content))]
+    df = get_questions("", KAHOOT_SHEET_NAME, files=files)
+    expected = get_questions(TEST_KAHOOT_FILE, KAHOOT_SHEET_NAME)
+
+    assert df.reset_index(drop=True).equals(expected.reset_index(drop=True))
+
+
+def test_read_input_raw_data_columns(tmp_path):
+    """Test that other columns are dropped and missing answer columns are added."""
+    (tmp_path / "quiz.csv").write_text(
+        "Player,Question Number,Question,Answer 1,Answer 2,Correct Answers\n"
+        "Ann,1,Q1?,Yes,NA,Yes\n"
+        "Bob,1,Q1?,Yes,NA,Yes\n"
+    )
+
+    df = read_input(str(tmp_path / "quiz.csv"))
+
+    assert list(df.columns) == RAW_DATA_COLUMNS
+    assert df["Answer 2"].tolist() == ["NA", "NA"]
+    assert df["Answer 3"].isna().all()
+    assert get_questions(str(tmp_path), KAHOOT_SHEET_NAME)["Possible Answers"].tolist() == ["Yes<br>NA<br><br><br><br>"]
+
+
+def test_read_input_csv_export(tmp_path):
+    """Test that the semicolon-separated kahoot.csv export is read as processed questions."""
+    df = pd.DataFrame({"Question": ["Q1; or?"], "Possible Answers": ["A<br>B"], "Correct Answers": ["A"]})
+    write_exports(df, str(tmp_path), ["csv"])
+
+    assert read_input(str(tmp_path / "kahoot.csv")).equals(df)
+
+
+def test_read_input_invalid_columns(tmp_path):
+    (tmp_path / "quiz.csv").write_text("Question Number,Question\n1,Q1?\n")
+    (tmp_path / "other.jsonl").write_text('{"Name": "Ann"}\n')
+
+    with pytest.raises(ValueError, match="Correct Answers"):
+        read_input(str(tmp_path / "quiz.csv"))
+    with pytest.raises(ValueError, match="Question Number"):
+        read_input(str(tmp_path / "other.jsonl"))
+    assert get_questions(str(tmp_path), KAHOOT_SHEET_NAME).empty
+
+
+# --- register_reader ---
+def test_register_reader(tmp_path, monkeypatch):
+    """Test that a registered reader is picked by the extension of the input files."""
+    monkeypatch.setattr(readers, "INPUT_READERS", dict(readers.INPUT_READERS))
+    (tmp_path / "quiz.tsv").write_text("Question Number\tQuestion\tCorrect Answers\n1\tQ1?\tYes\n")
+
+    register_reader(".TSV", lambda path: pd.read_csv(path, sep="\t", dtype=str))
+
+    assert list(get_excels(str(tmp_path))) == [str(tmp_path / "quiz.tsv")]
+    assert get_questions(str(tmp_path), KAHOOT_SHEET_NAME)["Question"].tolist() == ["Q1?"]
+    with pytest.raises(ValueError):
+        register_reader(".xlsx", readers.read_csv_data)
+
+
+def test_raw_data_is_read_without_openpyxl(tmp_path, raw_data):
+    """Test that openpyxl is not imported if there are no Excel files."""
+    write_raw(raw_data, tmp_path / "quiz.csv")
+    code = (
+        "import sys\n"
+        "from kahoot_to_anki.processing import get_questions\n"
+        f"assert len(get_questions({str(tmp_path)!r}, 'RawReportData Data'))\n"
+        "assert 'openpyxl' not in sys.modules\n"
+    )
+
+    subprocess.run([sys.executable, "-c", code], check=True)
@@ -0,0 +1,148 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from kahoot_to_anki.discovery import discover_files
+from kahoot_to_anki.split import deck_id, get_question_groups, group_filenames, group_key, make_decks
+from tests.conftest import KAHOOT_SHEET_NAME, read_questions, write_report
+
+
+def read_deck(apkg, tmp_path):
+    questions = read_questions(apkg, tmp_path)
+    with sqlite3.connect(tmp_path / "collection.anki2") as conn:
+        deck_ids = {row[0] for row in conn.execute("SELECT did FROM cards")}
+    return questions, deck_ids
+
+
+# --- group_key ---
+@pytest.mark.parametrize("split_by, pattern, expected", [
+    ("file", None, "math-week1"),
+    ("directory", None, "course-a"),
+    ("pattern", r"^(\w+)-week", "math"),
+    ("pattern", r"week\d", "week1"),
+    ("pattern", r"^physics", None),
+])
+def test_group_key(split_by, pattern, expected):
+    """Test the group keys of the split modes."""
+    assert group_key("/data/course-a/math-week1.xlsx", split_by, pattern) == expected
+
+
+def test_group_key_directory_relative_to_root():
+    """Test that the directory key is the path of the parent directory below the input directory."""
+    assert group_key("/data/courseA/week1/quiz.xlsx", "directory", root="/data") == "courseA/week1"
+    assert group_key("/data/quiz.xlsx", "directory", root="/data") == "data"
+    assert group_key("/other/week1/quiz.xlsx", "directory", root="/data") == "week1"
+
+
+def test_group_key_unknown_mode():
+    with pytest.raises(ValueError):
+        group_key("quiz.xlsx", "sheet")
+
+
+# --- deck_id / group_filenames ---
+def test_deck_id_is_deterministic():
+    """Test that the deck ID only depends on the title and the key."""
+    assert deck_id("Kahoot", "math") == deck_id("Kahoot", "math")
+    assert deck_id("Kahoot", "math") != deck_id("Kahoot", "physics")
+    assert deck_id("Kahoot", "math") != deck_id("Course", "math")
+    assert 1 << 30 <= deck_id("Kahoot", "math") < 1 << 31
+
+
+def test_group_filenames():
+    """Test that the file names are safe and unique."""
+    names = group_filenames(["math", "week 1/2", "a b", "a_b", "..."])
+
+    assert names["math"] == "math"
+    assert names["week 1/2"] == "week_1_2"
+    assert names["..."] == "deck"
+    assert names["a b"] != names["a_b"]
+    assert names["a b"].startswith("a_b-")
+    assert group_filenames(["a_b", "a b"]) == {"a_b": names["a_b"], "a b": names["a b"]}
+
+
+# --- get_question_groups / make_decks ---
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_split_by_file(tmp_path, jobs):
+    """Test that every file becomes a sub-deck in its own package, deduplicated within the deck."""
+    inp = tmp_path / "input"
+    out = tmp_path / "output"
+    inp.mkdir()
+    out.mkdir()
+    write_report(inp / "math.xlsx", ["1 + 1?", "2 + 2?", "1 + 1?"])
+    write_report(inp / "physics.xlsx", ["Speed of light?", "1 + 1?"])
+
+    groups = get_question_groups(str(inp), KAHOOT_SHEET_NAME, "file", jobs=jobs)
+    assert list(groups) == ["math", "physics"]
+    assert groups["math"]["Question"].tolist() == ["1 + 1?", "2 + 2?"]
+
+    make_decks(groups, str(out), "Kahoot", jobs=jobs, export_csv=True)
+
+    assert read_deck(out / "math.apkg", tmp_path / "math") == (["1 + 1?", "2 + 2?"], {deck_id("Kahoot", "math")})
+    assert read_deck(out / "physics.apkg", tmp_path / "physics") == (
+        ["1 + 1?", "Speed of light?"], {deck_id("Kahoot", "physics")}
+    )
+    assert (out / "math.csv").exists() and (out / "physics.csv").exists()
+    assert not (out / "anki.apkg").exists()
+
+
+def test_split_by_pattern_merges_and_skips_files(tmp_path):
+    """Test that files with the same pattern key are merged and files without a match are skipped."""
+    write_report(tmp_path / "math-week1.xlsx", ["1 + 1?"])
+    write_report(tmp_path / "math-week2.xlsx", ["2 + 2?"])
+    write_report(tmp_path / "notes.xlsx", ["Skipped?"])
+
+    groups = get_question_groups(str(tmp_path), KAHOOT_SHEET_NAME, "pattern", pattern=r"^(\w+)-week")
+
+    assert list(groups) == ["math"]
+    assert sorted(groups["math"]["Question"]) == ["1 + 1?", "2 + 2?"]
+
+
+def test_split_by_directory_keeps_same_named_subdirectories_apart(tmp_path):
+    """Test that subdirectories with the same name in different directories become separate decks."""
+    inp = tmp_path / "input"
+    out = tmp_path / "output"
+    for course in ["courseA", "courseB"]:
+        (inp / course / "week1").mkdir(parents=True)
+        write_report(inp / course / "week1" / "quiz.xlsx", [f"{course}?"])
+    out.mkdir()
+    files = discover_files(str(inp), [".xlsx"], recursive=True)
+
+    groups = get_question_groups(str(inp), KAHOOT_SHEET_NAME, "directory", files=files)
+    assert list(groups) == ["courseA/week1", "courseB/week1"]
+
+    make_decks(groups, str(out), "Kahoot")
+
+    assert read_deck(out / "courseA_week1.apkg", tmp_path / "a") == (
+        ["courseA?"], {deck_id("Kahoot", "courseA/week1")}
+    )
+    assert read_deck(out / "courseB_week1.apkg", tmp_path / "b") == (
+        ["courseB?"], {deck_id("Kahoot", "courseB/week1")}
+    )
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_make_decks_returns_failed_decks(tmp_path, jobs):
+    """Test that the decks whose packages failed to write are returned, skipped decks of only_below are not."""
+    groups = {
+        "a": pd.DataFrame({"Question": ["Q1"], "Possible Answers": ["A"], "Correct Answers": ["A"]}),
+        "b": pd.DataFrame({"Question": ["Q2"], "Possible Answers": ["B"], "Correct Answers": ["B"]}),
+    }
+
+    assert make_decks(groups, str(tmp_path / "missing"), "Kahoot", jobs=jobs) == ["a", "b"]
+    assert make_decks(groups, str(tmp_path), "Kahoot", jobs=jobs, only_below=50) == []
+    assert make_decks(groups, str(tmp_path), "Kahoot", jobs=jobs) == []
+    assert (tmp_path / "a.apkg").exists() and (tmp_path / "b.apkg").exists()
+
+
+def test_make_decks_incremental_manifest_per_deck(tmp_path):
+    """Test that every package gets its own manifest in incremental mode."""
+    groups = {
+        "a": pd.DataFrame({"Question": ["Q1"], "Possible Answers": ["A"], "Correct Answers": ["A"]}),
+        "b": pd.DataFrame({"Question": ["Q2"], "Possible Answers": ["B"], "Correct Answers": ["B"]}),
+    }
+
+    make_decks(groups, str(tmp_path), "Kahoot", incremental=True)
+
+    assert (tmp_path / "a.manifest.json").exists()
+    assert (tmp_path / "b.manifest.json").exists()
@@ -0,0 +1,119 @@
+import json
+import time
+import tracemalloc
+
+import pandas as pd
+
+from kahoot_to_anki.cache import ParseCache
+from kahoot_to_anki.processing import get_questions
+from kahoot_to_anki import stats as stats_module
+from kahoot_to_anki.stats import Stats, current_rss
+
+KAHOOT_SHEET_NAME = "RawReportData Data"
+
+
+# --- Stats.stage ---
+def test_stage_accumulates_calls():
+    stats = Stats()
+
+    for rows in [2, 3]:
+        with stats.stage("package") as stage:
+            time.sleep(0.01)
+            stage["rows"] = rows
+
+    record = stats.stages["package"]
+    assert record["calls"] == 2
+    assert record["rows"] == 5
+    assert record["wall_s"] >= 0.02
+    assert "traced_peak_bytes" not in record
+
+
+def test_stage_records_traced_memory():
+    stats = Stats()
+
+    tracemalloc.start()
+    try:
+        with stats.stage("read"):
+            data = bytearray(1024 * 1024)
+        report = stats.to_dict()
+    finally:
+        tracemalloc.stop()
+
+    assert len(data) > 0
+    assert stats.stages["read"]["traced_peak_bytes"] >= 1024 * 1024
+    assert report["top_allocations"]
+
+
+def test_stage_records_peak_rss_growth(monkeypatch):
+    """Test that each stage records how much it raised the peak RSS, not the peak of the process."""
+    peaks = iter([100, 150, 150, 150, 150, 170])
+    monkeypatch.setattr(stats_module, "peak_rss", lambda children=False: next(peaks))
+    stats = Stats()
+
+    for name in ["read", "package", "read"]:
+        with stats.stage(name):
+            pass
+
+    assert stats.stages["read"]["peak_rss_growth_bytes"] == 70
+    assert stats.stages["package"]["peak_rss_growth_bytes"] == 0
+
+
+def test_stage_records_current_rss():
+    stats = Stats()
+
+    with stats.stage("read"):
+        pass
+
+    if current_rss() is None:
+        assert stats.stages["read"]["rss_bytes"] is None
+    else:
+        assert stats.stages["read"]["rss_bytes"] > 0
+
+
+# --- Stats.write ---
+def test_write_report(tmp_path):
+    stats = Stats()
+    with stats.stage("discover") as stage:
+        stage["rows"] = 1
+    stats.add_file("quiz.xlsx", source="parsed", rows=3, read_s=0.1, process_s=0.2, cpu_s=0.3)
+
+    stats.write(str(tmp_path / "stats.json"))
+
+    report = json.loads((tmp_path / "stats.json").read_text())
+    assert [stage["name"] for stage in report["stages"]] == ["discover"]
+    assert report["files"] == [
+        {"path": "quiz.xlsx", "source": "parsed", "rows": 3, "read_s": 0.1, "process_s": 0.2, "cpu_s": 0.3}
+    ]
+    assert report["total"]["wall_s"] > 0
+
+
+# --- get_questions ---
+def test_get_questions_records_stages_and_files(tmp_path):
+    df = pd.DataFrame({
+        "Question Number": [1, 1],
+        "Question": ["What is 2+2?", "What is 2+2?"],
+        "Answer 1": ["4", "4"],
+        "Answer 2": ["3", "3"],
+        "Answer 3": ["", ""],
+        "Answer 4": ["", ""],
+        "Answer 5": ["", ""],
+        "Answer 6": ["", ""],
+        "Correct Answers": ["4", "4"]
+    })
+    df.to_excel(tmp_path / "quiz.xlsx", sheet_name=KAHOOT_SHEET_NAME, index=False)
+    (tmp_path / "fake.xlsx").write_text("This is not a real Excel file.")
+    cache = ParseCache(str(tmp_path / "cache"))
+
+    get_questions(str(tmp_path), KAHOOT_SHEET_NAME, cache=cache)
+    stats = Stats()
+    get_questions(str(tmp_path), KAHOOT_SHEET_NAME, cache=cache, stats=stats)
+
+    assert set(stats.stages) == {"discover", "cache_lookup", "read", "dedup", "compact"}
+    assert stats.stages["discover"]["rows"] == 2
+    assert stats.stages["read"]["rows"] == 1
+    files = {file["path"].rsplit("/", 1)[-1]: file for file in stats.files}
+    assert files["quiz.xlsx"]["source"] == "cache"
+    assert files["fake.xlsx"]["source"] == "parsed"
+    assert files["fake.xlsx"]["rows"] is None
+    assert files["fake.xlsx"]["read_s"] >= 0
+    assert "peak_rss_growth_bytes" in files["fake.xlsx"]
@@ -0,0 +1,145 @@
+import logging
+import os
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from kahoot_to_anki import watch
+from kahoot_to_anki.watch import DeckWatcher, InotifyWatcher, PollingWatcher, snapshot
+from tests.conftest import KAHOOT_SHEET_NAME, read_questions, write_report
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    inp = tmp_path / "input"
+    out = tmp_path / "output"
+    inp.mkdir()
+    out.mkdir()
+    return inp, out
+
+
+# --- snapshot ---
+def test_snapshot(dirs):
+    inp, _ = dirs
+    write_report(inp / "quiz.xlsx", ["Q1?"], mtime=1000)
+    (inp / "notes.txt").write_text("not an export")
+    (inp / "~$quiz.xlsx").write_text("Excel lock file")
+    (inp / "draft.xlsx").write_text("")
+
+    assert snapshot(str(inp), exclude=["draft*"]) == {
+        str(inp / "quiz.xlsx"): ((inp / "quiz.xlsx").stat().st_size, 1000 * 10**9)
+    }
+    assert snapshot(str(inp / "missing")) == {}
+
+
+# --- DeckWatcher.scan ---
+def test_scan_debounces_new_files(dirs):
+    """Test that a file is only read once it was not modified for the debounce time."""
+    inp, out = dirs
+    write_report(inp / "quiz.xlsx", ["Q1?"], mtime=1000)
+    watcher = DeckWatcher(str(inp), str(out), "Test", KAHOOT_SHEET_NAME, debounce=2)
+
+    assert watcher.scan(now=1001) is False
+    assert watcher.deadline == 1002
+    assert not (out / "anki.apkg").exists()
+
+    assert watcher.scan(now=1002) is True
+    assert watcher.deadline is None
+    assert (out / "anki.apkg").exists()
+
+
+def test_scan_updates_outputs_incrementally(dirs, tmp_path, monkeypatch):
+    """Test that only new and modified files are read and removed files are dropped."""
+    inp, out = dirs
+    write_report(inp / "a.xlsx", ["A1?", "Shared?"], mtime=1000)
+    write_report(inp / "b.xlsx", ["B1?", "Shared?"], mtime=1000)
+    watcher = DeckWatcher(str(inp), str(out), "Test", KAHOOT_SHEET_NAME, export_csv=True, debounce=0)
+    assert watcher.scan(now=2000) is True
+    assert read_questions(out / "anki.apkg", tmp_path / "1") == ["A1?", "B1?", "Shared?"]
+    assert watcher.scan(now=2000) is False
+
+    read_files = []
+    original = watch.iter_questions
+    monkeypatch.setattr(watch, "iter_questions", lambda files, **kwargs: (
+        read_files.extend(files) or original(files, **kwargs)
+    ))
+
+    write_report(inp / "b.xlsx", ["B2?"], mtime=1001)
+    write_report(inp / "c.xlsx", ["C1?"], mtime=1001)
+    os.remove(inp / "a.xlsx")
+    assert watcher.scan(now=2000) is True
+
+    assert read_files == [str(inp / "b.xlsx"), str(inp / "c.xlsx")]
+    assert read_questions(out / "anki.apkg", tmp_path / "2") == ["B2?", "C1?"]
+    csv = pd.read_csv(out / "kahoot.csv", sep=";", encoding="utf-8-sig")
+    assert sorted(csv["Question"]) == ["B2?", "C1?"]
+
+
+def test_scan_skips_unreadable_file_until_it_changes(dirs):
+    """Test that a broken file is not read again until it is modified."""
+    inp, out = dirs
+    (inp / "partial.xlsx").write_bytes(b"PK\x03\x04 incomplete")
+    os.utime(inp / "partial.xlsx", (1000, 1000))
+    watcher = DeckWatcher(str(inp), str(out), "Test", KAHOOT_SHEET_NAME, debounce=0)
+
+    assert watcher.scan(now=2000) is True
+    assert not (out / "anki.apkg").exists()
+    assert watcher.scan(now=2000) is False
+
+    write_report(inp / "partial.xlsx", ["Q1?"], mtime=1001)
+    assert watcher.scan(now=2000) is True
+    assert (out / "anki.apkg").exists()
+
+
+def test_write_logs_failed_package(dirs, monkeypatch, caplog):
+    """Test that a package which failed to write is logged and the watcher keeps running."""
+    inp, out = dirs
+    write_report(inp / "quiz.xlsx", ["Q1?"], mtime=1000)
+    monkeypatch.setattr(watch, "make_anki", lambda *args, **kwargs: False)
+    watcher = DeckWatcher(str(inp), str(out), "Test", KAHOOT_SHEET_NAME, debounce=0)
+
+    with caplog.at_level(logging.INFO):
+        assert watcher.scan(now=2000) is True
+
+    assert "Failed to update the Anki package, watching for further changes" in caplog.messages
+    assert not [message for message in caplog.messages if message.startswith("Updated the Anki package")]
+
+
+# --- watchers / run ---
+def test_inotify_watcher(tmp_path):
+    try:
+        watcher = InotifyWatcher(str(tmp_path))
+    except (OSError, AttributeError, TypeError):
+        pytest.skip("inotify is not available")
+    try:
+        assert watcher.wait(0) is False
+        (tmp_path / "quiz.xlsx").write_bytes(b"")
+        assert watcher.wait(1) is True
+        assert watcher.wait(0) is False
+    finally:
+        watcher.close()
+
+
+@pytest.mark.parametrize("polling", [True, False])
+def test_run_converts_new_exports(dirs, polling):
+    """Test that a file dropped into the watched directory ends up in the package."""
+    inp, out = dirs
+    watcher = DeckWatcher(str(inp), str(out), "Test", KAHOOT_SHEET_NAME, debounce=0)
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=watcher.run, kwargs=dict(poll_interval=0.05, stop=stop, watcher=PollingWatcher() if polling else None)
+    )
+    thread.start()
+    try:
+        write_report(inp / "quiz.xlsx", ["Q1?"])
+        deadline = time.time() + 10
+        while str(inp / "quiz.xlsx") not in watcher.frames and time.time() < deadline:
+            time.sleep(0.05)
+    finally:
+        stop.set()
+        thread.join(5)
+
+    assert not thread.is_alive()
+    assert (out / "anki.apkg").exists()